@@ -0,0 +1,112 @@
+"""
+CLI Startup Benchmark.
+Measures cold import time (python -X importtime) and end-to-end wall time of
+cheap commands, and checks them against startup_budget.json (milliseconds).
+Each command runs with a throwaway HOME, which also verifies that `version`
+and `help` never create files under ~/.kernhell.
+
+Usage:
+    python benchmarks/startup_bench.py            # report + exit 1 if over budget
+    python benchmarks/startup_bench.py --runs 10  # more samples per measurement
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BUDGET_FILE = Path(__file__).with_name("startup_budget.json")
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+COMMANDS = [
+    ["version"],
+    ["help"],
+    ["--help"],
+    ["heal", "--help"],
+    ["config", "list-keys"],
+]
+
+# Commands that must not touch the filesystem.
+READ_ONLY = {"version", "help", "--help", "heal --help"}
+
+
+def _env(home: str) -> dict:
+    env = dict(os.environ)
+    env["HOME"] = home
+    env["USERPROFILE"] = home
+    env["KERNHELL_NO_DAEMON"] = "1"
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(REPO_ROOT), env.get("PYTHONPATH")]))
+    return env
+
+
+def measure_import(module: str, runs: int) -> float:
+    """Median cumulative import time of `module` in ms, from -X importtime."""
+    samples = []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as home:
+            result = subprocess.run(
+                [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                capture_output=True, text=True, env=_env(home)
+            )
+        for line in result.stderr.splitlines():
+            # import time: self [us] | cumulative | imported package
+            parts = [p.strip() for p in line.split("|")]
+            if len(parts) == 3 and parts[2] == module:
+                samples.append(int(parts[1]) / 1000)
+    return statistics.median(samples) if samples else float("nan")
+
+
+def measure_command(args, runs: int):
+    """Median wall time in ms, plus whether the command left files behind."""
+    samples = []
+    touched_fs = False
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as home:
+            started = time.perf_counter()
+            subprocess.run(
+                [sys.executable, "-m", "kernhell.client", *args],
+                capture_output=True, text=True, env=_env(home)
+            )
+            samples.append((time.perf_counter() - started) * 1000)
+            touched_fs = touched_fs or any(Path(home).iterdir())
+    return statistics.median(samples), touched_fs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="KernHell CLI startup benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    opts = parser.parse_args()
+
+    budget = json.loads(BUDGET_FILE.read_text())
+    failures = []
+
+    print(f"{'measurement':<28}{'median ms':>12}{'budget ms':>12}")
+    rows = [(f"import:{m}", measure_import(m, opts.runs), None) for m in ("kernhell.client", "kernhell.main")]
+    for args in COMMANDS:
+        name = " ".join(args)
+        ms, touched = measure_command(args, opts.runs)
+        rows.append((f"cmd:{name}", ms, touched if name in READ_ONLY else None))
+
+    for key, ms, touched in rows:
+        limit = budget.get(key)
+        flag = ""
+        if limit is not None and not ms <= limit:
+            flag = "  OVER BUDGET"
+            failures.append(key)
+        if touched:
+            flag += "  WROTE FILES"
+            failures.append(key)
+        print(f"{key:<28}{ms:>12.1f}{(limit or 0):>12}{flag}")
+
+    if failures:
+        print(f"\n{len(failures)} measurement(s) failed: {', '.join(failures)}")
+        sys.exit(1)
+    print("\nAll startup measurements within budget.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Shared Browser Pool.
+Screenshot capture used to launch and close a full Chromium per attempt. The
+pool launches each browser once per process (or once per daemon lifetime) and
+hands out a fresh, isolated context per capture.
+
+Playwright's sync API is bound to the thread that started it, so every pooled
+browser lives on its own worker thread and captures are queued to it.
+"""
+import atexit
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Optional
+
+from kernhell.utils import log_warning
+
+POOL_SIZE = int(os.environ.get("KERNHELL_BROWSER_POOL", "2"))
+# Upper bound for waiting on network idle after DOMContentLoaded.
+SETTLE_CAP_MS = int(os.environ.get("KERNHELL_SETTLE_MS", "3000"))
+
+_STOP = object()
+
+
+def settle(page, cap_ms: int = SETTLE_CAP_MS):
+    """Waits for network idle, capped: long-polling pages never go idle."""
+    try:
+        page.wait_for_load_state("networkidle", timeout=cap_ms)
+    except Exception:
+        pass
+
+
+class BrowserPool:
+    def __init__(self, size: int = POOL_SIZE):
+        self.size = max(1, size)
+        self._jobs: "queue.Queue" = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def _ensure_threads(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.size):
+                t = threading.Thread(target=self._worker, name=f"kernhell-browser-{i + 1}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def _worker(self):
+        playwright = None
+        browser = None
+        try:
+            while True:
+                job = self._jobs.get()
+                if job is _STOP:
+                    break
+                fn, future = job
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    if browser is None or not browser.is_connected():
+                        if playwright is None:
+                            from playwright.sync_api import sync_playwright
+                            playwright = sync_playwright().start()
+                        browser = playwright.chromium.launch(headless=True)
+                    if fn is None:
+                        future.set_result(None)  # warm-up request
+                        continue
+                    context = browser.new_context()
+                    try:
+                        future.set_result(fn(context.new_page()))
+                    finally:
+                        context.close()
+                except Exception as e:
+                    future.set_exception(e)
+        finally:
+            for closer in (browser and browser.close, playwright and playwright.stop):
+                if closer:
+                    try:
+                        closer()
+                    except Exception:
+                        pass
+
+    def run_in_page(self, fn: Callable[[Any], Any], timeout: float = 60) -> Any:
+        """Runs fn(page) on a pooled browser in a fresh context; re-raises fn's errors."""
+        self._ensure_threads()
+        future: Future = Future()
+        self._jobs.put((fn, future))
+        return future.result(timeout=timeout)
+
+    def warm(self):
+        """Launches every pooled browser ahead of the first capture (daemon start-up)."""
+        self._ensure_threads()
+        futures = []
+        for _ in range(self.size):
+            future: Future = Future()
+            self._jobs.put((None, future))
+            futures.append(future)
+        for future in futures:
+            try:
+                future.result(timeout=60)
+            except Exception as e:
+                log_warning(f"Browser pool warm-up failed: {e}")
+                break
+
+    def shutdown(self):
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._jobs.put(_STOP)
+        for t in threads:
+            t.join(timeout=10)
+
+
+_pool: Optional[BrowserPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> BrowserPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool()
+            atexit.register(_pool.shutdown)
+        return _pool
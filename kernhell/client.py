@@ -0,0 +1,91 @@
+"""
+Thin CLI Client.
+The `kernhell` entry point. If a `kernhell daemon` is listening on the local
+socket, the command is forwarded to it and its output streamed back; otherwise
+the full CLI is imported and run in-process.
+Only stdlib is imported here, so a forwarded command costs milliseconds.
+"""
+import json
+import os
+import shutil
+import socket
+import sys
+from pathlib import Path
+from typing import Optional
+
+APP_NAME = "kernhell"
+CONFIG_DIR = Path.home() / f".{APP_NAME}"
+SOCKET_PATH = CONFIG_DIR / "daemon.sock"
+
+# Commands that must run in the calling process (long-running or daemon control).
+LOCAL_COMMANDS = {"daemon", "watch"}
+
+
+def daemon_available() -> bool:
+    return hasattr(socket, "AF_UNIX") and SOCKET_PATH.exists() and not os.environ.get("KERNHELL_NO_DAEMON")
+
+
+def _should_forward(argv) -> bool:
+    if not argv or not daemon_available():
+        return False
+    if argv[0] in LOCAL_COMMANDS or argv[0].startswith("-"):
+        return False
+    return True
+
+
+def send_request(request: dict, out=None, connect_timeout: float = 0.5) -> Optional[int]:
+    """
+    Sends one request to the daemon and streams its output to `out`.
+    Returns the exit code, or None if no daemon could be reached.
+    """
+    out = out or sys.stdout
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(connect_timeout)
+    try:
+        sock.connect(str(SOCKET_PATH))
+    except OSError:
+        sock.close()
+        return None
+
+    sock.settimeout(None)
+    with sock, sock.makefile("rwb") as stream:
+        stream.write((json.dumps(request) + "\n").encode("utf-8"))
+        stream.flush()
+        for raw in stream:
+            message = json.loads(raw)
+            if "out" in message:
+                out.write(message["out"])
+                out.flush()
+            elif "exit" in message:
+                return message["exit"]
+    # Daemon died mid-job.
+    return 1
+
+
+def forward(argv) -> Optional[int]:
+    """Forwards a CLI invocation to the daemon. None means 'run it locally'."""
+    request = {
+        "argv": list(argv),
+        "cwd": os.getcwd(),
+        "tty": sys.stdout.isatty(),
+        "columns": shutil.get_terminal_size().columns,
+    }
+    try:
+        return send_request(request)
+    except KeyboardInterrupt:
+        return 130
+
+
+def main():
+    argv = sys.argv[1:]
+    if _should_forward(argv):
+        code = forward(argv)
+        if code is not None:
+            sys.exit(code)
+
+    from kernhell.main import app
+    app()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Provider Client Pool.
+SDK clients (and the HTTP connection pools inside them) are built once per
+(provider, key) and reused, so repeated and parallel requests skip client
+setup and TLS handshakes. Used by the providers and by `config prune`.
+
+Gemini: google-generativeai only picks a key through the process-global
+`genai.configure()`, so each key instead gets its own GenerativeServiceClient
+from google.ai.generativelanguage (the SDK's own transport layer) with the key
+in its client_options. No global state, no lock: keys run in parallel and each
+keeps its own gRPC channel.
+"""
+import os
+import threading
+from typing import Any, Dict, Tuple
+
+GEMINI_MODEL = "gemini-2.0-flash"
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+NVIDIA_BASE_URL = "https://integrate.api.nvidia.com/v1"
+
+# Cap on concurrent in-flight requests per provider (matters under `heal --jobs`).
+# Clamped to 1: a zero-slot semaphore would block every LLM call forever.
+MAX_INFLIGHT_PER_PROVIDER = max(1, int(os.environ.get("KERNHELL_MAX_INFLIGHT", "2")))
+
+_clients: Dict[Tuple[str, str], Any] = {}
+_lock = threading.Lock()
+
+
+class _GeminiResponse:
+    """The slice of a GenerateContentResponse the providers read (.text, like the SDK's)."""
+    def __init__(self, raw):
+        self.raw = raw
+
+    @property
+    def text(self) -> str:
+        parts = [part.text for candidate in self.raw.candidates[:1]
+                 for part in candidate.content.parts if part.text]
+        if not parts:
+            raise ValueError("response has no text parts")
+        return "".join(parts)
+
+
+class _GeminiClient:
+    """GenerativeModel-like client for one key, on its own GenerativeServiceClient."""
+    def __init__(self, api_key: str):
+        from google.ai import generativelanguage as glm
+        self._glm = glm
+        self._service = glm.GenerativeServiceClient(client_options={"api_key": api_key})
+
+    def _request(self, contents):
+        glm = self._glm
+        parts = []
+        for item in contents if isinstance(contents, list) else [contents]:
+            if isinstance(item, dict):
+                parts.append(glm.Part(inline_data=glm.Blob(mime_type=item["mime_type"], data=item["data"])))
+            else:
+                parts.append(glm.Part(text=item))
+        return glm.GenerateContentRequest(
+            model=f"models/{GEMINI_MODEL}", contents=[glm.Content(role="user", parts=parts)]
+        )
+
+    def generate_content(self, contents, stream: bool = False):
+        request = self._request(contents)
+        if not stream:
+            return _GeminiResponse(self._service.generate_content(request=request))
+        return self._stream(request)
+
+    def _stream(self, request):
+        responses = self._service.stream_generate_content(request=request)
+        try:
+            for raw in responses:
+                yield _GeminiResponse(raw)
+        finally:
+            cancel = getattr(responses, "cancel", None)  # leaving early drops the gRPC stream
+            if callable(cancel):
+                cancel()
+
+    def close(self):
+        self._service.transport.close()
+
+
+def _build_google(api_key: str):
+    return _GeminiClient(api_key)
+
+
+def _build_groq(api_key: str):
+    from groq import Groq
+    return Groq(api_key=api_key)
+
+
+def _build_openrouter(api_key: str):
+    from openai import OpenAI
+    return OpenAI(base_url=OPENROUTER_BASE_URL, api_key=api_key)
+
+
+def _build_nvidia(api_key: str):
+    from openai import OpenAI
+    return OpenAI(base_url=NVIDIA_BASE_URL, api_key=api_key)
+
+
+def _build_cloudflare(api_key: str):
+    """Keep-alive session; api_key is "ACCOUNT_ID:API_TOKEN"."""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(2, MAX_INFLIGHT_PER_PROVIDER))
+    session.mount("https://", adapter)
+    session.headers["Authorization"] = f"Bearer {api_key.split(':', 1)[-1]}"
+    return session
+
+
+_BUILDERS = {
+    "google": _build_google,
+    "groq": _build_groq,
+    "openrouter": _build_openrouter,
+    "cloudflare": _build_cloudflare,
+    "nvidia": _build_nvidia,
+}
+
+
+def get_client(provider: str, api_key: str) -> Any:
+    """Shared client for (provider, key), built on first use."""
+    cache_key = (provider, api_key)
+    client = _clients.get(cache_key)
+    if client is not None:
+        return client
+    with _lock:
+        client = _clients.get(cache_key)
+        if client is None:
+            client = _BUILDERS[provider](api_key)
+            _clients[cache_key] = client
+        return client
+
+
+def drop_client(provider: str, api_key: str):
+    """Forgets (and closes, where supported) the client of a removed or dead key."""
+    with _lock:
+        client = _clients.pop((provider, api_key), None)
+    close = getattr(client, "close", None)
+    if callable(close):
+        try:
+            close()
+        except Exception:
+            pass
@@ -0,0 +1,193 @@
+"""
+Context-Windowed Prompts.
+Sending an 800-line script to fix one selector wastes prompt tokens, and asking
+for the whole file back wastes (and truncates) completion tokens. For large
+files the prompt carries only:
+
+- the module's imports
+- the enclosing function of the failing line, if it is small enough, or else
+  a window of whole statements around that line from the same block
+
+The model fixes that excerpt and the answer is spliced back into place. The
+excerpt is always a run of sibling statements, so it dedents to valid Python
+and the splice can be checked by re-parsing the whole file.
+
+KERNHELL_CONTEXT_MIN_LINES (default 150): smaller files are sent whole.
+KERNHELL_CONTEXT_WINDOW (default 30): lines of context on each side.
+"""
+import ast
+import os
+import re
+import textwrap
+from dataclasses import dataclass
+from typing import List, Optional
+
+MIN_FILE_LINES = int(os.environ.get("KERNHELL_CONTEXT_MIN_LINES", "150"))
+WINDOW_LINES = int(os.environ.get("KERNHELL_CONTEXT_WINDOW", "30"))
+# A failing function up to this size is sent whole.
+MAX_FUNCTION_LINES = 2 * WINDOW_LINES + 40
+# A fixed excerpt may grow by this many lines (or double) before it is taken for a whole-file answer.
+MAX_GROWTH_LINES = 20
+
+_TRACEBACK_FRAME = re.compile(r'File "([^"]+)", line (\d+)')
+_SHORT_FRAME = re.compile(r"^(\S+\.py):(\d+):", re.MULTILINE)
+
+
+@dataclass
+class ContextWindow:
+    start: int    # first line of the excerpt (1-based, inclusive)
+    end: int      # last line (inclusive)
+    indent: str   # indentation the excerpt had in the file
+    snippet: str  # the code the model gets: imports + dedented excerpt
+
+
+def failing_line(error_log: str, file_path: str) -> Optional[int]:
+    """Innermost traceback line that points into file_path, or None."""
+    target = os.path.abspath(file_path)
+    name = os.path.basename(file_path)
+    found = None
+    for pattern in (_TRACEBACK_FRAME, _SHORT_FRAME):
+        for path, line in pattern.findall(error_log or ""):
+            if os.path.abspath(path) == target or os.path.basename(path) == name:
+                found = int(line)
+        if found:
+            return found
+    return None
+
+
+def _span(node: ast.stmt):
+    start = min([d.lineno for d in getattr(node, "decorator_list", [])] + [node.lineno])
+    return start, node.end_lineno
+
+
+def _child_bodies(node: ast.stmt) -> List[List[ast.stmt]]:
+    bodies = [getattr(node, field, None) for field in ("body", "orelse", "finalbody")]
+    bodies += [handler.body for handler in getattr(node, "handlers", [])]
+    bodies += [case.body for case in getattr(node, "cases", [])]
+    return [b for b in bodies if isinstance(b, list) and b and isinstance(b[0], ast.stmt)]
+
+
+def _select(body: List[ast.stmt], line: int):
+    """(start, end) of sibling statements around `line`, narrowing into big blocks."""
+    for index, node in enumerate(body):
+        start, end = _span(node)
+        if not start <= line <= end:
+            continue
+        size = end - start + 1
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and size <= MAX_FUNCTION_LINES:
+            return start, end
+        if size > 2 * WINDOW_LINES + 1:
+            for child in _child_bodies(node):
+                first, last = _span(child[0])[0], _span(child[-1])[1]
+                if first <= line <= last:
+                    return _select(child, line)
+            return start, end  # line is in the header of a huge block
+        # Grow outward over whole sibling statements while within the window.
+        lo, hi = index, index
+        while True:
+            grown = False
+            if lo > 0 and _span(body[hi])[1] - _span(body[lo - 1])[0] + 1 <= 2 * WINDOW_LINES + 1:
+                lo, grown = lo - 1, True
+            if hi + 1 < len(body) and _span(body[hi + 1])[1] - _span(body[lo])[0] + 1 <= 2 * WINDOW_LINES + 1:
+                hi, grown = hi + 1, True
+            if not grown:
+                return _span(body[lo])[0], _span(body[hi])[1]
+    return None
+
+
+def extract_context(code: str, error_log: str, file_path: str) -> Optional[ContextWindow]:
+    """The excerpt to send instead of the whole file, or None to send the whole file."""
+    lines = code.splitlines(keepends=True)
+    if len(lines) < MIN_FILE_LINES:
+        return None
+    line = failing_line(error_log, file_path)
+    if line is None:
+        return None
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+    region = _select(tree.body, line)
+    if region is None:
+        return None
+    start, end = region
+
+    imports = [n for n in tree.body if isinstance(n, (ast.Import, ast.ImportFrom)) and n.end_lineno < start]
+    header = "".join("".join(lines[n.lineno - 1:n.end_lineno]) for n in imports)
+    excerpt = "".join(lines[start - 1:end])
+    first = lines[start - 1]
+    indent = first[:len(first) - len(first.lstrip())]
+    # The "this is an excerpt" note goes in the prompt text (get_ai_fix(excerpt=True)),
+    # never into the code, so it cannot end up in the user's file.
+    return ContextWindow(start, end, indent, header + "\n" + textwrap.dedent(excerpt))
+
+
+def _defined_names(nodes: List[ast.stmt]) -> set:
+    """Names of functions and classes defined by these statements (at their level)."""
+    return {n.name for n in nodes if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))}
+
+
+def _inside(node: ast.stmt, start: int, end: int) -> bool:
+    node_start, node_end = _span(node)
+    return start <= node_start and node_end <= end
+
+
+def splice_context(code: str, fixed_excerpt: str, window: ContextWindow) -> Optional[str]:
+    """
+    Puts the model's fixed excerpt back in place of lines start..end.
+    Leading imports in the answer are split off; new ones are added after the
+    file's imports. None if the answer or the spliced file does not parse, or
+    if the answer is more than the excerpt (e.g. the model wrote out the whole
+    file): much longer than the excerpt, or redefining functions/classes that
+    live elsewhere in the file.
+    """
+    try:
+        fixed_tree = ast.parse(fixed_excerpt)
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+    fixed_lines = fixed_excerpt.splitlines(keepends=True)
+
+    leading = []
+    for node in fixed_tree.body:
+        if not isinstance(node, (ast.Import, ast.ImportFrom)):
+            break
+        leading.append(node)
+    body_start = leading[-1].end_lineno if leading else 0
+    body = textwrap.dedent("".join(fixed_lines[body_start:])).strip("\n")
+    if not body:
+        return None
+
+    excerpt_size = window.end - window.start + 1
+    if len(body.splitlines()) > max(2 * excerpt_size, excerpt_size + MAX_GROWTH_LINES):
+        return None
+    outside = [n for n in ast.walk(tree) if isinstance(n, ast.stmt) and not _inside(n, window.start, window.end)]
+    inside = [n for n in ast.walk(tree) if isinstance(n, ast.stmt) and _inside(n, window.start, window.end)]
+    foreign = (_defined_names(fixed_tree.body) - _defined_names(inside)) & _defined_names(outside)
+    if foreign:
+        return None
+    body = "".join(
+        (window.indent + line) if line.strip() else line
+        for line in body.splitlines(keepends=True)
+    )
+    if not body.endswith("\n"):
+        body += "\n"
+
+    lines = code.splitlines(keepends=True)
+    lines[window.start - 1:window.end] = [body]
+
+    old_imports = {ast.dump(n) for n in tree.body if isinstance(n, (ast.Import, ast.ImportFrom))}
+    new_imports = [
+        "".join(fixed_lines[n.lineno - 1:n.end_lineno]) for n in leading if ast.dump(n) not in old_imports
+    ]
+    if new_imports:
+        last_import = max((n.end_lineno for n in tree.body if isinstance(n, (ast.Import, ast.ImportFrom))
+                           and n.end_lineno < window.start), default=0)
+        lines[last_import:last_import] = new_imports
+
+    result = "".join(lines)
+    try:
+        ast.parse(result)
+    except SyntaxError:
+        return None
+    return result
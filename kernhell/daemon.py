@@ -0,0 +1,183 @@
+"""
+Resident Daemon.
+Keeps the interpreter, CLI, config, provider SDKs, Playwright and a pooled
+headless browser warm, and serves forwarded CLI invocations over a local
+Unix socket (see client.py).
+
+Wire protocol (one JSON object per line):
+  client -> {"argv": [...], "cwd": "...", "tty": bool, "columns": int}
+            or {"control": "ping" | "stop"}
+  daemon -> {"out": "..."}* then {"exit": <code>}
+Jobs run one at a time: output redirection and cwd are process-wide.
+"""
+import contextlib
+import importlib
+import io
+import json
+import os
+import socket
+import threading
+import time
+
+from kernhell.client import SOCKET_PATH, send_request
+from kernhell.utils import log_info, log_success, log_warning, console
+
+# Imported once at startup so jobs never pay for them.
+WARM_MODULES = ["playwright.sync_api", "groq", "openai", "google.ai.generativelanguage", "requests"]
+
+
+class _SocketWriter(io.TextIOBase):
+    """File-like that frames writes as {"out": ...} messages to the client."""
+
+    def __init__(self, conn: socket.socket, tty: bool):
+        self._conn = conn
+        self._tty = tty
+        self._lock = threading.Lock()
+        self.broken = False
+
+    @property
+    def encoding(self):
+        return "utf-8"
+
+    def isatty(self):
+        return self._tty
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        if text and not self.broken:
+            with self._lock:
+                try:
+                    self._conn.sendall((json.dumps({"out": text}) + "\n").encode("utf-8"))
+                except OSError:
+                    # Client went away (Ctrl+C); let the job finish quietly.
+                    self.broken = True
+        return len(text)
+
+
+def is_running() -> bool:
+    return send_request({"control": "ping"}, out=io.StringIO(), connect_timeout=0.2) is not None
+
+
+def stop() -> bool:
+    return send_request({"control": "stop"}, out=io.StringIO(), connect_timeout=0.2) is not None
+
+
+class KernHellDaemon:
+    def __init__(self):
+        self._job_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self.jobs_served = 0
+        self.started = time.time()
+
+    def warm_up(self):
+        """Pays every heavy import and config read once."""
+        from kernhell import main as cli  # noqa: F401  (typer, rich, all subsystems)
+        for module in WARM_MODULES:
+            try:
+                importlib.import_module(module)
+            except Exception:
+                log_warning(f"Daemon: optional module '{module}' not available.")
+
+        from kernhell.runner import get_runner, warm_mode_enabled
+        if warm_mode_enabled():
+            get_runner().start()
+
+        from kernhell.browser import get_pool
+        get_pool().warm()
+
+    def _run_cli(self, request: dict, writer: _SocketWriter) -> int:
+        import click
+        from kernhell import main as cli
+        from kernhell.config import config
+        from kernhell.pipeline import configure_stages
+
+        # Pick up keys added or pruned by other processes since the last job.
+        config.provider_keys = config._load_keys()
+        configure_stages({})
+
+        consoles = [console, cli.console]
+        saved_widths = [c._width for c in consoles]
+        previous_cwd = os.getcwd()
+        try:
+            os.chdir(request.get("cwd") or previous_cwd)
+            for c in consoles:
+                c.width = request.get("columns") or 80
+            with contextlib.redirect_stdout(writer), contextlib.redirect_stderr(writer):
+                try:
+                    code = cli.app(args=request.get("argv", []), prog_name="kernhell", standalone_mode=False)
+                    return code if isinstance(code, int) else 0
+                except click.exceptions.Exit as e:
+                    return e.exit_code
+                except click.exceptions.Abort:
+                    return 1
+                except click.exceptions.ClickException as e:
+                    e.show(file=writer)
+                    return e.exit_code
+                except SystemExit as e:
+                    return e.code if isinstance(e.code, int) else 1
+                except Exception as e:
+                    writer.write(f"KernHell daemon: command crashed: {e}\n")
+                    return 1
+        finally:
+            os.chdir(previous_cwd)
+            for c, width in zip(consoles, saved_widths):
+                c._width = width
+
+    def _handle(self, conn: socket.socket):
+        with conn, conn.makefile("rb") as reader:
+            line = reader.readline()
+            if not line:
+                return
+            request = json.loads(line)
+            writer = _SocketWriter(conn, bool(request.get("tty")))
+
+            control = request.get("control")
+            if control:
+                if control == "stop":
+                    self._stopping.set()
+                    writer.write("KernHell daemon stopping.\n")
+                else:
+                    writer.write(f"pid={os.getpid()} jobs={self.jobs_served} uptime={time.time() - self.started:.0f}s\n")
+                code = 0
+            else:
+                with self._job_lock:
+                    code = self._run_cli(request, writer)
+                    self.jobs_served += 1
+
+            with contextlib.suppress(OSError):
+                conn.sendall((json.dumps({"exit": code}) + "\n").encode("utf-8"))
+
+        if self._stopping.is_set():
+            # Unblock accept() so serve_forever can exit.
+            with contextlib.suppress(OSError):
+                send_request({"control": "ping"}, out=io.StringIO(), connect_timeout=0.2)
+
+    def serve_forever(self):
+        if not hasattr(socket, "AF_UNIX"):
+            raise RuntimeError("Daemon mode needs Unix domain sockets (not available on this platform).")
+        if SOCKET_PATH.exists():
+            if is_running():
+                raise RuntimeError(f"A daemon is already listening on {SOCKET_PATH}.")
+            SOCKET_PATH.unlink()
+
+        SOCKET_PATH.parent.mkdir(parents=True, exist_ok=True)
+        log_info("Daemon: warming up (CLI, providers, Playwright)...")
+        self.warm_up()
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(str(SOCKET_PATH))
+        os.chmod(SOCKET_PATH, 0o600)
+        server.listen(16)
+        log_success(f"Daemon listening on {SOCKET_PATH} (pid {os.getpid()}).")
+
+        try:
+            while not self._stopping.is_set():
+                conn, _ = server.accept()
+                threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+        finally:
+            server.close()
+            with contextlib.suppress(FileNotFoundError):
+                SOCKET_PATH.unlink()
+            log_info(f"Daemon stopped after {self.jobs_served} jobs.")
@@ -1,11 +1,15 @@
 import json
+import threading
 import time
 from pathlib import Path
 from typing import List, Dict, Any
+from kernhell.lazy import LazyInstance
 
 APP_NAME = "kernhell"
 CONFIG_DIR = Path.home() / f".{APP_NAME}"
 DB_FILE = CONFIG_DIR / "db.json"
+# Passing-run durations kept per file (newest last) for adaptive timeouts.
+MAX_DURATION_SAMPLES = 20
 
 class DatabaseManager:
     """
@@ -13,6 +17,7 @@ class DatabaseManager:
     Stores 'SaaS' metrics: specific runs, errors fixed, time saved.
     """
     def __init__(self):
+        self._lock = threading.Lock()  # Parallel heal workers share one DB file
         self._ensure_db()
 
     def _ensure_db(self):
@@ -32,6 +37,10 @@ class DatabaseManager:
 
     def log_run(self, file_path: str, error: str, healed: bool, model_used: str):
         """Logs a test run to the local DB."""
+        with self._lock:
+            self._append_run(file_path, error, healed, model_used)
+
+    def _append_run(self, file_path: str, error: str, healed: bool, model_used: str):
         db = self._load_db()
         
         record = {
@@ -52,6 +61,19 @@ class DatabaseManager:
             
         self._save_db(db)
 
+    def record_duration(self, file_path: str, seconds: float):
+        """Records how long a passing run of file_path took."""
+        with self._lock:
+            db = self._load_db()
+            samples = db.setdefault("durations", {}).setdefault(str(file_path), [])
+            samples.append(round(seconds, 3))
+            del samples[:-MAX_DURATION_SAMPLES]
+            self._save_db(db)
+
+    def get_durations(self, file_path: str) -> List[float]:
+        """Recent passing-run durations for file_path, oldest first."""
+        return self._load_db().get("durations", {}).get(str(file_path), [])
+
     def get_stats(self):
         db = self._load_db()
         return db.get("stats", {})
@@ -60,5 +82,5 @@ class DatabaseManager:
         db = self._load_db()
         return db.get("runs", [])[-limit:]
 
-# Global Instance
-db = DatabaseManager()
+# Global Instance (built on first access)
+db = LazyInstance(DatabaseManager)
@@ -0,0 +1,69 @@
+"""
+DOM Snapshot.
+A compact, pruned text view of the failing page: visible interactive elements
+with their role, id, test id, name and text. Text-only models (Groq,
+Cloudflare) can fix most selector failures from this alone, so far fewer
+requests need a slow vision model.
+
+Stdlib only: it also runs inside the instrumented test process (instrument.py).
+"""
+from typing import Dict, List
+
+MAX_ELEMENTS = 150
+MAX_CHARS = 6000
+
+_SNAPSHOT_JS = """
+(maxItems) => {
+  const selector = 'a,button,input,select,textarea,summary,label,h1,h2,h3,[role],[data-testid],[data-test],[data-qa],[onclick],[contenteditable="true"]';
+  const clean = (s) => (s || '').replace(/\\s+/g, ' ').trim().slice(0, 80);
+  const items = [];
+  for (const el of document.querySelectorAll(selector)) {
+    if (items.length >= maxItems) break;
+    const rect = el.getBoundingClientRect();
+    const style = getComputedStyle(el);
+    if (rect.width === 0 || rect.height === 0 || style.visibility === 'hidden' || style.display === 'none') continue;
+    items.push({
+      tag: el.tagName.toLowerCase(),
+      id: el.id || '',
+      testid: el.getAttribute('data-testid') || el.getAttribute('data-test') || el.getAttribute('data-qa') || '',
+      role: el.getAttribute('role') || '',
+      name: el.getAttribute('name') || '',
+      type: el.getAttribute('type') || '',
+      placeholder: el.getAttribute('placeholder') || '',
+      label: clean(el.getAttribute('aria-label')),
+      text: clean(el.innerText || el.value),
+    });
+  }
+  return {url: location.href, title: document.title, items};
+}
+"""
+
+
+def format_snapshot(data: Dict, max_chars: int = MAX_CHARS) -> str:
+    """One line per element, e.g. `button#login [data-testid=submit] "Log in"`."""
+    lines: List[str] = [f"URL: {data.get('url', '')}", f"TITLE: {data.get('title', '')}"]
+    used = sum(len(line) + 1 for line in lines)
+    for item in data.get("items", []):
+        line = item["tag"] + (f"#{item['id']}" if item["id"] else "")
+        for attr in ("testid", "role", "name", "type", "placeholder"):
+            if item.get(attr):
+                key = "data-testid" if attr == "testid" else attr
+                line += f" [{key}={item[attr]}]"
+        if item.get("label"):
+            line += f" [aria-label={item['label']}]"
+        if item.get("text"):
+            line += f' "{item["text"]}"'
+        if used + len(line) + 1 > max_chars:
+            lines.append("... (truncated)")
+            break
+        lines.append(line)
+        used += len(line) + 1
+    return "\n".join(lines)
+
+
+def snapshot_page(page, max_elements: int = MAX_ELEMENTS, max_chars: int = MAX_CHARS) -> str:
+    """Extracts the snapshot from a live Playwright page. Empty string on failure."""
+    try:
+        return format_snapshot(page.evaluate(_SNAPSHOT_JS, max_elements), max_chars)
+    except Exception:
+        return ""
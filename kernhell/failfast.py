@@ -0,0 +1,110 @@
+"""
+Early Failure Detection.
+A Playwright test that has already printed its fatal traceback can keep the
+browser (and the Playwright driver) alive for many seconds before the process
+exits. Test output is streamed line by line through a FailureWatch; once a
+terminal failure signature has been printed and the process has not exited
+within a short grace period, the runner kills it and returns the partial
+output right away.
+
+Terminal signatures:
+- an uncaught exception: "Traceback (most recent call last):" followed by the
+  unindented "SomeError: message" line that ends it
+- a fatal Playwright driver/browser error line (e.g. "Target page, context or
+  browser has been closed")
+
+Any stdout after the signature means the test caught the error and carried
+on, so the watch disarms. The grace period only counts quiet time: every
+later stderr line restarts it. A traceback printed right after a logging
+record line (what logging.exception() writes first, e.g. "ERROR:root:...") is
+taken as logged, not uncaught, and never trips the watch. Stdlib only.
+"""
+import os
+import re
+import time
+from typing import Optional
+
+EARLY_KILL_ENABLED = os.environ.get("KERNHELL_EARLY_KILL", "1") != "0"
+# Seconds a test gets to exit on its own after printing a terminal failure.
+EARLY_KILL_GRACE = float(os.environ.get("KERNHELL_EARLY_KILL_GRACE", "1.0"))
+
+_TRACEBACK_START = "Traceback (most recent call last):"
+_CHAIN_MARKERS = (
+    "During handling of the above exception",
+    "The above exception was the direct cause",
+)
+# Final line of a traceback: a (dotted) exception name at column 0.
+_EXCEPTION_LINE = re.compile(r"^[A-Za-z_][\w.]*(Error|Exception|Exit|Interrupt|Timeout)\b(:|$)")
+# A logging record (default "ERROR:root:msg", "... - ERROR - msg", "[ERROR] msg", pytest's "ERROR    name:...").
+_LOG_RECORD = re.compile(r"(?:^|[\s\[|:-])(?:CRITICAL|ERROR|EXCEPTION|WARNING|FATAL)(?:[\s\]|:-]|$)")
+FATAL_LINES = [
+    re.compile(r"Target page, context or browser has been closed"),
+    re.compile(r"Browser closed\.?$"),
+    re.compile(r"Playwright connection closed"),
+]
+
+
+class FailureWatch:
+    def __init__(self, grace: float = EARLY_KILL_GRACE, enabled: bool = EARLY_KILL_ENABLED):
+        self.grace = grace
+        self.enabled = enabled
+        self.signature: Optional[str] = None
+        self._tripped_at: Optional[float] = None
+        self._in_traceback = False
+        self._logged = False      # the current traceback was written by logging.exception()
+        self._after_log = False   # the previous line was a stderr log record
+        self._chained = False     # a chain marker follows the last traceback
+
+    def feed(self, line: str, stream: str = "stderr"):
+        """Feeds one output line; stream is "stdout" or "stderr"."""
+        if not self.enabled:
+            return
+        line = line.rstrip("\r\n")
+        if stream == "stdout":
+            # The test is still doing work: it handled the failure itself.
+            if line.strip():
+                self._after_log = self._chained = False
+                if self._tripped_at is not None:
+                    self._tripped_at = None
+                    self.signature = None
+            return
+
+        if self._tripped_at is not None and line.strip():
+            # Still printing: the grace period counts from the last output.
+            self._tripped_at = time.monotonic()
+        if line.startswith(_TRACEBACK_START):
+            # A chained traceback belongs to the one before it.
+            if not self._in_traceback and not self._chained:
+                self._logged = self._after_log
+            self._in_traceback = True
+            self._after_log = self._chained = False
+            return
+        if self._in_traceback and line and not line[0].isspace():
+            if line.startswith(_CHAIN_MARKERS):
+                return
+            if _EXCEPTION_LINE.match(line):
+                self._in_traceback = False
+                if not self._logged:
+                    self._trip(line)
+            return
+        if not self._in_traceback:
+            if line.startswith(_CHAIN_MARKERS):
+                self._chained = True
+            elif line.strip():
+                self._chained = False
+            self._after_log = bool(_LOG_RECORD.search(line))
+        if any(pattern.search(line) for pattern in FATAL_LINES):
+            self._trip(line.strip())
+
+    def _trip(self, line: str):
+        if self._tripped_at is None:
+            self._tripped_at = time.monotonic()
+            self.signature = line[:200]
+
+    @property
+    def tripped(self) -> bool:
+        return self._tripped_at is not None
+
+    def should_kill(self) -> bool:
+        """True once a terminal failure was printed and the grace period has passed."""
+        return self._tripped_at is not None and time.monotonic() - self._tripped_at >= self.grace
@@ -0,0 +1,44 @@
+"""
+Cross-Process File Locks.
+State files under ~/.kernhell (keys.json, manifest.json) are read-modify-written
+by concurrent kernhell processes: CI shards, watch plus heal, parallel
+add-key/prune calls. file_lock() serializes those updates across threads and
+processes with an advisory lock on a sibling .lock file.
+"""
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict
+
+_thread_locks: Dict[str, threading.Lock] = {}
+_thread_locks_guard = threading.Lock()
+
+
+def _thread_lock(path: Path) -> threading.Lock:
+    with _thread_locks_guard:
+        return _thread_locks.setdefault(str(path), threading.Lock())
+
+
+@contextmanager
+def file_lock(lock_path: Path):
+    """Exclusive lock on lock_path across threads and processes."""
+    with _thread_lock(lock_path):
+        lock_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(lock_path, "a+") as handle:
+            if os.name == "nt":
+                import msvcrt
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+                try:
+                    yield
+                finally:
+                    handle.seek(0)
+                    msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(handle, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
@@ -0,0 +1,153 @@
+"""
+Persistent Fix Cache.
+The same broken snippet failing with the same error comes back again and
+again (reverted branches, copy-pasted tests, CI re-runs). The cache maps
+(normalized code, normalized error signature) -> AI fix, so a repeat is
+patched without an LLM round trip.
+
+- Code is normalized for whitespace only; comments and strings still count
+- Error signatures drop line numbers, paths, temp dirs, addresses,
+  timestamps and durations, which differ between otherwise identical runs
+- Each entry records whether its fix passed verification; known-bad fixes
+  are never served again
+- Total size is capped with LRU eviction
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from kernhell.router_stats import key_id
+
+APP_NAME = "kernhell"
+CONFIG_DIR = Path.home() / f".{APP_NAME}"
+CACHE_FILE = CONFIG_DIR / "fix_cache.json"
+
+FIX_CACHE_ENABLED = os.environ.get("KERNHELL_FIX_CACHE", "1") != "0"
+DEFAULT_MAX_BYTES = int(float(os.environ.get("KERNHELL_FIX_CACHE_MB", "20")) * 1024 * 1024)
+
+# (pattern, replacement) applied in order to build the error signature.
+_ERROR_NORMALIZERS = [
+    (re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(\.\d+)?(Z|[+-]\d{2}:?\d{2})?"), "<ts>"),
+    (re.compile(r"\b\d{2}:\d{2}:\d{2}(\.\d+)?\b"), "<time>"),
+    (re.compile(r"(/tmp|/var/folders|/private/var|[A-Za-z]:\\[^\s\"']*\\Temp)[^\s\"':]*"), "<tmp>"),
+    (re.compile(r"File \"[^\"]*[/\\]([^/\\\"]+)\""), r'File "\1"'),
+    (re.compile(r"(?<![\w.])(/[^\s\"':]+/)+([^\s\"':/]+)"), r"\2"),
+    (re.compile(r"\bline \d+"), "line <n>"),
+    (re.compile(r"(\.py):\d+(:\d+)?"), r"\1:<n>"),
+    (re.compile(r"\b0x[0-9a-fA-F]+\b"), "<addr>"),
+    (re.compile(r"\bin \d+(\.\d+)?s\b"), "in <t>s"),
+    (re.compile(r"kernhell-run-\w+"), "<tmp>"),
+]
+
+
+def normalize_code(code: str) -> str:
+    lines = [line.rstrip() for line in code.replace("\r\n", "\n").split("\n")]
+    return "\n".join(line for line in lines if line)
+
+
+def error_signature(error: str) -> str:
+    """The error with run-specific noise stripped; see _ERROR_NORMALIZERS."""
+    text = error.replace("\r\n", "\n")
+    for pattern, replacement in _ERROR_NORMALIZERS:
+        text = pattern.sub(replacement, text)
+    lines = [line.strip() for line in text.split("\n")]
+    return "\n".join(line for line in lines if line)
+
+
+def cache_key(code: str, error: str) -> str:
+    digest = hashlib.sha256(normalize_code(code).encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(error_signature(error or "").encode("utf-8"))
+    return digest.hexdigest()
+
+
+class FixCache:
+    """
+    Persistent map: key -> {fix, provider, key_id, verified, hits, created, accessed, size}.
+    key_id is the hash of the API key that wrote the fix (router_stats.key_id), never the key.
+    `verified` is None until the fix has been run, then True/False.
+    """
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, enabled: bool = FIX_CACHE_ENABLED):
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, Dict]] = None
+
+    def _load(self) -> Dict[str, Dict]:
+        if self._entries is None:
+            try:
+                with open(CACHE_FILE, "r") as f:
+                    self._entries = json.load(f).get("fixes", {})
+            except (json.JSONDecodeError, FileNotFoundError):
+                self._entries = {}
+        return self._entries
+
+    def _save(self):
+        CONFIG_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_path = CACHE_FILE.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"fixes": self._entries}, f)
+        os.replace(tmp_path, CACHE_FILE)
+
+    def get(self, code: str, error: str) -> Optional[str]:
+        """Cached fix for this code + error, unless it is known to fail verification."""
+        if not self.enabled:
+            return None
+        key = cache_key(code, error)
+        with self._lock:
+            entry = self._load().get(key)
+            if not entry or entry.get("verified") is False:
+                return None
+            entry["hits"] = entry.get("hits", 0) + 1
+            entry["accessed"] = time.time()
+            self._save()
+            return entry["fix"]
+
+    def put(self, code: str, error: str, fix: str, provider: str = None, key: str = None):
+        if not self.enabled or not fix:
+            return
+        api_key_id = key_id(key) if key else None
+        key = cache_key(code, error)
+        now = time.time()
+        with self._lock:
+            entries = self._load()
+            entries[key] = {
+                "fix": fix, "provider": provider, "key_id": api_key_id, "verified": None, "hits": 0,
+                "created": now, "accessed": now, "size": len(fix) + len(key),
+            }
+            self._evict(entries)
+            self._save()
+
+    def mark(self, code: str, error: str, passed: bool) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Records whether the fix cached for this code + error made the test pass.
+        Returns (provider, key_id) of whoever wrote the fix, each None if unknown.
+        """
+        if not self.enabled:
+            return None, None
+        key = cache_key(code, error)
+        with self._lock:
+            entry = self._load().get(key)
+            if entry is None:
+                return None, None
+            entry["verified"] = passed
+            self._save()
+            return entry.get("provider"), entry.get("key_id")
+
+    def _evict(self, entries: Dict[str, Dict]):
+        """Drops least-recently-used entries until under the size cap."""
+        total = sum(e["size"] for e in entries.values())
+        for key, entry in sorted(entries.items(), key=lambda item: item[1]["accessed"]):
+            if total <= self.max_bytes:
+                break
+            total -= entry["size"]
+            del entries[key]
+
+
+# Global Instance
+fix_cache = FixCache()
@@ -0,0 +1,182 @@
+"""
+Warm Test Forkserver (server side).
+A long-lived interpreter that pre-imports Playwright once, then forks a clean
+child per test run. Stdlib only; started by kernhell.runner.
+
+Protocol (JSON lines over stdin/stdout):
+  -> {"op": "run", "id": n, "path": ..., "cwd": ..., "stdout": file, "stderr": file,
+      "timeout": secs, "capture_dir": dir | null}
+  -> {"op": "kill", "id": n}
+  <- {"ready": true}                              once warm
+  <- {"id": n, "returncode": int, "timed_out": bool}  when the child exits
+"""
+import json
+import os
+import runpy
+import select
+import signal
+import sys
+import time
+import traceback
+from typing import Callable, Optional
+
+PRELOAD_MODULES = ["playwright.sync_api"]
+_INSTRUMENT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "instrument.py")
+
+
+def _preload():
+    for module in PRELOAD_MODULES:
+        try:
+            __import__(module)
+        except Exception:
+            pass
+
+
+def run_as_main(path: str, on_exit: Optional[Callable[[Optional[BaseException]], None]] = None) -> int:
+    """
+    Executes a script as __main__ in this process and returns its exit code.
+    on_exit gets the exception that ended the script (None on a clean exit)
+    before its traceback is printed.
+    """
+    sys.argv = [path]
+    sys.path[0] = os.path.dirname(path)
+    try:
+        runpy.run_path(path, run_name="__main__")
+        _notify(on_exit, None)
+        return 0
+    except SystemExit as e:
+        failed = e.code is not None and e.code != 0
+        _notify(on_exit, e if failed else None)
+        if e.code is None:
+            return 0
+        if isinstance(e.code, int):
+            return e.code
+        print(e.code, file=sys.stderr)
+        return 1
+    except BaseException as exc:
+        _notify(on_exit, exc)
+        _print_user_traceback(exc, path)
+        return 1
+
+
+def _notify(on_exit, exc: Optional[BaseException]):
+    if on_exit is not None:
+        try:
+            on_exit(exc)
+        except Exception:
+            pass
+
+
+def _run_child(request: dict):
+    """Runs in the forked child: behaves like `python <path>`, never returns."""
+    code = 1
+    try:
+        # Own process group, so a kill also takes down the browser it launched.
+        os.setpgrp()
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)
+        for fd, target in ((1, request["stdout"]), (2, request["stderr"])):
+            out = os.open(target, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            os.dup2(out, fd)
+            os.close(out)
+        # Line-buffered like a terminal, so the runner can follow output as it happens.
+        sys.stdout.reconfigure(line_buffering=True)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+
+        path = request["path"]
+        os.chdir(request.get("cwd") or os.path.dirname(path))
+        on_exit = None
+        if request.get("capture_dir"):
+            from kernhell.instrument import install, finalize
+            install(request["capture_dir"])
+            on_exit = finalize
+        code = run_as_main(path, on_exit)
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(code)
+
+
+def _print_user_traceback(exc: BaseException, path: str):
+    """Prints the traceback starting at the test file, exactly like `python <path>` would."""
+    tb = exc.__traceback__
+    while tb is not None and tb.tb_frame.f_code.co_filename != path:
+        tb = tb.tb_next
+    report = traceback.TracebackException(type(exc), exc, tb or exc.__traceback__)
+    # Hide the live-capture wrappers (instrument.py) so the log reads like a plain run.
+    report.stack = traceback.StackSummary.from_list(
+        [frame for frame in report.stack if frame.filename != _INSTRUMENT_FILE]
+    )
+    sys.stderr.write("".join(report.format()))
+
+
+def _kill_group(pid: int):
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+
+def serve():
+    _preload()
+    out = sys.stdout
+    stdin_fd = sys.stdin.fileno()
+
+    def _send(message: dict):
+        out.write(json.dumps(message) + "\n")
+        out.flush()
+
+    children = {}  # pid -> [request id, deadline, timed_out]
+    buffer = b""
+    _send({"ready": True})
+
+    while True:
+        readable, _, _ = select.select([stdin_fd], [], [], 0.05)
+        if readable:
+            chunk = os.read(stdin_fd, 65536)
+            if not chunk:
+                break  # Parent went away.
+            buffer += chunk
+            while b"\n" in buffer:
+                line, buffer = buffer.split(b"\n", 1)
+                request = json.loads(line)
+                if request.get("op") == "run":
+                    pid = os.fork()
+                    if pid == 0:
+                        _run_child(request)
+                    children[pid] = [request["id"], time.monotonic() + float(request.get("timeout", 60)), False]
+                elif request.get("op") == "kill":
+                    for pid, state in children.items():
+                        if state[0] == request["id"]:
+                            _kill_group(pid)
+
+        now = time.monotonic()
+        for pid, state in children.items():
+            if not state[2] and now > state[1]:
+                state[2] = True
+                _kill_group(pid)
+
+        while children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            state = children.pop(pid, None)
+            if state:
+                _send({"id": state[0], "returncode": os.waitstatus_to_exitcode(status), "timed_out": state[2]})
+
+    for pid in list(children):
+        _kill_group(pid)
+
+
+if __name__ == "__main__":
+    serve()
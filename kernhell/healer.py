@@ -5,100 +5,149 @@ Orchestrates AI providers with:
 - Key rotation + provider failover
 - Optimized single-shot accuracy
 """
-from kernhell.config import config
-from kernhell.providers import get_provider_fn, get_model_name, supports_vision
-from kernhell.utils import log_info, log_warning, log_error, console
-from typing import Optional
+import ast
+import os
+import queue
+import threading
+from kernhell.clients import MAX_INFLIGHT_PER_PROVIDER
+from kernhell.config import config, SUPPORTED_PROVIDERS
+from kernhell.fix_cache import fix_cache
+from kernhell.key_scheduler import key_scheduler, estimate_tokens
+from kernhell.patcher import apply_edits, is_edit_response
+from kernhell.router_stats import router_stats
+from kernhell.streaming import StreamCancelled, cancel_scope
+from kernhell.providers import get_provider_fn, get_model_name, supports_vision, VISION_CAPABLE, SYSTEM_PROMPT
+from kernhell.utils import log_info, log_warning, log_error, log_success, console, get_log_prefix, set_log_prefix
+import time
+from typing import List, Optional, Tuple
 
+_provider_slots = {p: threading.BoundedSemaphore(MAX_INFLIGHT_PER_PROVIDER) for p in SUPPORTED_PROVIDERS}
 
-def get_ai_fix(code_content: str, error_log: str, screenshot_b64: str = None, feedback_context: str = "") -> str:
+# Per-thread record of which provider wrote the last fix (see last_provider()).
+_last_call = threading.local()
+
+# Hedged requests: "off", "on" (hedge after HEDGE_AFTER seconds) or "aggressive" (race at once).
+HEDGE_MODE = os.environ.get("KERNHELL_HEDGE", "off").lower()
+HEDGE_AFTER = float(os.environ.get("KERNHELL_HEDGE_AFTER", "8"))
+HEDGE_WIDTH = int(os.environ.get("KERNHELL_HEDGE_WIDTH", "2"))
+
+# "edits": ask for SEARCH/REPLACE blocks, applied to the file by the patcher (a mismatch falls back
+# to a full-script request); "full": always the full script.
+RESPONSE_FORMAT = os.environ.get("KERNHELL_RESPONSE_FORMAT", "edits").lower()
+
+
+def get_ai_fix(code_content: str, error_log: str, screenshot: bytes = None, feedback_context: str = "",
+               dom_snapshot: str = "", excerpt: bool = False, avoid_provider: Optional[str] = None) -> str:
     """
     Multi-Provider AI Fix Engine with Vision Support.
+    `screenshot` is raw image bytes; each provider resizes/encodes it for its own budget.
+    `dom_snapshot` is a compact element list of the failing page, sent to every provider.
     Accepts optional feedback_context for retry loops.
+    `excerpt` marks code_content as part of a larger file; the model is told to return only that part.
+    `avoid_provider` is tried last (a "second opinion" after its fix failed).
+    A verified-or-untested fix for the same code + error is served from the fix cache.
+    Returns the full fixed code, or (in "edits" mode) edit blocks that apply to
+    code_content; see patcher.apply_edit_blocks / apply_edits.
     """
+    cached = fix_cache.get(code_content, error_log)
+    if cached:
+        log_info("Fix cache hit: reusing a previous fix for this code and error.")
+        return cached
+
     total_keys = config.get_key_count()
     if total_keys == 0:
         raise ValueError("No API Keys found! Run `kernhell config add-key <KEY> --provider <name>` first.")
 
-    # Smart Router: Auto-select best provider based on task context
-    best_provider = _router_select_provider(has_vision=bool(screenshot_b64))
-    
+    # Smart Router: Auto-select best provider based on task context.
+    # With a DOM snapshot the fast text models get first shot; retries escalate to vision.
+    # The order is local to this call: parallel workers must not steer each other's provider.
+    wants_vision = bool(screenshot) and (not dom_snapshot or bool(feedback_context))
+    provider_order = _router_rank_providers(has_vision=wants_vision)
+    if avoid_provider in provider_order and len(provider_order) > 1:
+        # Second opinion: ask everyone else first.
+        provider_order.remove(avoid_provider)
+        provider_order.append(avoid_provider)
+
     # DEBUG: Help diagnose empty provider logs
-    if best_provider:
-        log_info(f"Router suggests: '{best_provider}'")
-
-    if best_provider and best_provider != config.current_provider:
-        # Switch if the best provider is available and different
-        if config.provider_keys.get(best_provider):
-             log_info(f"Smart Switch: Routing to [{best_provider}] for optimized handling.")
-             config.current_provider = best_provider
-             config.current_key_index = 0
-
-    providers_tried = set()
-    max_provider_attempts = len(config.get_all_providers_with_keys()) + 1
-
-    for _ in range(max_provider_attempts):
-        provider = config.current_provider
-        if provider in providers_tried:
-            new_provider = config.switch_provider()
-            if not new_provider or new_provider in providers_tried:
-                break
-            provider = new_provider
+    if provider_order:
+        log_info(f"Router suggests: '{provider_order[0]}'")
+
+    # Append feedback to error log if present
+    full_error_log = error_log
+    if feedback_context:
+        full_error_log = f"{error_log}\n\n=== PREVIOUS FAILED FIX ATTEMPT ===\n{feedback_context}"
 
-        providers_tried.add(provider)
+    if HEDGE_MODE in ("on", "aggressive"):
+        ranked = provider_order[:max(1, HEDGE_WIDTH)]
+        if len(ranked) > 1:
+            winner = _hedged_fix(ranked, code_content, full_error_log, screenshot, dom_snapshot, bool(feedback_context),
+                                 excerpt)
+            if winner:
+                provider, key, fix = winner
+                _last_call.provider = provider
+                fix_cache.put(code_content, error_log, fix, provider=provider, key=key)
+                return fix
+            log_warning("Every hedged provider failed. Falling back to sequential failover...")
+
+    for provider in provider_order:
         provider_fn = get_provider_fn(provider)
         model_name = get_model_name(provider)
         keys = config.provider_keys.get(provider, [])
 
         if not keys or not provider_fn:
             log_warning(f"No keys or unsupported provider: {provider}. Skipping...")
-            new_provider = config.switch_provider()
-            if not new_provider:
-                break
             continue
 
         # Determine if we should send screenshot to this provider
-        use_vision = screenshot_b64 and supports_vision(provider)
+        use_vision = screenshot and supports_vision(provider)
         mode_label = "Vision" if use_vision else "Text"
         retry_label = " [RETRY MODE]" if feedback_context else ""
         log_info(f"Consulting {model_name} via [{provider}] ({mode_label}{retry_label})...")
 
-        # Try each key in this provider
+        # Try this provider's keys, most headroom first (see key_scheduler.py)
+        tokens = estimate_tokens(SYSTEM_PROMPT, code_content, full_error_log, dom_snapshot)
+        ranked_keys = router_stats.rank_keys(provider, keys)  # tie-break for equal headroom
+        edit_format = RESPONSE_FORMAT == "edits"
         for attempt in range(len(keys) * 2):
-            active_key = config.get_active_key()
+            active_key = key_scheduler.acquire(provider, ranked_keys, tokens)
             if not active_key:
+                log_warning(f"All [{provider}] keys are rate-limited or disabled. Trying next provider...")
                 break
 
+            started = time.monotonic()
             try:
-                # Append feedback to error log if present
-                full_error_log = error_log
-                if feedback_context:
-                    full_error_log = f"{error_log}\n\n=== PREVIOUS FAILED FIX ATTEMPT ===\n{feedback_context}"
-
-                fix = provider_fn(
-                    code_content,
-                    full_error_log,
-                    active_key,
-                    screenshot_b64=screenshot_b64 if use_vision else None
-                )
+                with _provider_slots[provider]:
+                    fix = _call_provider(
+                        provider,
+                        code_content,
+                        full_error_log,
+                        active_key,
+                        screenshot=screenshot if use_vision else None,
+                        dom_snapshot=dom_snapshot,
+                        excerpt=excerpt,
+                        edit_format=edit_format
+                    )
+                router_stats.record_call(provider, active_key, time.monotonic() - started, bool(fix))
+                key_scheduler.report_success(provider, active_key)
                 if fix:
+                    _last_call.provider = provider
+                    fix_cache.put(code_content, error_log, fix, provider=provider, key=active_key)
                     return fix
                 else:
-                    log_warning(f"Empty response from {provider}. Rotating key...")
-                    config.rotate_key()
+                    log_warning(f"Empty response from {provider}. Trying another key...")
+
+            except EditsMismatch:
+                # The key worked; the answer did not. The retry goes through acquire() like any request.
+                router_stats.record_call(provider, active_key, time.monotonic() - started, False)
+                key_scheduler.report_success(provider, active_key)
+                log_warning(f"[{provider}] edit blocks did not match the code. Asking for the full script...")
+                edit_format = False
 
             except Exception as e:
+                router_stats.record_call(provider, active_key, time.monotonic() - started, False)
+                kind = key_scheduler.report_error(provider, active_key, e)
                 error_msg = str(e)
-                log_warning(f"[{provider}] Key #{config.current_key_index + 1} Error: {error_msg[:200]}")
-                config.rotate_key()
-
-                if (attempt + 1) >= len(keys):
-                    log_warning(f"All [{provider}] keys exhausted. Trying next provider...")
-                    break
-
-        new_provider = config.switch_provider()
-        if not new_provider:
-            break
+                log_warning(f"[{provider}] Key #{keys.index(active_key) + 1} Error ({kind}): {error_msg[:200]}")
 
     raise RuntimeError(
         "All providers and keys exhausted! Add more keys:\n"
@@ -108,27 +157,207 @@ def get_ai_fix(code_content: str, error_log: str, screenshot_b64: str = None, fe
     )
 
 
+class EditsMismatch(Exception):
+    """The model's edit blocks do not match the code they were written for."""
+
+
+def _call_provider(provider: str, code_content: str, full_error_log: str, api_key: str,
+                   screenshot: Optional[bytes] = None, dom_snapshot: str = "", excerpt: bool = False,
+                   edit_format: bool = False) -> Optional[str]:
+    """
+    One fix request. With edit_format the model answers with compact edit
+    blocks; they are returned as they are once checked against `code_content`
+    (the patcher applies them to the file), and EditsMismatch is raised if they
+    do not match, so the caller can acquire a key for a full-script request.
+    Otherwise (or if the model sent a full script anyway) returns the full fixed code.
+    """
+    provider_fn = get_provider_fn(provider)
+    answer = provider_fn(code_content, full_error_log, api_key, screenshot=screenshot, dom_snapshot=dom_snapshot,
+                         edit_format=edit_format, excerpt=excerpt)
+    if edit_format and answer and is_edit_response(answer) and apply_edits(code_content, answer) is None:
+        raise EditsMismatch(f"[{provider}] edit blocks did not match the code")
+    return answer
+
+
+def last_provider() -> Optional[str]:
+    """Provider that wrote the last AI fix in this thread (each --jobs worker has its own)."""
+    return getattr(_last_call, "provider", None)
+
+
 def get_active_model_name() -> str:
-    """Returns the model name for the currently active provider."""
-    return get_model_name(config.current_provider)
+    """Returns the model name of the provider that wrote this thread's last fix (else the default)."""
+    return get_model_name(last_provider() or config.current_provider)
+
+
+def record_fix_result(code_content: str, error_log: str, passed: bool):
+    """
+    Feeds a fix's verification result back: marks the fix cache entry and
+    credits (or debits) the provider and key that wrote it in the router stats.
+    """
+    provider, key_hash = fix_cache.mark(code_content, error_log, passed)
+    if provider:
+        router_stats.record_verification(provider, passed, key_hash)
+
+
+def _router_candidates(has_vision: bool) -> List[str]:
+    available = config.get_all_providers_with_keys()
+    return [p for p in SUPPORTED_PROVIDERS if p in available and (not has_vision or p in VISION_CAPABLE)]
 
 
 def _router_select_provider(has_vision: bool) -> Optional[str]:
     """
-    Decides the optimal provider based on task requirements and key availability.
+    Decides the optimal provider based on task requirements and key availability:
+    the one with the best expected time to a verified fix (see router_stats.py).
+    """
+    ranked = router_stats.rank(_router_candidates(has_vision))
+    return ranked[0] if ranked else None
+
+
+def _router_rank_providers(has_vision: bool) -> List[str]:
+    """Providers with keys, best first: the router's pick, then by score, then the rest."""
+    available = config.get_all_providers_with_keys()
+    best = _router_select_provider(has_vision)
+    ranked = ([best] if best else []) + router_stats.rank(_router_candidates(has_vision), explore=False)
+    ranked += router_stats.rank([p for p in SUPPORTED_PROVIDERS if p in available], explore=False)
+    return [p for i, p in enumerate(ranked) if p not in ranked[:i]]
+
+
+# ============================================================
+# HEDGED REQUESTS
+# ============================================================
+
+def is_valid_fix(fix: Optional[str]) -> bool:
+    """
+    Cheap sanity check before a hedged answer may win: non-empty, parseable
+    Python, or edit blocks (_call_provider has already checked those apply).
+    """
+    if not fix or not fix.strip():
+        return False
+    if is_edit_response(fix):
+        return True
+    try:
+        ast.parse(fix)
+        return True
+    except (SyntaxError, ValueError):
+        return False
+
+
+def _ask_provider(provider: str, code_content: str, full_error_log: str, screenshot: Optional[bytes],
+                  dom_snapshot: str, is_retry: bool, cancelled: threading.Event,
+                  excerpt: bool = False) -> Optional[Tuple[str, str]]:
+    """
+    One hedge branch: tries the provider's keys through the key scheduler, without
+    touching the shared key cursor (other branches run concurrently). Stops early
+    once another branch won. Returns (key, fix) or None.
+    """
+    provider_fn = get_provider_fn(provider)
+    keys = list(config.provider_keys.get(provider, []))
+    if not provider_fn or not keys:
+        return None
+    use_vision = screenshot and supports_vision(provider)
+    log_info(f"Consulting {get_model_name(provider)} via [{provider}] "
+             f"({'Vision' if use_vision else 'Text'}{' [RETRY MODE]' if is_retry else ''}) [hedged]...")
+
+    tokens = estimate_tokens(SYSTEM_PROMPT, code_content, full_error_log, dom_snapshot)
+    ranked_keys = router_stats.rank_keys(provider, keys)
+    edit_format = RESPONSE_FORMAT == "edits"
+    for _ in range(len(keys) + (1 if edit_format else 0)):
+        key = key_scheduler.acquire(provider, ranked_keys, tokens, cancelled=cancelled)
+        if not key:
+            return None
+        if cancelled.is_set():
+            key_scheduler.release(provider, key)  # never sent: free the lease
+            return None
+        started = time.monotonic()
+        try:
+            with _provider_slots[provider], cancel_scope(cancelled):
+                if cancelled.is_set():
+                    key_scheduler.release(provider, key)
+                    return None
+                fix = _call_provider(
+                    provider,
+                    code_content,
+                    full_error_log,
+                    key,
+                    screenshot=screenshot if use_vision else None,
+                    dom_snapshot=dom_snapshot,
+                    excerpt=excerpt,
+                    edit_format=edit_format
+                )
+            router_stats.record_call(provider, key, time.monotonic() - started, is_valid_fix(fix))
+            key_scheduler.report_success(provider, key)
+            if is_valid_fix(fix):
+                return key, fix
+            log_warning(f"[{provider}] returned no usable fix. Trying next key...")
+        except StreamCancelled:
+            # Another branch won: the stream is closed; free the lease and the slot.
+            key_scheduler.release(provider, key)
+            return None
+        except EditsMismatch:
+            router_stats.record_call(provider, key, time.monotonic() - started, False)
+            key_scheduler.report_success(provider, key)
+            log_warning(f"[{provider}] edit blocks did not match the code. Asking for the full script...")
+            edit_format = False
+        except Exception as e:
+            router_stats.record_call(provider, key, time.monotonic() - started, False)
+            kind = key_scheduler.report_error(provider, key, e)
+            log_warning(f"[{provider}] Key #{keys.index(key) + 1} Error ({kind}): {str(e)[:200]}")
+    return None
+
+
+def _hedged_fix(providers: List[str], code_content: str, full_error_log: str, screenshot: Optional[bytes],
+                dom_snapshot: str, is_retry: bool, excerpt: bool = False) -> Optional[Tuple[str, str, str]]:
     """
-    available_providers = config.get_all_providers_with_keys()
-    
-    if has_vision:
-        # Priority: NVIDIA (Unified 90B) > Google (Gemini 2.0) > OpenRouter
-        if "nvidia" in available_providers: return "nvidia"
-        if "google" in available_providers: return "google"
-        if "openrouter" in available_providers: return "openrouter"
-    else:
-        # Priority: Groq (Fastest) > Cloudflare > NVIDIA > Google
-        if "groq" in available_providers: return "groq"
-        if "cloudflare" in available_providers: return "cloudflare"
-        if "nvidia" in available_providers: return "nvidia"
-        if "google" in available_providers: return "google"
-    
+    Sends the prompt to the best provider and, if it has not answered within
+    HEDGE_AFTER seconds (or immediately in aggressive mode, or as soon as it
+    fails), to the next one. The first valid fix wins. Losers that have not
+    started a request yet are cancelled; streaming ones close their stream and
+    release their lease and in-flight slot (see streaming.cancel_scope).
+    Only non-streamed requests (KERNHELL_STREAM=0) run to the end in the
+    background, and their answers are discarded.
+    Returns (provider, key, fix) of the winner, or None.
+    """
+    results: "queue.Queue" = queue.Queue()
+    cancelled = threading.Event()
+    prefix = get_log_prefix()
+    launched = 0
+
+    def _branch(provider: str):
+        set_log_prefix(prefix)
+        try:
+            answer = _ask_provider(provider, code_content, full_error_log, screenshot, dom_snapshot, is_retry,
+                                   cancelled, excerpt)
+        except Exception:
+            answer = None
+        results.put((provider, answer))
+
+    def _launch():
+        nonlocal launched
+        provider = providers[launched]
+        launched += 1
+        # Daemon threads: a hung provider must not keep the process alive at exit.
+        threading.Thread(target=_branch, args=(provider,), name=f"kernhell-hedge-{provider}", daemon=True).start()
+
+    _launch()
+    while HEDGE_MODE == "aggressive" and launched < len(providers):
+        _launch()
+
+    finished = 0
+    while finished < launched:
+        try:
+            provider, answer = results.get(timeout=HEDGE_AFTER if launched < len(providers) else None)
+        except queue.Empty:
+            log_info(f"No answer after {HEDGE_AFTER:g}s. Hedging with [{providers[launched]}]...")
+            _launch()
+            continue
+        finished += 1
+        if answer:
+            cancelled.set()
+            if launched > 1:
+                log_success(f"[{provider}] answered first; cancelling the other hedged requests.")
+            return (provider,) + answer
+        if launched < len(providers):
+            _launch()
+
+    cancelled.set()
     return None
@@ -0,0 +1,91 @@
+"""
+Screenshot Preparation.
+Full-page PNGs of long pages are megabytes each, which inflates upload time
+and vision-token cost. Before a screenshot leaves the process it is cropped to
+the top viewport, downscaled and re-encoded to fit the target provider's
+budget. Screenshots travel as raw bytes and are base64-encoded only at the
+provider edge.
+
+Pillow is optional (`pip install kernhell[images]`); without it, the PNG is
+sent unchanged if it already fits the byte cap. A screenshot that cannot be
+brought under the cap is dropped with a warning and the prompt goes out text
+only, since providers like NIM reject oversized images outright.
+"""
+import io
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+from kernhell.utils import log_warning
+
+# Per-provider budgets: pixel box, encoded byte cap and output format.
+IMAGE_BUDGETS: Dict[str, Dict] = {
+    # Gemini bills per tile; 1280 wide keeps text legible at ~2-4 tiles.
+    "google": {"max_width": 1280, "max_height": 2000, "max_bytes": 1_500_000, "format": "WEBP"},
+    # NIM rejects inline base64 images above ~180 KB.
+    "nvidia": {"max_width": 1024, "max_height": 1024, "max_bytes": 170_000, "format": "JPEG"},
+    "openrouter": {"max_width": 1280, "max_height": 1600, "max_bytes": 800_000, "format": "JPEG"},
+}
+DEFAULT_BUDGET = {"max_width": 1280, "max_height": 1600, "max_bytes": 800_000, "format": "JPEG"}
+
+_MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp", "PNG": "image/png"}
+_QUALITY_LADDER = [85, 75, 60, 45]
+
+
+def _encode(img, fmt: str, quality: int) -> bytes:
+    out = io.BytesIO()
+    if fmt == "PNG":
+        img.save(out, format="PNG", optimize=True)
+    else:
+        img.save(out, format=fmt, quality=quality)
+    return out.getvalue()
+
+
+def _unchanged(png: bytes, provider: str, budget: Dict, reason: str) -> Optional[Tuple[bytes, str]]:
+    """The PNG as-is if it fits the byte cap; otherwise None (dropped, with a warning)."""
+    if len(png) <= budget["max_bytes"]:
+        return png, "image/png"
+    log_warning(f"Screenshot is {len(png) // 1024} KB, over {provider}'s {budget['max_bytes'] // 1024} KB limit, "
+                f"and {reason}; sending the prompt without it.")
+    return None
+
+
+@lru_cache(maxsize=16)
+def prepare_image(png: bytes, provider: str) -> Optional[Tuple[bytes, str]]:
+    """
+    Fits a screenshot into the provider's budget.
+    Returns (image_bytes, mime_type), or None if it cannot be made to fit.
+    Cached, so failover to a second key or provider does not re-encode (or
+    re-warn about) the same screenshot.
+    """
+    budget = IMAGE_BUDGETS.get(provider, DEFAULT_BUDGET)
+    try:
+        from PIL import Image
+    except ImportError:
+        return _unchanged(png, provider, budget, "Pillow is not installed to shrink it (pip install kernhell[images])")
+
+    fmt = budget["format"]
+    try:
+        img = Image.open(io.BytesIO(png))
+        img.load()
+    except Exception:
+        return _unchanged(png, provider, budget, "it could not be decoded")
+
+    if fmt in ("JPEG", "WEBP") and img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+
+    # Viewport crop: keep the top of a full-page capture, measured after downscaling.
+    scale = min(1.0, budget["max_width"] / img.width)
+    max_source_height = int(budget["max_height"] / scale)
+    if img.height > max_source_height:
+        img = img.crop((0, 0, img.width, max_source_height))
+    if scale < 1.0:
+        img = img.resize((max(1, int(img.width * scale)), max(1, int(img.height * scale))), Image.LANCZOS)
+
+    for _ in range(3):
+        for quality in _QUALITY_LADDER:
+            data = _encode(img, fmt, quality)
+            if len(data) <= budget["max_bytes"]:
+                return data, _MIME_TYPES[fmt]
+        img = img.resize((max(1, int(img.width * 0.75)), max(1, int(img.height * 0.75))), Image.LANCZOS)
+    log_warning(f"Screenshot does not fit {provider}'s {budget['max_bytes'] // 1024} KB limit even after "
+                f"shrinking; sending the prompt without it.")
+    return None
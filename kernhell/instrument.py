@@ -0,0 +1,162 @@
+"""
+Live Failure Capture (runs inside the test process).
+Wraps Playwright's sync Page/Frame/Locator actions so that when one raises,
+the live page is screenshotted *before* the exception unwinds and the browser
+closes. The capture shows the state the test actually broke in, and no second
+browser launch or navigation is needed.
+
+Every failing action is captured as pending-<n>.* and tagged with its
+exception, since tests may catch Playwright errors and carry on (retry loops,
+optional popup dismissals). When the test ends, finalize() keeps only the
+capture whose exception ended it (directly or as the cause/context of the
+final error) and deletes the rest. The kept capture is written into the
+capture dir as:
+  live.png   full-page screenshot of the failing page
+  live.json  {"url": ..., "method": ..., "error": ...}
+  dom.txt    compact DOM snapshot (see dom_snapshot.py)
+
+Subprocess mode: python -m kernhell.instrument <capture_dir> <script.py>
+Forkserver mode: the forked child calls install() directly.
+"""
+import functools
+import json
+import os
+import sys
+import threading
+from typing import Optional
+
+# Actions whose failure is worth a capture. Attribute lookups and getters are skipped.
+ACTION_METHODS = [
+    "goto", "click", "dblclick", "fill", "type", "press", "press_sequentially", "check", "uncheck",
+    "select_option", "hover", "tap", "focus", "set_input_files", "drag_to", "drag_and_drop",
+    "wait_for_selector", "wait_for", "wait_for_url", "wait_for_load_state", "text_content",
+    "inner_text", "input_value", "get_attribute", "is_visible", "evaluate",
+]
+# Pending captures kept at once; a test that catches and retries drops the oldest.
+MAX_CAPTURES = 5
+# Capture files: live name -> pending suffix.
+_FILES = {"live.png": ".png", "live.json": ".json", "dom.txt": ".dom.txt"}
+
+_state = {"dir": None, "count": 0, "pending": []}  # pending: [(error, capture number)]
+_guard = threading.local()
+
+
+def _pending_path(number: int, suffix: str) -> str:
+    return os.path.join(_state["dir"], f"pending-{number}{suffix}")
+
+
+def _remove(number: int):
+    for suffix in _FILES.values():
+        try:
+            os.remove(_pending_path(number, suffix))
+        except OSError:
+            pass
+
+
+def _capture(page, method: str, error: BaseException):
+    if page is None or getattr(_guard, "active", False):
+        return
+    _guard.active = True
+    try:
+        _state["count"] += 1
+        number = _state["count"]
+        _state["pending"].append((error, number))
+        if len(_state["pending"]) > MAX_CAPTURES:
+            _remove(_state["pending"].pop(0)[1])
+        page.screenshot(path=_pending_path(number, ".png"), full_page=True, timeout=5000)
+        with open(_pending_path(number, ".json"), "w") as f:
+            json.dump({"url": page.url, "method": method, "error": str(error)[:500]}, f)
+        from kernhell.dom_snapshot import snapshot_page
+        with open(_pending_path(number, ".dom.txt"), "w", encoding="utf-8") as f:
+            f.write(snapshot_page(page))
+    except Exception:
+        pass  # Never let the instrumentation change the test's outcome.
+    finally:
+        _guard.active = False
+
+
+def _chain(exc: Optional[BaseException]):
+    """The exception and everything it was raised from or while handling."""
+    seen = []
+    pending = [exc]
+    while pending:
+        current = pending.pop()
+        if current is None or any(current is s for s in seen):
+            continue
+        seen.append(current)
+        pending += [current.__cause__, current.__context__]
+    return seen
+
+
+def finalize(exc: Optional[BaseException]):
+    """
+    Called when the test ends with `exc` (None if it passed). Promotes the
+    capture of the action that caused it to live.*; drops every other capture.
+    """
+    if _state["dir"] is None:
+        return
+    pending, _state["pending"] = _state["pending"], []
+    chain = _chain(exc)
+    for error, number in reversed(pending):
+        if any(error is e for e in chain):
+            for live, suffix in _FILES.items():
+                try:
+                    os.replace(_pending_path(number, suffix), os.path.join(_state["dir"], live))
+                except OSError:
+                    pass
+            break
+    for _, number in pending:
+        _remove(number)
+
+
+def _wrap(cls, name: str, get_page):
+    original = getattr(cls, name, None)
+    if original is None or getattr(original, "_kernhell_wrapped", False):
+        return
+
+    @functools.wraps(original)
+    def wrapper(self, *args, **kwargs):
+        try:
+            return original(self, *args, **kwargs)
+        except Exception as e:
+            try:
+                page = get_page(self)
+            except Exception:
+                page = None
+            _capture(page, f"{cls.__name__}.{name}", e)
+            raise
+
+    wrapper._kernhell_wrapped = True
+    setattr(cls, name, wrapper)
+
+
+def install(capture_dir: str) -> bool:
+    """Patches Playwright's sync API in this process. False if Playwright is missing."""
+    try:
+        from playwright.sync_api import Page, Frame, Locator
+    except Exception:
+        return False
+
+    os.makedirs(capture_dir, exist_ok=True)
+    _state["dir"] = capture_dir
+    for cls, get_page in ((Page, lambda p: p), (Frame, lambda f: f.page), (Locator, lambda l: l.page)):
+        for name in ACTION_METHODS:
+            _wrap(cls, name, get_page)
+    return True
+
+
+def main():
+    if len(sys.argv) < 3:
+        print("usage: python -m kernhell.instrument <capture_dir> <script.py>", file=sys.stderr)
+        sys.exit(2)
+    from kernhell.forkserver import run_as_main
+
+    capture_dir, path = sys.argv[1], os.path.abspath(sys.argv[2])
+    install(capture_dir)
+    code = run_as_main(path, finalize)
+    sys.stdout.flush()
+    sys.exit(code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""
+Rate-Limit-Aware Key Scheduler.
+Replaces blind key rotation. Every (provider, key) gets:
+
+- token buckets for requests/minute and tokens/minute, debited up front with
+  an estimate of the prompt size
+- a cooldown after a 429/quota response: the server's Retry-After when it
+  sends one, otherwise exponential backoff
+- a circuit breaker that takes a key out of rotation after repeated auth
+  failures, then lets a single probe through after the open period
+
+`acquire()` hands out the least busy key and waits (bounded) when every key
+is cooling down, instead of burning through them in a tight loop. Leases,
+cooldowns and breakers are shared with other local processes (key_store.py).
+Per-minute limits default to the providers' free tiers; override with e.g.
+KERNHELL_KEY_LIMITS="groq=30/12000,google=15/1000000" (requests/tokens per minute).
+"""
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from kernhell.key_store import key_store
+from kernhell.router_stats import key_id
+
+# (requests per minute, tokens per minute) per key.
+DEFAULT_LIMITS: Dict[str, Tuple[int, int]] = {
+    "google": (15, 1_000_000),
+    "groq": (30, 12_000),
+    "openrouter": (20, 200_000),
+    "cloudflare": (300, 1_000_000),
+    "nvidia": (40, 200_000),
+}
+FALLBACK_LIMITS = (20, 200_000)
+
+MAX_WAIT = float(os.environ.get("KERNHELL_KEY_MAX_WAIT", "30"))
+BACKOFF_BASE = 5.0
+BACKOFF_CAP = 300.0
+AUTH_FAILURE_THRESHOLD = 2
+BREAKER_OPEN_SECONDS = 600.0
+BREAKER_OPEN_CAP = 3600.0
+TRANSIENT_BACKOFF = 2.0
+
+_RATE_LIMIT_TEXT = re.compile(r"\b429\b|rate.?limit|quota|resource.?exhausted|too many requests", re.IGNORECASE)
+_AUTH_TEXT = re.compile(
+    r"\b401\b|\b403\b|invalid.{0,20}api.?key|api.?key.{0,20}(invalid|not valid)|unauthori[sz]ed|permission.?denied|authentication",
+    re.IGNORECASE,
+)
+_RETRY_TEXT = re.compile(r"retry(?:[ _-]?after|[ _]?delay|\s+in)\W{0,4}(\d+(?:\.\d+)?)\s*(ms|s)?", re.IGNORECASE)
+
+
+def _parse_limits(spec: str) -> Dict[str, Tuple[int, int]]:
+    limits = dict(DEFAULT_LIMITS)
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        try:
+            provider, values = item.split("=", 1)
+            rpm, _, tpm = values.partition("/")
+            limits[provider.strip()] = (int(rpm), int(tpm) if tpm else limits.get(provider.strip(), FALLBACK_LIMITS)[1])
+        except ValueError:
+            continue
+    return limits
+
+
+LIMITS = _parse_limits(os.environ.get("KERNHELL_KEY_LIMITS", ""))
+
+
+def estimate_tokens(*texts: str, completion: int = 1024) -> int:
+    """Rough prompt + completion size (~4 characters per token)."""
+    return sum(len(t or "") for t in texts) // 4 + completion
+
+
+def classify_error(error: BaseException) -> Tuple[str, Optional[float]]:
+    """Maps a provider exception to ("rate_limit" | "auth" | "transient", retry_after_seconds)."""
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    response = getattr(error, "response", None)
+    if status is None and response is not None:
+        status = getattr(response, "status_code", None)
+    retry_after = _retry_after(error, response)
+    text = str(error)
+
+    if status == 429 or _RATE_LIMIT_TEXT.search(text):
+        return "rate_limit", retry_after
+    if status in (401, 403) or _AUTH_TEXT.search(text):
+        return "auth", None
+    return "transient", retry_after
+
+
+def _retry_after(error: BaseException, response) -> Optional[float]:
+    headers = getattr(response, "headers", None) or {}
+    try:
+        value = headers.get("retry-after") or headers.get("Retry-After")
+        if value is not None:
+            return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    match = _RETRY_TEXT.search(str(error))
+    if match:
+        seconds = float(match.group(1))
+        return seconds / 1000 if (match.group(2) or "").lower() == "ms" else seconds
+    return None
+
+
+class _KeyState:
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm, self.tpm = rpm, tpm
+        self.requests = float(rpm)
+        self.tokens = float(tpm)
+        self.refilled = time.monotonic()
+        self.cooldown_until = 0.0
+        self.rate_limit_streak = 0
+        self.auth_failures = 0
+        self.breaker_until = 0.0
+        self.breaker_period = BREAKER_OPEN_SECONDS
+
+    def refill(self, now: float):
+        elapsed = now - self.refilled
+        self.refilled = now
+        self.requests = min(self.rpm, self.requests + elapsed * self.rpm / 60)
+        self.tokens = min(self.tpm, self.tokens + elapsed * self.tpm / 60)
+
+    def ready_at(self, now: float, tokens: int) -> float:
+        """Earliest time this key could take a request of `tokens` (assumes refilled at now)."""
+        wait_requests = max(0.0, (1 - self.requests) * 60 / self.rpm)
+        needed = min(tokens, self.tpm)  # an oversized prompt waits for a full bucket, not forever
+        wait_tokens = max(0.0, (needed - self.tokens) * 60 / self.tpm)
+        return max(now + wait_requests, now + wait_tokens, self.cooldown_until, self.breaker_until)
+
+    def headroom(self) -> float:
+        return min(self.requests / self.rpm, self.tokens / self.tpm)
+
+
+class KeyScheduler:
+    def __init__(self, max_wait: float = MAX_WAIT):
+        self.max_wait = max_wait
+        self._states: Dict[Tuple[str, str], _KeyState] = {}
+        # Held leases per key: (shared-store lease id, reserved tokens, was a breaker probe).
+        self._leases: Dict[Tuple[str, str], List[Tuple[Optional[int], int, bool]]] = {}
+        self._cond = threading.Condition()
+
+    def _state(self, provider: str, key: str) -> _KeyState:
+        state = self._states.get((provider, key))
+        if state is None:
+            state = _KeyState(*LIMITS.get(provider, FALLBACK_LIMITS))
+            self._states[(provider, key)] = state
+        return state
+
+    def _merge_shared(self, provider: str, keys: List[str], shared: Dict[str, Tuple[int, float, float]],
+                      now: float) -> Dict[str, int]:
+        """
+        Pulls other processes' cooldowns/breakers (a key_store snapshot) into local
+        state. Returns active lease counts per key. Call with self._cond held.
+        """
+        offset = now - time.time()  # wall clock -> monotonic
+        leases = {}
+        for key in keys:
+            count, cooldown, breaker = shared.get(key_id(key), (0, 0.0, 0.0))
+            state = self._state(provider, key)
+            if cooldown + offset > now:
+                state.cooldown_until = max(state.cooldown_until, cooldown + offset)
+            if breaker + offset > now:
+                state.breaker_until = max(state.breaker_until, breaker + offset)
+            leases[key] = count
+        return leases
+
+    def acquire(self, provider: str, keys: List[str], tokens: int, max_wait: float = None,
+                cancelled: threading.Event = None) -> Optional[str]:
+        """
+        Reserves one request + `tokens` on the least busy key: fewest leases across
+        all local processes, then most headroom, then the shared rotation order.
+        Waits up to max_wait for a key to free up; None if none does (or cancelled).
+        Every acquire must be followed by report_success, report_error or release.
+        Shared-store I/O happens outside the lock, so a slow database never
+        stalls other threads' reports.
+        """
+        if not keys:
+            return None
+        deadline = time.monotonic() + (self.max_wait if max_wait is None else max_wait)
+        start = key_store.next_rotation(provider, len(keys))
+        rotated = keys[start:] + keys[:start]
+        ids = [key_id(key) for key in keys]
+        while True:
+            shared = key_store.snapshot(provider, ids)
+            with self._cond:
+                now = time.monotonic()
+                leases = self._merge_shared(provider, keys, shared, now)
+                ready_keys, soonest = [], None
+                for key in rotated:
+                    state = self._state(provider, key)
+                    state.refill(now)
+                    ready = state.ready_at(now, tokens)
+                    if ready <= now:
+                        ready_keys.append(key)
+                    soonest = ready if soonest is None else min(soonest, ready)
+                if ready_keys:
+                    best = min(ready_keys, key=lambda k: (
+                        leases.get(k, 0), -round(self._state(provider, k).headroom(), 2), rotated.index(k)))
+                    state = self._state(provider, best)
+                    reserved = min(tokens, state.tpm)
+                    state.requests -= 1
+                    state.tokens -= reserved
+                    probe = bool(state.breaker_until)
+                    if probe:
+                        # Half-open: this request is the probe; keep others out until it reports.
+                        state.breaker_until = now + state.breaker_period
+                    break
+                if cancelled is not None and cancelled.is_set():
+                    return None
+                if soonest > deadline:
+                    return None
+                # Wake up early if another thread reports a success or a released key.
+                self._cond.wait(timeout=min(soonest - now, 1.0) if cancelled is not None else soonest - now)
+        lease_id = key_store.lease(provider, key_id(best))
+        with self._cond:
+            self._leases.setdefault((provider, best), []).append((lease_id, reserved, probe))
+        return best
+
+    def _pop_lease(self, provider: str, key: str) -> Tuple[Optional[int], int, bool]:
+        """(lease id, reserved tokens, was a breaker probe) of one held lease. Call with self._cond held."""
+        held = self._leases.get((provider, key))
+        return held.pop(0) if held else (None, 0, False)
+
+    def release(self, provider: str, key: str):
+        """
+        Gives back an acquired key whose request was never sent (e.g. a cancelled
+        hedge): frees the shared lease, refunds the reservation and, if it was a
+        breaker probe, lets the next request probe instead.
+        """
+        with self._cond:
+            lease_id, reserved, probe = self._pop_lease(provider, key)
+            state = self._state(provider, key)
+            state.requests = min(state.rpm, state.requests + 1)
+            state.tokens = min(state.tpm, state.tokens + reserved)
+            if probe and state.breaker_until:
+                state.breaker_until = time.monotonic()
+            self._cond.notify_all()
+        key_store.release(lease_id)
+
+    def report_success(self, provider: str, key: str):
+        with self._cond:
+            lease_id, _, _ = self._pop_lease(provider, key)
+            state = self._state(provider, key)
+            was_open = bool(state.breaker_until)
+            state.rate_limit_streak = 0
+            state.auth_failures = 0
+            state.breaker_until = 0.0
+            state.breaker_period = BREAKER_OPEN_SECONDS
+            self._cond.notify_all()
+        key_store.release(lease_id)
+        if was_open:
+            key_store.clear_breaker(provider, key_id(key))
+
+    def report_error(self, provider: str, key: str, error: BaseException) -> str:
+        """Applies backoff / breaker for the failure; returns its kind (see classify_error)."""
+        kind, retry_after = classify_error(error)
+        shared_cooldown = shared_breaker = 0.0
+        with self._cond:
+            lease_id, _, probe = self._pop_lease(provider, key)
+            state = self._state(provider, key)
+            now = time.monotonic()
+            to_wall = time.time() - now
+            if probe and kind != "auth" and state.breaker_until:
+                # The probe says nothing about the key's auth: let the next request probe again.
+                state.breaker_until = now
+            if kind == "rate_limit":
+                state.rate_limit_streak += 1
+                backoff = retry_after if retry_after is not None else min(
+                    BACKOFF_CAP, BACKOFF_BASE * 2 ** (state.rate_limit_streak - 1))
+                state.cooldown_until = max(state.cooldown_until, now + backoff)
+                # Quota is per key, not per process: every local run should back off.
+                shared_cooldown = state.cooldown_until + to_wall
+            elif kind == "auth":
+                state.auth_failures += 1
+                if state.auth_failures >= AUTH_FAILURE_THRESHOLD:
+                    if state.breaker_until:
+                        state.breaker_period = min(BREAKER_OPEN_CAP, state.breaker_period * 2)
+                    state.breaker_until = now + state.breaker_period
+                    shared_breaker = state.breaker_until + to_wall
+            else:
+                state.cooldown_until = max(state.cooldown_until, now + (retry_after or TRANSIENT_BACKOFF))
+            self._cond.notify_all()
+        key_store.release(lease_id)
+        if shared_cooldown or shared_breaker:
+            key_store.set_deadlines(provider, key_id(key), cooldown_until=shared_cooldown, breaker_until=shared_breaker)
+        return kind
+
+
+# Global Instance
+key_scheduler = KeyScheduler()
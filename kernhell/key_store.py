@@ -0,0 +1,175 @@
+"""
+Shared Key State Store.
+In-memory key state is per process, so concurrent `kernhell` runs on one host
+(CI shards, watch + heal, several terminals) all start on the same key and
+never see each other's 429s. This SQLite database in ~/.kernhell is shared by
+every local process and holds:
+
+- leases:    keys currently in use, so new requests go to the least busy key
+- deadlines: cooldown / circuit-breaker expiry per key (wall clock)
+- rotation:  a per-provider counter, so processes start on different keys
+
+Keys are stored as hashes (see router_stats.key_id), never in clear text.
+Every operation is one short transaction; WAL mode plus a busy timeout keeps
+concurrent writers from failing. Any database error degrades to "no shared
+state" rather than breaking a heal.
+"""
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+APP_NAME = "kernhell"
+CONFIG_DIR = Path.home() / f".{APP_NAME}"
+STORE_FILE = CONFIG_DIR / "keystate.db"
+
+# A lease outlives a crashed process by at most this long.
+LEASE_TTL = 300.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    provider TEXT NOT NULL,
+    key_id TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS leases_key ON leases (provider, key_id);
+CREATE TABLE IF NOT EXISTS deadlines (
+    provider TEXT NOT NULL,
+    key_id TEXT NOT NULL,
+    cooldown_until REAL NOT NULL DEFAULT 0,
+    breaker_until REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (provider, key_id)
+);
+CREATE TABLE IF NOT EXISTS rotation (
+    provider TEXT PRIMARY KEY,
+    position INTEGER NOT NULL
+);
+"""
+
+
+class KeyStore:
+    def __init__(self, path: Path = STORE_FILE):
+        self.path = path
+        self._local = threading.local()  # sqlite3 connections are per thread
+        self._disabled = False
+
+    def _conn(self) -> Optional[sqlite3.Connection]:
+        if self._disabled:
+            return None
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                conn = sqlite3.connect(str(self.path), timeout=10, isolation_level=None)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA busy_timeout=10000")
+                conn.executescript(_SCHEMA)
+            except sqlite3.Error:
+                self._disabled = True
+                return None
+            self._local.conn = conn
+        return conn
+
+    def _write(self, statements: List[Tuple[str, tuple]]) -> Optional[sqlite3.Cursor]:
+        """Runs statements in one IMMEDIATE transaction; returns the last cursor."""
+        conn = self._conn()
+        if conn is None:
+            return None
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            cursor = None
+            for sql, params in statements:
+                cursor = conn.execute(sql, params)
+            conn.execute("COMMIT")
+            return cursor
+        except sqlite3.Error:
+            try:
+                conn.execute("ROLLBACK")
+            except sqlite3.Error:
+                pass
+            return None
+
+    # --- Leases ---
+
+    def lease(self, provider: str, key_id: str) -> Optional[int]:
+        cursor = self._write([
+            ("DELETE FROM leases WHERE expires < ?", (time.time(),)),
+            ("INSERT INTO leases (provider, key_id, pid, expires) VALUES (?, ?, ?, ?)",
+             (provider, key_id, os.getpid(), time.time() + LEASE_TTL)),
+        ])
+        return cursor.lastrowid if cursor is not None else None
+
+    def release(self, lease_id: Optional[int]):
+        if lease_id is not None:
+            self._write([("DELETE FROM leases WHERE id = ?", (lease_id,))])
+
+    # --- Deadlines ---
+
+    def set_deadlines(self, provider: str, key_id: str, cooldown_until: float = 0.0, breaker_until: float = 0.0):
+        """Pushes wall-clock deadlines out (never pulls another process's deadline in)."""
+        self._write([(
+            "INSERT INTO deadlines (provider, key_id, cooldown_until, breaker_until) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (provider, key_id) DO UPDATE SET "
+            "cooldown_until = MAX(cooldown_until, excluded.cooldown_until), "
+            "breaker_until = MAX(breaker_until, excluded.breaker_until)",
+            (provider, key_id, cooldown_until, breaker_until),
+        )])
+
+    def clear_breaker(self, provider: str, key_id: str):
+        self._write([("UPDATE deadlines SET breaker_until = 0 WHERE provider = ? AND key_id = ?", (provider, key_id))])
+
+    def snapshot(self, provider: str, key_ids: List[str]) -> Dict[str, Tuple[int, float, float]]:
+        """key_id -> (active leases, cooldown_until, breaker_until) for the given keys."""
+        conn = self._conn()
+        if conn is None or not key_ids:
+            return {}
+        marks = ",".join("?" * len(key_ids))
+        try:
+            now = time.time()
+            result = {k: (0, 0.0, 0.0) for k in key_ids}
+            for key_id, count in conn.execute(
+                f"SELECT key_id, COUNT(*) FROM leases WHERE provider = ? AND expires >= ? AND key_id IN ({marks}) "
+                "GROUP BY key_id", (provider, now, *key_ids)):
+                result[key_id] = (count, 0.0, 0.0)
+            for key_id, cooldown, breaker in conn.execute(
+                f"SELECT key_id, cooldown_until, breaker_until FROM deadlines WHERE provider = ? AND key_id IN ({marks})",
+                (provider, *key_ids)):
+                result[key_id] = (result[key_id][0], cooldown, breaker)
+            return result
+        except sqlite3.Error:
+            return {}
+
+    # --- Rotation ---
+
+    def next_rotation(self, provider: str, modulo: int) -> int:
+        """Advances and returns the provider's shared rotation position (0 if unavailable)."""
+        if modulo <= 0:
+            return 0
+        conn = self._conn()
+        if conn is None:
+            return 0
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT position FROM rotation WHERE provider = ?", (provider,)).fetchone()
+            position = ((row[0] if row else -1) + 1) % modulo
+            conn.execute(
+                "INSERT INTO rotation (provider, position) VALUES (?, ?) "
+                "ON CONFLICT (provider) DO UPDATE SET position = excluded.position",
+                (provider, position),
+            )
+            conn.execute("COMMIT")
+            return position
+        except sqlite3.Error:
+            try:
+                conn.execute("ROLLBACK")
+            except sqlite3.Error:
+                pass
+            return 0
+
+
+# Global Instance
+key_store = KeyStore()
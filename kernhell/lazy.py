@@ -0,0 +1,42 @@
+"""
+Lazy Globals.
+Module-level managers (config, db) touch ~/.kernhell on construction. Wrapping
+them in LazyInstance keeps `from kernhell.config import config` free: the real
+object is built on first attribute access, so `kernhell version` never reads
+or creates config files.
+"""
+import threading
+from typing import Callable
+
+
+class LazyInstance:
+    """Thread-safe proxy that builds the wrapped object on first use."""
+
+    def __init__(self, factory: Callable[[], object]):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_instance", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def _get(self):
+        instance = object.__getattribute__(self, "_instance")
+        if instance is None:
+            with object.__getattribute__(self, "_lock"):
+                instance = object.__getattribute__(self, "_instance")
+                if instance is None:
+                    instance = object.__getattribute__(self, "_factory")()
+                    object.__setattr__(self, "_instance", instance)
+        return instance
+
+    def is_loaded(self) -> bool:
+        return object.__getattribute__(self, "_instance") is not None
+
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._get(), name, value)
+
+    def __repr__(self):
+        if self.is_loaded():
+            return repr(self._get())
+        return f"<lazy {object.__getattribute__(self, '_factory').__name__}>"
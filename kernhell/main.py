@@ -1,17 +1,19 @@
 import typer
 import os
 from pathlib import Path
+from typing import List
 from rich.console import Console
 from rich.panel import Panel
 from rich.table import Table
 import sys
+import time
 
 from kernhell.utils import print_banner, log_info, log_success, log_error, log_warning, log_step
 from kernhell.config import config, SUPPORTED_PROVIDERS
-from kernhell.scanner import run_test, capture_failure_screenshot
-from kernhell.healer import get_ai_fix, get_active_model_name
-from kernhell.patcher import apply_fix
 from kernhell.database import db
+from kernhell.pipeline import STAGES
+# Heal subsystems (scanner, healer, patcher, workers, ...) are imported inside
+# the commands that use them, so `kernhell version`/`help` start instantly.
 
 # Windows Unicode Fix
 if sys.platform == "win32":
@@ -66,7 +68,10 @@ def add_key(
 
 @config_app.command("list-keys")
 def list_keys():
-    """Lists all API keys grouped by provider."""
+    """Lists all API keys grouped by provider, with their live scheduler state."""
+    from kernhell.key_store import key_store
+    from kernhell.router_stats import key_id
+
     config.provider_keys = config._load_keys()
     providers_with_keys = config.get_all_providers_with_keys()
 
@@ -81,11 +86,21 @@ def list_keys():
     table.add_column("Key (Masked)", style="dim")
     table.add_column("Status", justify="center")
 
+    now = time.time()
     for provider, keys in providers_with_keys.items():
+        # Live state shared by every local kernhell process (see key_store.py).
+        shared = key_store.snapshot(provider, [key_id(k) for k in keys])
         for i, k in enumerate(keys):
             masked = k[:4] + "*" * 8 + k[-4:] if len(k) > 8 else "****"
-            is_active = (provider == config.current_provider and i == config.current_key_index)
-            status = "[bold green]Active[/bold green]" if is_active else "[dim]Ready[/dim]"
+            leases, cooldown, breaker = shared.get(key_id(k), (0, 0.0, 0.0))
+            if breaker > now:
+                status = f"[bold red]Breaker open ({breaker - now:.0f}s)[/bold red]"
+            elif cooldown > now:
+                status = f"[yellow]Cooling down ({cooldown - now:.0f}s)[/yellow]"
+            elif leases:
+                status = f"[bold green]In use ({leases})[/bold green]"
+            else:
+                status = "[dim]Ready[/dim]"
             table.add_row(provider.upper(), str(i + 1), masked, status)
 
     console.print(table)
@@ -126,24 +141,23 @@ def prune_keys():
                 log_warning(f"Dead key found: [{provider}] {masked}")
 
     if dead_keys:
+        from kernhell.clients import drop_client
         for provider, key in dead_keys:
             config.remove_key(key, provider)
+            drop_client(provider, key)
         log_success(f"Pruned {len(dead_keys)} dead keys out of {total}.")
     else:
         log_success(f"All {total} keys are healthy!")
 
 def _test_key(provider: str, key: str) -> bool:
-    """Quick validation test for a key."""
+    """Quick validation test for a key (through the same pooled clients healing uses)."""
+    from kernhell.clients import get_client
     try:
+        client = get_client(provider, key)
         if provider == "google":
-            import google.generativeai as genai
-            genai.configure(api_key=key)
-            model = genai.GenerativeModel("gemini-2.0-flash")
-            model.generate_content("Say OK")
+            client.generate_content("Say OK")
             return True
         elif provider == "groq":
-            from groq import Groq
-            client = Groq(api_key=key)
             client.chat.completions.create(
                 model="llama-3.3-70b-versatile",
                 messages=[{"role": "user", "content": "Say OK"}],
@@ -151,8 +165,6 @@ def _test_key(provider: str, key: str) -> bool:
             )
             return True
         elif provider == "openrouter":
-            from openai import OpenAI
-            client = OpenAI(base_url="https://openrouter.ai/api/v1", api_key=key)
             client.chat.completions.create(
                 model="meta-llama/llama-3.3-70b-instruct:free",
                 messages=[{"role": "user", "content": "Say OK"}],
@@ -160,25 +172,18 @@ def _test_key(provider: str, key: str) -> bool:
             )
             return True
         elif provider == "cloudflare":
-            import requests
             parts = key.split(":", 1)
             if len(parts) != 2:
                 return False
-            account_id, api_token = parts
+            account_id = parts[0]
             url = f"https://api.cloudflare.com/client/v4/accounts/{account_id}/ai/run/@cf/meta/llama-3.1-8b-instruct"
-            resp = requests.post(
+            resp = client.post(
                 url,
-                headers={"Authorization": f"Bearer {api_token}"},
                 json={"messages": [{"role": "user", "content": "Say OK"}], "max_tokens": 5},
                 timeout=15
             )
             return resp.status_code == 200
         elif provider == "nvidia":
-            from openai import OpenAI
-            client = OpenAI(
-                base_url="https://integrate.api.nvidia.com/v1",
-                api_key=key
-            )
             client.chat.completions.create(
                 model="meta/llama-3.1-8b-instruct",
                 messages=[{"role": "user", "content": "Say OK"}],
@@ -188,6 +193,41 @@ def _test_key(provider: str, key: str) -> bool:
     except Exception:
         return False
 
+# =============================================
+# DAEMON
+# =============================================
+daemon_app = typer.Typer(help="Resident daemon that keeps KernHell warm")
+app.add_typer(daemon_app, name="daemon")
+
+@daemon_app.command("start")
+def daemon_start():
+    """Runs the daemon in the foreground. `kernhell` commands forward to it while it runs."""
+    from kernhell.daemon import KernHellDaemon
+    try:
+        KernHellDaemon().serve_forever()
+    except RuntimeError as e:
+        log_error(str(e))
+        raise typer.Exit(code=1)
+    except KeyboardInterrupt:
+        pass
+
+@daemon_app.command("stop")
+def daemon_stop():
+    """Asks a running daemon to shut down."""
+    from kernhell.daemon import stop
+    if stop():
+        log_success("Daemon stopped.")
+    else:
+        log_warning("No daemon running.")
+
+@daemon_app.command("status")
+def daemon_status():
+    """Shows whether a daemon is running."""
+    from kernhell.client import send_request
+    if send_request({"control": "ping"}, connect_timeout=0.2) is None:
+        log_warning("No daemon running.")
+        raise typer.Exit(code=1)
+
 # =============================================
 # CORE COMMANDS
 # =============================================
@@ -217,11 +257,35 @@ def doctor():
         for p, keys in config.get_all_providers_with_keys().items():
             console.print(f"  [{p.upper()}]: {len(keys)} keys")
 
+    _print_router_scores()
+
     stats = db.get_stats()
     console.print(f"Runs Logged: {stats.get('total_runs', 0)}")
     console.print(f"Tests Healed: {stats.get('total_healed', 0)}")
     log_success("System Ready.")
 
+def _print_router_scores():
+    """Live router scores: expected seconds to a verified fix, best first."""
+    from kernhell.router_stats import router_stats, expected_seconds
+
+    providers = router_stats.snapshot()["providers"]
+    if not providers:
+        console.print("Router: no history yet (using default priorities).")
+        return
+    table = Table(title="Router Scores", border_style="cyan")
+    for column in ("Provider", "Latency", "Success", "Verified", "Calls", "Expected s/fix"):
+        table.add_column(column)
+    for name, entry in sorted(providers.items(), key=lambda item: expected_seconds(item[1])):
+        table.add_row(
+            name,
+            f"{entry['latency']:.1f}s",
+            f"{entry['success']:.0%}",
+            f"{entry['verified']:.0%}",
+            str(entry["calls"]),
+            f"{expected_seconds(entry):.1f}",
+        )
+    console.print(table)
+
 @app.command(name="help")
 def custom_help():
     """Displays the official Command Reference."""
@@ -237,6 +301,11 @@ def custom_help():
     core_table.add_column("Description", style="white")
     
     core_table.add_row("kernhell heal <target>", "Auto-Fix a file or folder recursively.")
+    core_table.add_row("kernhell heal <dir> --jobs N", "Heal N files in parallel.")
+    core_table.add_row("  --stage-limit llm=2", "Cap one pipeline stage (test/screenshot/llm/patch).")
+    core_table.add_row("kernhell heal <dir> --incremental", "Skip files unchanged since their last green run.")
+    core_table.add_row("kernhell heal <dir> --triage", "Parallel sweep + failure report, then heal failures only.")
+    core_table.add_row("kernhell watch <dir>", "Re-heal tests (and dependents) as you save them.")
     core_table.add_row("kernhell doctor", "Run system diagnostics & connectivity check.")
     core_table.add_row("kernhell report", "Generate HTML Dashboard of saved time.")
     core_table.add_row("kernhell version", "Show version info.")
@@ -250,6 +319,7 @@ def custom_help():
     config_table.add_row("kernhell config list-keys", "Show all active keys.")
     config_table.add_row("kernhell config remove-key", "Remove a specific key.")
     config_table.add_row("kernhell config prune", "Auto-remove dead/invalid keys.")
+    config_table.add_row("kernhell daemon start|stop|status", "Warm background daemon; commands forward to it.")
     
     console.print(Panel(grid, border_style="cyan"))
     console.print(core_table)
@@ -257,11 +327,25 @@ def custom_help():
     console.print("\n[dim]Run 'kernhell [command] --help' for details.[/dim]\n")
 
 @app.command()
-def heal(target_path: str = typer.Argument(..., help="File or Directory to heal")):
+def heal(
+    target_path: str = typer.Argument(..., help="File or Directory to heal"),
+    jobs: int = typer.Option(1, "--jobs", "-j", help="Heal up to N files in parallel."),
+    stage_limit: List[str] = typer.Option(
+        None, "--stage-limit",
+        help=f"Cap a pipeline stage, e.g. 'llm=2'. Repeatable. Stages: {', '.join(STAGES)}"
+    ),
+    incremental: bool = typer.Option(False, "--incremental", help="Skip files unchanged since their last passing run."),
+    triage_first: bool = typer.Option(False, "--triage", help="Sweep all files in parallel first, then heal only failures.")
+):
     """
     AUTO-HEAL: Recursively fixes files or directories.
     Supports 'Smart Retry' loop for 100% fix rate.
     """
+    from kernhell.healer import get_active_model_name
+    from kernhell.manifest import manifest
+    from kernhell.pipeline import configure_stages, parse_stage_limits
+    from kernhell.triage import triage
+
     # DEBUG: Is command running?
     # console.print("DEBUG: Heal command invoked.")
     
@@ -283,22 +367,54 @@ def heal(target_path: str = typer.Argument(..., help="File or Directory to heal"
     if target_path.is_dir():
         log_info(f"Scanning directory: {target_path}")
         # Find test files recursively
-        files_to_heal.extend(target_path.rglob("test_*.py"))
-        files_to_heal.extend(target_path.rglob("*_test.py"))
-        files_to_heal = sorted(list(set(files_to_heal))) # Unique & Sorted
+        files_to_heal = _discover_tests(target_path)
         if not files_to_heal:
             log_warning("No test files found in directory.")
             return
     else:
         files_to_heal = [target_path]
 
+    root = target_path if target_path.is_dir() else target_path.parent
+
+    if incremental:
+        total_found = len(files_to_heal)
+        files_to_heal = [f for f in files_to_heal if not manifest.is_fresh(f, root)]
+        skipped = total_found - len(files_to_heal)
+        if skipped:
+            log_info(f"Incremental: skipping {skipped} unchanged healthy files.")
+        if not files_to_heal:
+            log_success("Nothing changed since the last green run.")
+            return
+
+    first_runs = {}
+    if triage_first:
+        log_info(f"Triage: sweeping {len(files_to_heal)} files...")
+        swept, failures = triage(files_to_heal, max(jobs, 4))
+        for file_path, passed, stdout, stderr, _ in swept:
+            if passed:
+                db.log_run(str(file_path), None, True, get_active_model_name())
+                manifest.record(file_path, True, root)
+        manifest.flush()
+        files_to_heal = [r[0] for r in failures]
+        first_runs = {r[0]: (r[1], r[2], r[3]) for r in failures}
+        if not files_to_heal:
+            log_success("Triage: every file passes. Nothing to heal.")
+            return
+
     console.print(f"[bold cyan]Found {len(files_to_heal)} targets for healing.[/bold cyan]\n")
 
-    failure_count = 0
-    for file_path in files_to_heal:
-        if not _heal_single_file(file_path):
-            failure_count += 1
-    
+    if jobs > 1 and len(files_to_heal) > 1:
+        try:
+            configure_stages(parse_stage_limits(stage_limit, _default_stage_limits(jobs)))
+        except ValueError as e:
+            log_error(str(e))
+            raise typer.Exit(code=1)
+    else:
+        configure_stages({})
+
+    results = _heal_batch(files_to_heal, root, jobs, first_runs)
+
+    failure_count = sum(1 for _, passed, _ in results if not passed)
     if failure_count > 0:
         log_warning(f"Healing completed with {failure_count} failures.")
         raise typer.Exit(code=1)
@@ -306,22 +422,168 @@ def heal(target_path: str = typer.Argument(..., help="File or Directory to heal"
         log_success("All files processed successfully!")
 
 
-def _heal_single_file(file_path: Path) -> bool:
+@app.command()
+def watch(
+    target_path: str = typer.Argument(".", help="Directory to watch"),
+    debounce: float = typer.Option(0.75, help="Seconds of quiet before re-healing a burst of saves."),
+    jobs: int = typer.Option(1, "--jobs", "-j", help="Heal up to N changed files in parallel.")
+):
+    """
+    WATCH: Re-runs and heals tests as you save them.
+    Keeps providers and config warm between events.
+    """
+    from kernhell.pipeline import configure_stages
+    from kernhell.watcher import TreeWatcher
+
+    print_banner()
+
+    if config.get_key_count() == 0:
+        _show_onboarding()
+        raise typer.Exit(code=0)
+
+    root = Path(target_path).resolve()
+    if not root.is_dir():
+        log_error(f"Not a directory: {root}")
+        raise typer.Exit(code=1)
+
+    if jobs > 1:
+        configure_stages(_default_stage_limits(jobs))
+
+    watcher = TreeWatcher(root, debounce=debounce)
+
+    def _on_change(tests: List[Path]):
+        log_step(f"Change detected: {len(tests)} affected test(s)")
+        results = _heal_batch(tests, root, jobs)
+        healthy = sum(1 for _, passed, _ in results if passed)
+        log_info(f"{healthy}/{len(results)} healthy. Watching for changes...")
+
+    log_info(f"Watching {root} (Ctrl+C to stop)...")
+    try:
+        watcher.watch(_on_change)
+    except KeyboardInterrupt:
+        log_info("Watch stopped.")
+
+
+def _default_stage_limits(jobs: int) -> dict:
+    """Stage limits sized from the browser pool and the provider in-flight caps."""
+    from kernhell.browser import POOL_SIZE
+    from kernhell.clients import MAX_INFLIGHT_PER_PROVIDER
+    from kernhell.pipeline import default_stage_limits
+
+    providers = len(config.get_all_providers_with_keys()) or 1
+    return default_stage_limits(jobs, POOL_SIZE, MAX_INFLIGHT_PER_PROVIDER * providers)
+
+
+def _heal_batch(files_to_heal: List[Path], root: Path, jobs: int = 1, first_runs: dict = None) -> list:
+    """
+    Heals a list of files serially or on the worker pool, recording each result
+    in the manifest. Returns [(file, passed, seconds)].
+    """
+    from kernhell.manifest import manifest
+    from kernhell.pipeline import active_stages
+    from kernhell.workers import run_parallel, print_summary
+
+    first_runs = first_runs or {}
+
+    def _heal_and_record(file_path: Path) -> bool:
+        passed = _heal_single_file(file_path, first_runs.get(file_path))
+        manifest.record(file_path, passed, root)
+        return passed
+
+    started = time.perf_counter()
+    if jobs > 1 and len(files_to_heal) > 1:
+        limits = active_stages()
+        log_info(f"Parallel mode: {min(jobs, len(files_to_heal))} workers.")
+        log_info("Stage limits: " + ", ".join(f"{n}={limits.limits.get(n, jobs)}" for n in STAGES))
+        results = run_parallel(files_to_heal, jobs, _heal_and_record)
+        if limits.bottleneck():
+            log_info(f"Bottleneck stage: [bold]{limits.bottleneck()}[/bold] (raise it with --stage-limit {limits.bottleneck()}=N)")
+    else:
+        results = []
+        for file_path in files_to_heal:
+            file_started = time.perf_counter()
+            passed = _heal_and_record(file_path)
+            results.append((file_path, passed, time.perf_counter() - file_started))
+    manifest.flush()
+
+    if len(results) > 1:
+        print_summary(results, time.perf_counter() - started)
+        _print_stream_stats()
+    return results
+
+
+def _print_stream_stats():
+    """One line per provider: streamed calls, time to first token / to stop, early stops."""
+    from kernhell.streaming import stream_stats
+
+    for provider, row in sorted(stream_stats.summary().items()):
+        first = f"{row['first_token']:.1f}s" if row["first_token"] is not None else "-"
+        stops = ", ".join(f"{count} {reason}" for reason, count in sorted(row["stops"].items()))
+        log_info(f"Streaming [{provider}]: {row['calls']} calls, first token {first}, "
+                 f"done in {row['elapsed']:.1f}s avg (stops: {stops})")
+
+
+def _discover_tests(target_path: Path) -> List[Path]:
+    """Test files under a directory (test_*.py / *_test.py), unique & sorted."""
+    found = list(target_path.rglob("test_*.py")) + list(target_path.rglob("*_test.py"))
+    return sorted(set(found))
+
+
+def _status(message: str, spinner: str = "dots"):
+    """Spinner in serial mode; under --jobs, updates the worker's progress line instead."""
+    from kernhell.workers import current_reporter
+
+    reporter = current_reporter()
+    if reporter:
+        return reporter.status(message)
+    return console.status(message, spinner=spinner)
+
+
+def _heal_single_file(file_path: Path, first_run: tuple = None) -> bool:
     """
     Heals a single file with Smart Retry Loop.
+    `first_run` is an already known (passed, stdout, stderr) for attempt 1 (e.g. from triage).
     Returns True if passed (or healthy), False if failed after retries.
     """
+    from kernhell.scanner import run_test, capture_failure_context
+    from kernhell.healer import get_ai_fix, get_active_model_name, record_fix_result, last_provider
+    from kernhell.patcher import apply_fix, apply_edit_blocks, apply_edits, is_edit_response
+    from kernhell.pipeline import stage
+    from kernhell.pytest_backend import is_pytest_module, failing_node, extract_node_source, splice_node_source
+    from kernhell.context_window import extract_context, splice_context
+    from kernhell.workers import current_reporter
+
+
     str_path = str(file_path)
-    console.print(Panel(f"Target: [bold cyan]{str_path}[/bold cyan]", border_style="green"))
+    if not current_reporter():
+        console.print(Panel(f"Target: [bold cyan]{str_path}[/bold cyan]", border_style="green"))
 
     MAX_RETRIES = 3
     feedback_context = ""
     last_stderr = ""
+    # Pytest modules are healed one failing node at a time (see pytest_backend.py).
+    pytest_module = is_pytest_module(str_path)
+    node_id = None
+    # (code, error) the last applied fix was generated for; its test run verifies it.
+    pending_fix = None
+    # Provider sent to the back of the queue for a second opinion (per heal, never global).
+    avoid_provider = None
 
     for attempt in range(MAX_RETRIES + 1):
         # 1. Run Test
-        with console.status(f"[bold yellow]Running Checkup (Attempt {attempt+1}/{MAX_RETRIES+1})...[/bold yellow]", spinner="dots"):
-            passed, stdout, stderr = run_test(str_path)
+        if attempt == 0 and first_run:
+            passed, stdout, stderr = first_run
+        else:
+            with stage("test"), _status(f"[bold yellow]Running Checkup (Attempt {attempt+1}/{MAX_RETRIES+1})...[/bold yellow]", spinner="dots"):
+                passed, stdout, stderr = run_test(str_path, node_id=node_id)
+                if pending_fix:
+                    record_fix_result(*pending_fix, passed)
+                    pending_fix = None
+                if passed and node_id:
+                    # The node is fixed; re-check the module for the next failing node.
+                    log_success(f"{node_id} passes. Re-checking the whole module...")
+                    node_id = None
+                    passed, stdout, stderr = run_test(str_path)
 
         if passed:
             log_success(f"Code is healthy! ({file_path.name})")
@@ -329,21 +591,23 @@ def _heal_single_file(file_path: Path) -> bool:
             return True
 
         last_stderr = stderr
-        log_error(f"Test Failed! (Attempt {attempt+1})")
+        if pytest_module:
+            node_id = failing_node(stdout) or node_id
+        log_error(f"Test Failed! (Attempt {attempt+1}){f' [{node_id}]' if node_id else ''}")
         
         if attempt == MAX_RETRIES:
             log_error("Max retries reached. Moving to next file.")
             break
 
-        # 2. Capture Screenshot (Only on first failure or if relevant)
-        screenshot_b64 = None
+        # 2. Capture Screenshot + DOM snapshot (Only on first failure or if relevant)
+        screenshot, dom_snapshot = None, ""
         if attempt == 0 or "Timeout" in stderr or "Element" in stderr:
-             with console.status("[bold blue]Capturing Context (Screenshot)...[/bold blue]", spinner="dots"):
-                screenshot_b64 = capture_failure_screenshot(str_path)
+             with stage("screenshot"), _status("[bold blue]Capturing Context (Screenshot)...[/bold blue]", spinner="dots"):
+                screenshot, dom_snapshot = capture_failure_context(str_path)
 
         # 3. Consult AI with Feedback Loop
         try:
-            with console.status(f"[bold magenta]Consulting AI ({config.current_provider})...[/bold magenta]", spinner="earth"):
+            with _status("[bold magenta]Consulting AI...[/bold magenta]", spinner="earth"):
                 with open(file_path, "r", encoding="utf-8") as f:
                     original_code = f.read()
                 
@@ -354,24 +618,72 @@ def _heal_single_file(file_path: Path) -> bool:
                     # If stuck, switch provider for a second opinion
                     if attempt == 2:
                         log_warning("AI stuck. Switching provider for second opinion...")
-                        config.switch_provider()
-
-                fixed_code = get_ai_fix(
-                    original_code, 
-                    stderr, 
-                    screenshot_b64=screenshot_b64,
-                    feedback_context=current_feedback
-                )
+                        avoid_provider = last_provider()
+
+                # Pytest node: send only the failing test, its fixtures and imports.
+                node_source = extract_node_source(original_code, node_id) if node_id else None
+
+                # Large files: send the failing region and imports (see context_window.py).
+                window = extract_context(original_code, stderr, str_path) if not node_source else None
+
+                code_for_ai = node_source or (window.snippet if window else original_code)
+                with stage("llm"):
+                    fixed_code = get_ai_fix(
+                        code_for_ai, 
+                        stderr, 
+                        screenshot=screenshot,
+                        feedback_context=current_feedback,
+                        dom_snapshot=dom_snapshot,
+                        excerpt=bool(node_source or window),
+                        avoid_provider=avoid_provider
+                    )
 
                 if not fixed_code:
                      log_error("AI could not generate a fix.")
                      return False
 
+                edits = None
+                if is_edit_response(fixed_code):
+                    # Edit blocks go straight into the file (step 4). The merged text is
+                    # only the fallback for when the file no longer matches them.
+                    edits, fixed_code = fixed_code, apply_edits(code_for_ai, fixed_code)
+
+                if node_source and fixed_code:
+                    fixed_code = splice_node_source(original_code, fixed_code, node_id)
+                    if not fixed_code and not edits:
+                        log_error(f"AI fix for {node_id} could not be merged back into the module.")
+                        return False
+                elif window and fixed_code:
+                    spliced = splice_context(original_code, fixed_code, window)
+                    if not spliced and not edits:
+                        log_warning("AI fix for the excerpt did not fit back into the file. Retrying with the whole file...")
+                        code_for_ai = original_code
+                        with stage("llm"):
+                            spliced = get_ai_fix(
+                                code_for_ai,
+                                stderr,
+                                screenshot=screenshot,
+                                feedback_context=current_feedback,
+                                dom_snapshot=dom_snapshot,
+                                avoid_provider=avoid_provider
+                            )
+                        if spliced and is_edit_response(spliced):
+                            edits, spliced = spliced, apply_edits(original_code, spliced)
+                    if not spliced and not edits:
+                        log_error("AI could not generate a fix.")
+                        return False
+                    fixed_code = spliced
+
             # 4. Patch
             log_step("Applying Surgical Fix...")
-            if not apply_fix(str_path, fixed_code, stderr):
+            with stage("patch"):
+                patched = apply_edit_blocks(str_path, edits) if edits else False
+                if not patched and fixed_code:
+                    patched = apply_fix(str_path, fixed_code, stderr)
+            if not patched:
                 log_error("Patching failed.")
                 return False
+            pending_fix = (code_for_ai, stderr)
 
         except Exception as e:
             log_error(f"Healing process crashed: {e}")
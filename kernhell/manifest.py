@@ -0,0 +1,184 @@
+"""
+Incremental Run Manifest.
+Remembers the last result of every test file keyed by a content fingerprint:
+the file's own hash plus the hashes of the local modules it imports.
+`kernhell heal --incremental` skips files whose fingerprint is unchanged and green.
+
+Results are buffered and written in batches (every KERNHELL_MANIFEST_FLUSH
+records, default 50, and at the end of a batch/process). Each write re-reads
+the file under a file lock and merges, so concurrent processes (watch + heal,
+CI shards) keep each other's entries.
+"""
+import ast
+import atexit
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+from kernhell.filelock import file_lock
+
+APP_NAME = "kernhell"
+CONFIG_DIR = Path.home() / f".{APP_NAME}"
+MANIFEST_FILE = CONFIG_DIR / "manifest.json"
+MANIFEST_LOCK_FILE = CONFIG_DIR / "manifest.lock"
+FLUSH_EVERY = max(1, int(os.environ.get("KERNHELL_MANIFEST_FLUSH", "50")))
+
+
+def _hash_file(path: Path) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _resolve_module(module: str, search_dirs: List[Path]) -> Optional[Path]:
+    """Maps a dotted module name to a local .py file, or None for third-party/stdlib."""
+    rel = Path(*module.split("."))
+    for base in search_dirs:
+        for candidate in (base / rel.with_suffix(".py"), base / rel / "__init__.py"):
+            if candidate.is_file():
+                return candidate.resolve()
+    return None
+
+
+def _direct_imports(file_path: Path, root: Optional[Path]) -> List[Path]:
+    try:
+        tree = ast.parse(file_path.read_text(encoding="utf-8"))
+    except (SyntaxError, UnicodeDecodeError, OSError):
+        return []
+
+    search_dirs = [file_path.parent]
+    if root and root != file_path.parent:
+        search_dirs.append(root)
+
+    found = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            modules = [alias.name for alias in node.names]
+            dirs = search_dirs
+        elif isinstance(node, ast.ImportFrom):
+            # Relative imports resolve against the importing package, not sys.path.
+            base = file_path.parent
+            for _ in range(max(node.level - 1, 0)):
+                base = base.parent
+            dirs = [base] if node.level else search_dirs
+            prefix = f"{node.module}." if node.module else ""
+            # `from pkg import helper` may name a submodule or an attribute; try both.
+            modules = [f"{prefix}{alias.name}" for alias in node.names]
+            if node.module:
+                modules.append(node.module)
+        else:
+            continue
+        for module in modules:
+            resolved = _resolve_module(module, dirs)
+            if resolved and resolved != file_path:
+                found.append(resolved)
+    return found
+
+
+def local_imports(file_path: Path, root: Optional[Path] = None) -> List[Path]:
+    """All local modules `file_path` depends on, followed transitively."""
+    file_path = Path(file_path).resolve()
+    seen = {file_path}
+    pending = [file_path]
+    deps = []
+    while pending:
+        current = pending.pop()
+        for dep in _direct_imports(current, root):
+            if dep not in seen:
+                seen.add(dep)
+                deps.append(dep)
+                pending.append(dep)
+    return sorted(deps)
+
+
+def fingerprint(file_path: Path, root: Optional[Path] = None) -> str:
+    """Combined hash of the file and every local module it imports."""
+    file_path = Path(file_path).resolve()
+    digest = hashlib.sha256(_hash_file(file_path).encode())
+    for dep in local_imports(file_path, root):
+        try:
+            digest.update(f"{dep}:{_hash_file(dep)}".encode())
+        except OSError:
+            continue
+    return digest.hexdigest()
+
+
+class ManifestManager:
+    """
+    Persistent map: file path -> {fingerprint, passed, timestamp}.
+    Written atomically so an interrupted run never leaves a torn manifest.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, Dict]] = None
+        self._pending: Dict[str, Dict] = {}  # recorded but not yet written
+
+    def _read(self) -> Dict[str, Dict]:
+        try:
+            with open(MANIFEST_FILE, "r") as f:
+                return json.load(f).get("files", {})
+        except (json.JSONDecodeError, FileNotFoundError):
+            return {}
+
+    def _load(self) -> Dict[str, Dict]:
+        if self._entries is None:
+            self._entries = self._read()
+        return self._entries
+
+    def _save(self, entries: Dict[str, Dict]):
+        CONFIG_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_path = MANIFEST_FILE.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"files": entries}, f, indent=4)
+        os.replace(tmp_path, MANIFEST_FILE)
+
+    def is_fresh(self, file_path: Path, root: Optional[Path] = None) -> bool:
+        """True if the file (and its local imports) is unchanged since a passing run."""
+        key = str(Path(file_path).resolve())
+        with self._lock:
+            entry = self._load().get(key)
+        if not entry or not entry.get("passed"):
+            return False
+        try:
+            return entry.get("fingerprint") == fingerprint(file_path, root)
+        except OSError:
+            return False
+
+    def record(self, file_path: Path, passed: bool, root: Optional[Path] = None):
+        """Stores the result against the file's current fingerprint (written on the next flush)."""
+        key = str(Path(file_path).resolve())
+        try:
+            fp = fingerprint(file_path, root)
+        except OSError:
+            return
+        entry = {"fingerprint": fp, "passed": passed, "timestamp": time.time()}
+        with self._lock:
+            self._load()[key] = entry
+            self._pending[key] = entry
+            due = len(self._pending) >= FLUSH_EVERY
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Merges buffered results into the file on disk, under the manifest file lock."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        with file_lock(MANIFEST_LOCK_FILE):
+            merged = self._read()
+            for key, entry in pending.items():
+                if entry["timestamp"] >= merged.get(key, {}).get("timestamp", 0):
+                    merged[key] = entry
+            self._save(merged)
+        with self._lock:
+            # Pick up other processes' results; keep anything recorded meanwhile.
+            merged.update(self._pending)
+            self._entries = merged
+
+
+# Global Instance
+manifest = ManifestManager()
+atexit.register(manifest.flush)
@@ -2,19 +2,91 @@
 Smart Patcher - Surgical Code Fix Engine.
 Comments out broken lines and inserts AI-fixed lines below.
 Uses difflib for accurate line-level patching.
+Also applies compact AI answers (SEARCH/REPLACE edit blocks or unified diffs)
+after checking them against the code they were written for.
 """
+import os
 import re
 import shutil
 import difflib
+import threading
 from pathlib import Path
-from typing import Optional, List
+from typing import Dict, Optional, List, Tuple
 from kernhell.utils import log_info, log_success, log_error, log_warning
 
+# mtime (ns) of every file this process wrote, so watch mode can tell our patches
+# from the developer's saves (see watcher.TreeWatcher.watch).
+_own_writes: Dict[Path, int] = {}
+_own_writes_lock = threading.Lock()
+
+
+def _record_write(path: Path):
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return
+    with _own_writes_lock:
+        _own_writes[Path(path).resolve()] = mtime
+
+
+def own_write_mtime(path: Path) -> Optional[int]:
+    """mtime the file had right after KernHell last wrote it (None if never written)."""
+    with _own_writes_lock:
+        return _own_writes.get(Path(path).resolve())
+
 
 def create_backup(file_path: Path):
     """Creates a .bak copy before any surgery."""
     backup_path = file_path.with_suffix(file_path.suffix + ".bak")
     shutil.copy2(file_path, backup_path)
+    _record_write(backup_path)
+
+
+def _surgical_merge(original_lines: List[str], fixed_lines: List[str]) -> List[str]:
+    """
+    Merges newline-terminated lines the KernHell way: removed lines are
+    commented out in place, added lines are inserted below them.
+    """
+    # Use difflib to calculate changes
+    diff = list(difflib.ndiff(original_lines, fixed_lines))
+    
+    patched_lines = []
+    
+    # We need to reconstruct the file from the diff
+    # - lines: remove (comment out) using # [KERNHELL-FIX-OLD]
+    # + lines: add
+    #   lines: keep
+    
+    for line in diff:
+        code = line[2:]
+        marker = line[0]
+        
+        if marker == ' ':
+            # Unchanged
+            patched_lines.append(code)
+        elif marker == '-':
+            # Remove -> Comment out (Cleaner style)
+            indent = len(code) - len(code.lstrip())
+            indent_str = code[:indent]
+            content = code.strip()
+            
+            # Prevent recursive commenting (bloat)
+            if content.startswith("#"):
+                # Already commented, keep as-is (removed from execution logic but preserved in file)
+                commented = f"{indent_str}{content}\n"
+            else:
+                # Comment out active code being removed
+                commented = f"{indent_str}# {content}\n"
+                
+            patched_lines.append(commented)
+        elif marker == '+':
+            # Add -> Insert new line
+            patched_lines.append(code)
+        elif marker == '?':
+            # Hints (ignore)
+            pass
+
+    return patched_lines
 
 
 def apply_fix(file_path: str, fixed_code: str, stderr: str = "") -> bool:
@@ -41,47 +113,11 @@ def apply_fix(file_path: str, fixed_code: str, stderr: str = "") -> bool:
         original_lines = [l if l.endswith('\n') else l + '\n' for l in original_lines]
         fixed_lines = [l if l.endswith('\n') else l + '\n' for l in fixed_lines]
 
-        # Use difflib to calculate changes
-        diff = list(difflib.ndiff(original_lines, fixed_lines))
-        
-        patched_lines = []
-        
-        # We need to reconstruct the file from the diff
-        # - lines: remove (comment out) using # [KERNHELL-FIX-OLD]
-        # + lines: add
-        #   lines: keep
-        
-        for line in diff:
-            code = line[2:]
-            marker = line[0]
-            
-            if marker == ' ':
-                # Unchanged
-                patched_lines.append(code)
-            elif marker == '-':
-                # Remove -> Comment out (Cleaner style)
-                indent = len(code) - len(code.lstrip())
-                indent_str = code[:indent]
-                content = code.strip()
-                
-                # Prevent recursive commenting (bloat)
-                if content.startswith("#"):
-                    # Already commented, keep as-is (removed from execution logic but preserved in file)
-                    commented = f"{indent_str}{content}\n"
-                else:
-                    # Comment out active code being removed
-                    commented = f"{indent_str}# {content}\n"
-                    
-                patched_lines.append(commented)
-            elif marker == '+':
-                # Add -> Insert new line
-                patched_lines.append(code)
-            elif marker == '?':
-                # Hints (ignore)
-                pass
+        patched_lines = _surgical_merge(original_lines, fixed_lines)
 
         with open(path, "w", encoding="utf-8") as f:
             f.writelines(patched_lines)
+        _record_write(path)
 
         log_success(f"Surgical patch applied to {path.name}")
         return True
@@ -89,3 +125,155 @@ def apply_fix(file_path: str, fixed_code: str, stderr: str = "") -> bool:
     except Exception as e:
         log_error(f"Patch failed: {e}")
         return False
+
+
+# ============================================================
+# EDIT BLOCKS / UNIFIED DIFFS
+# ============================================================
+
+_EDIT_BLOCK = re.compile(
+    r"^<{5,9} ?SEARCH[^\n]*\n(.*?)^={5,9}[ \t]*\n(.*?)^>{5,9} ?REPLACE[^\n]*$",
+    re.DOTALL | re.MULTILINE,
+)
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,\d+)? \+\d+(?:,\d+)? @@")
+
+
+def is_edit_response(text: str) -> bool:
+    """True if an AI answer is edit blocks or a unified diff rather than a full script."""
+    return bool(_EDIT_BLOCK.search(text)) or bool(re.search(r"^@@ -\d+", text, re.MULTILINE))
+
+
+def _find_block(lines: List[str], old: List[str], hint: Optional[int]) -> Optional[Tuple[int, str]]:
+    """
+    Locates `old` in `lines`: exact match first, then ignoring trailing
+    whitespace, then ignoring indentation. Returns (index, indent to add to
+    the replacement). Without a hint the match must be unique; with one the
+    nearest match wins.
+    """
+    if not old:
+        return None
+    for normalize in (lambda l: l, str.rstrip, str.strip):
+        wanted = [normalize(l) for l in old]
+        hits = [i for i in range(len(lines) - len(old) + 1)
+                if [normalize(l) for l in lines[i:i + len(old)]] == wanted]
+        if hint is None and len(hits) > 1:
+            return None
+        if hits:
+            index = min(hits, key=lambda i: abs(i - hint)) if hint is not None else hits[0]
+            indent = ""
+            if normalize is str.strip:
+                # The model dropped (or added) indentation; shift its lines by the difference.
+                file_line = next(l for l in lines[index:index + len(old)] if l.strip())
+                answer_line = next(l for l in old if l.strip())
+                file_indent = file_line[:len(file_line) - len(file_line.lstrip())]
+                answer_indent = answer_line[:len(answer_line) - len(answer_line.lstrip())]
+                if not file_indent.startswith(answer_indent):
+                    return None
+                indent = file_indent[len(answer_indent):]
+            return index, indent
+    return None
+
+
+def _replace(lines: List[str], old: List[str], new: List[str], hint: Optional[int] = None,
+             surgical: bool = False) -> Optional[int]:
+    """
+    Replaces the block matching `old` in place; returns how many lines it grew
+    by, or None if it does not match. `surgical` keeps the old lines, commented out.
+    """
+    found = _find_block(lines, old, hint)
+    if found is None:
+        return None
+    index, indent = found
+    replacement = [(indent + l) if l.strip() else l for l in new]
+    if surgical:
+        merged = _surgical_merge([l + "\n" for l in lines[index:index + len(old)]], [l + "\n" for l in replacement])
+        replacement = [l[:-1] for l in merged]
+    lines[index:index + len(old)] = replacement
+    return len(replacement) - len(old)
+
+
+def _apply_edit_lines(lines: List[str], response: str, surgical: bool = False) -> bool:
+    """Applies every edit block / hunk of `response` to `lines` in place; False on any mismatch."""
+    blocks = _EDIT_BLOCK.findall(response)
+    if blocks:
+        for search, replace in blocks:
+            if _replace(lines, search.splitlines(), replace.splitlines(), surgical=surgical) is None:
+                return False
+        return True
+    hunks = _parse_unified_diff(response)
+    if not hunks:
+        return False
+    shift = 0
+    for start, old, new in hunks:
+        if not old:
+            # Pure insertion: no context to validate against.
+            return False
+        grown = _replace(lines, old, new, hint=start - 1 + shift, surgical=surgical)
+        if grown is None:
+            return False
+        shift += grown
+    return True
+
+
+def _parse_unified_diff(text: str) -> List[Tuple[int, List[str], List[str]]]:
+    """Hunks as (old start line, old lines, new lines)."""
+    hunks, current = [], None
+    for line in text.splitlines():
+        header = _HUNK_HEADER.match(line)
+        if header:
+            current = (int(header.group(1)), [], [])
+            hunks.append(current)
+        elif current is None or line.startswith(("--- ", "+++ ", "```", "\\")):
+            continue
+        elif line.startswith("-"):
+            current[1].append(line[1:])
+        elif line.startswith("+"):
+            current[2].append(line[1:])
+        else:
+            # Context line (some models drop the leading space on blank lines).
+            current[1].append(line[1:] if line.startswith(" ") else line)
+            current[2].append(line[1:] if line.startswith(" ") else line)
+    return hunks
+
+
+def apply_edits(code: str, response: str) -> Optional[str]:
+    """
+    Applies edit blocks or a unified diff from an AI answer to `code`.
+    Every SEARCH block / hunk context must match the code; returns None on
+    any mismatch so the caller can fall back to asking for the full script.
+    """
+    lines = code.splitlines()
+    if not _apply_edit_lines(lines, response):
+        return None
+    return "\n".join(lines) + "\n"
+
+
+def apply_edit_blocks(file_path: str, response: str) -> bool:
+    """
+    Applies edit blocks / a unified diff straight to the file, surgical style
+    (replaced lines are commented out, not deleted). The blocks are validated
+    against the file as it is now; on any mismatch nothing is written and
+    False is returned, so the caller can fall back to apply_fix.
+    """
+    path = Path(file_path)
+    if not path.exists():
+        log_error(f"File not found: {file_path}")
+        return False
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        if not _apply_edit_lines(lines, response, surgical=True):
+            log_warning(f"Edit blocks do not match {path.name} as it is now. Falling back to a full merge...")
+            return False
+
+        create_backup(path)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        _record_write(path)
+
+        log_success(f"Surgical patch applied to {path.name} (edit blocks)")
+        return True
+
+    except Exception as e:
+        log_error(f"Patch failed: {e}")
+        return False
@@ -0,0 +1,104 @@
+"""
+Staged Heal Pipeline.
+Every heal attempt flows through four stages: test -> screenshot -> llm -> patch.
+Each stage has its own concurrency limit, so while file A waits on the model,
+file B can already be running its test. Throughput is bounded by the slowest
+stage instead of the sum of all four.
+
+Stages only overlap across files, so this applies to `--jobs N` runs; a serial
+run has one file in flight and its stages run back to back. By default the
+cheap local stages (test, patch) get one slot per worker, while screenshot and
+llm are capped by what can really run at once: the browser pool, and the
+in-flight cap per provider times the providers that have keys.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+STAGES = ("test", "screenshot", "llm", "patch")
+
+
+class StageLimits:
+    """Per-stage semaphores plus busy/wait accounting for bottleneck reporting."""
+
+    def __init__(self, limits: Optional[Dict[str, int]] = None):
+        self.limits: Dict[str, int] = dict(limits or {})
+        self._semaphores = {name: threading.BoundedSemaphore(n) for name, n in self.limits.items()}
+        self._stats_lock = threading.Lock()
+        self.busy_seconds: Dict[str, float] = {name: 0.0 for name in STAGES}
+        self.wait_seconds: Dict[str, float] = {name: 0.0 for name in STAGES}
+
+    @contextmanager
+    def stage(self, name: str):
+        semaphore = self._semaphores.get(name)
+        queued = time.perf_counter()
+        if semaphore:
+            semaphore.acquire()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            if semaphore:
+                semaphore.release()
+            with self._stats_lock:
+                self.wait_seconds[name] += started - queued
+                self.busy_seconds[name] += time.perf_counter() - started
+
+    def bottleneck(self) -> Optional[str]:
+        """The stage with the most accumulated wait time (where files queued up)."""
+        waited = {name: secs for name, secs in self.wait_seconds.items() if secs > 0.05}
+        if not waited:
+            return None
+        return max(waited, key=waited.get)
+
+
+def default_stage_limits(jobs: int, browsers: int, llm_slots: int) -> Dict[str, int]:
+    """Stage limits for `jobs` workers before any --stage-limit override."""
+    jobs = max(1, jobs)
+    return {
+        "test": jobs,
+        "screenshot": max(1, min(jobs, browsers)),
+        "llm": max(1, min(jobs, llm_slots)),
+        "patch": jobs,
+    }
+
+
+def parse_stage_limits(specs: List[str], defaults: Dict[str, int]) -> Dict[str, int]:
+    """
+    Parses ["test=4", "llm=2"] into a full stage->limit map.
+    Unspecified stages keep their value from `defaults`. Raises ValueError on bad input.
+    """
+    limits = {name: max(1, defaults.get(name, 1)) for name in STAGES}
+    for spec in specs or []:
+        name, sep, value = spec.partition("=")
+        name = name.strip().lower()
+        if not sep or name not in STAGES:
+            raise ValueError(f"Invalid stage limit '{spec}'. Use <stage>=<n> with stage in: {', '.join(STAGES)}")
+        try:
+            limit = int(value)
+        except ValueError:
+            raise ValueError(f"Invalid stage limit '{spec}': '{value}' is not a number.")
+        if limit < 1:
+            raise ValueError(f"Invalid stage limit '{spec}': must be >= 1.")
+        limits[name] = limit
+    return limits
+
+
+# Active limits for the current run. Serial runs keep the no-op default.
+_active = StageLimits()
+
+
+def configure_stages(limits: Dict[str, int]) -> StageLimits:
+    global _active
+    _active = StageLimits(limits)
+    return _active
+
+
+def stage(name: str):
+    """Context manager: holds a slot of the given stage for the duration of the block."""
+    return _active.stage(name)
+
+
+def active_stages() -> StageLimits:
+    return _active
@@ -1,10 +1,14 @@
 """
 Provider Abstraction Layer.
-Each provider implements generate_fix(code, error, api_key, screenshot_b64) -> str.
+Each provider implements generate_fix(code, error, api_key, screenshot, dom_snapshot, edit_format, excerpt) -> str.
 Supports text-only and multimodal (vision) requests.
+Google, Groq, OpenRouter and NVIDIA stream their answers (see streaming.py).
 """
 import os
 from typing import Optional
+from kernhell.clients import get_client
+from kernhell.imaging import prepare_image
+from kernhell.streaming import STREAMING, StreamBudgetExceeded, StreamCancelled, consume
 from kernhell.utils import log_info, log_warning
 
 # Shared system prompt — optimized for surgical accuracy
@@ -15,7 +19,7 @@ RULES:
 1. Analyze the error & Screenshot (if available).
 2. LOGICAL FIXES: If clicking a search button, ensure text is typed first! (e.g., page.fill(...)).
 3. SELECTOR FIXES: Use robust selectors (text=, css=, xpath=).
-4. OUTPUT: Return the FULL valid Python script. No markdown, no explanations.
+4. OUTPUT: Exactly the format requested at the end of the message. No explanations.
 5. REPLACEMENT RULE: Do NOT include the broken lines. Replace them completely with the fixed lines."""
 
 VISION_CONTEXT = """
@@ -23,23 +27,56 @@ ADDITIONAL CONTEXT: A screenshot of the page at the time of failure is attached.
 Use the screenshot to identify the correct element selectors, text content,
 and page layout. This visual context should help you fix selectors accurately."""
 
-def _build_user_prompt(code: str, error: str, has_screenshot: bool = False) -> str:
+DOM_CONTEXT = """
+PAGE SNAPSHOT (visible interactive elements at the time of failure, one per line:
+tag#id [attributes] "text"). Prefer selectors built from data-testid, id, role+name or exact text shown here:
+{snapshot}
+"""
+
+FULL_SCRIPT_FORMAT = "Return the FULL fixed Python script. Output ONLY raw Python code."
+
+EXCERPT_NOTE = """
+NOTE: The code above is an EXCERPT of a larger file (its imports plus the failing region).
+The rest of the file is not shown and must not be written out."""
+
+EXCERPT_FORMAT = "Return ONLY the fixed excerpt (the code shown above), not the whole file. Output ONLY raw Python code."
+
+EDIT_BLOCK_FORMAT = """Return ONLY edit blocks, one per change, in exactly this format:
+<<<<<<< SEARCH
+(lines copied exactly from the code above, including indentation)
+=======
+(the lines that replace them)
+>>>>>>> REPLACE
+Each SEARCH must match the code exactly once; add an unchanged neighbouring line if needed.
+Keep blocks small. Do not return the whole script."""
+
+def _build_user_prompt(code: str, error: str, has_screenshot: bool = False, dom_snapshot: str = "",
+                       edit_format: bool = False, excerpt: bool = False) -> str:
     vision_note = VISION_CONTEXT if has_screenshot else ""
+    dom_note = DOM_CONTEXT.format(snapshot=dom_snapshot) if dom_snapshot else ""
+    excerpt_note = EXCERPT_NOTE if excerpt else ""
+    if edit_format:
+        output_format = EDIT_BLOCK_FORMAT
+    else:
+        output_format = EXCERPT_FORMAT if excerpt else FULL_SCRIPT_FORMAT
     return f"""BROKEN CODE:
 ```python
 {code}
 ```
-
+{excerpt_note}
 ERROR LOG:
 {error}
-{vision_note}
-Return the FULL fixed Python script. Output ONLY raw Python code."""
+{vision_note}{dom_note}
+{output_format}"""
 
 def _clean_response(text: str) -> str:
     """Robustly extracts code block content, ignoring chatter."""
     import re
+    # Edit blocks are returned whole; the patcher parses them (fences and all).
+    if "<<<<<<< SEARCH" in text:
+        return text.strip()
     # Extract content between ```python ... ``` or just ``` ... ```
-    match = re.search(r'```(?:python)?\s*(.*?)```', text, re.DOTALL)
+    match = re.search(r'```(?:python|py|diff)?\s*(.*?)```', text, re.DOTALL)
     if match:
         return match.group(1).strip()
     
@@ -48,116 +85,135 @@ def _clean_response(text: str) -> str:
     return text
 
 
+def _image_data_url(screenshot: bytes, provider: str) -> Optional[str]:
+    """Fits the screenshot to the provider's budget and base64-encodes it (the only encode); None if dropped."""
+    import base64
+    image = prepare_image(screenshot, provider) if screenshot else None
+    if image is None:
+        return None
+    image_bytes, mime_type = image
+    return f"data:{mime_type};base64,{base64.b64encode(image_bytes).decode('ascii')}"
+
+
+def _chat_completion(client, provider: str, code: str, **request) -> Optional[str]:
+    """OpenAI-style chat completion (OpenAI SDK or Groq), streamed unless KERNHELL_STREAM=0."""
+    if not STREAMING:
+        response = client.chat.completions.create(stream=False, **request)
+        if response.choices and response.choices[0].message.content:
+            return _clean_response(response.choices[0].message.content)
+        return None
+    response = client.chat.completions.create(stream=True, **request)
+    pieces = (chunk.choices[0].delta.content for chunk in response if chunk.choices)
+    text = consume(provider, len(code), pieces, close=response.close)
+    return _clean_response(text) if text else None
+
+
 # ============================================================
 # GOOGLE (Gemini) — Supports Vision
 # ============================================================
-def google_generate_fix(code: str, error: str, api_key: str, screenshot_b64: str = None) -> Optional[str]:
+def google_generate_fix(code: str, error: str, api_key: str, screenshot: bytes = None, dom_snapshot: str = "", edit_format: bool = False, excerpt: bool = False) -> Optional[str]:
     """Uses Gemini 2.0 Flash with optional vision (screenshot)."""
-    import google.generativeai as genai
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel("gemini-2.0-flash")
-
-    prompt_text = f"{SYSTEM_PROMPT}\n\n{_build_user_prompt(code, error, bool(screenshot_b64))}"
-
-    if screenshot_b64:
-        import base64
-        image_bytes = base64.b64decode(screenshot_b64)
-        response = model.generate_content([
-            prompt_text,
-            {"mime_type": "image/png", "data": image_bytes}
-        ])
+    model = get_client("google", api_key)
+
+    image = prepare_image(screenshot, "google") if screenshot else None
+    prompt_text = f"{SYSTEM_PROMPT}\n\n{_build_user_prompt(code, error, bool(image), dom_snapshot, edit_format, excerpt)}"
+
+    if image:
+        # Gemini takes raw bytes: no base64 round trip at all.
+        image_bytes, mime_type = image
+        contents = [prompt_text, {"mime_type": mime_type, "data": image_bytes}]
     else:
-        response = model.generate_content(prompt_text)
+        contents = prompt_text
 
-    if response.text:
-        return _clean_response(response.text)
-    return None
+    if not STREAMING:
+        response = model.generate_content(contents)
+        if response.text:
+            return _clean_response(response.text)
+        return None
+
+    def _pieces():
+        for chunk in model.generate_content(contents, stream=True):
+            try:
+                yield chunk.text
+            except ValueError:
+                continue  # chunk without text parts (e.g. only a finish reason)
+
+    # Leaving the iterator early drops the gRPC stream.
+    text = consume("google", len(code), _pieces())
+    return _clean_response(text) if text else None
 
 
 # ============================================================
 # GROQ (Text only — no vision support)
 # ============================================================
-def groq_generate_fix(code: str, error: str, api_key: str, screenshot_b64: str = None) -> Optional[str]:
+def groq_generate_fix(code: str, error: str, api_key: str, screenshot: bytes = None, dom_snapshot: str = "", edit_format: bool = False, excerpt: bool = False) -> Optional[str]:
     """Uses Groq with llama-3.3-70b-versatile (text only)."""
-    from groq import Groq
-
-    client = Groq(api_key=api_key)
-    response = client.chat.completions.create(
+    client = get_client("groq", api_key)
+    return _chat_completion(
+        client, "groq", code,
         model="llama-3.3-70b-versatile",
         messages=[
             {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": _build_user_prompt(code, error, False)}
+            {"role": "user", "content": _build_user_prompt(code, error, False, dom_snapshot, edit_format, excerpt)}
         ],
         temperature=0.2,
         max_tokens=4096
     )
-    if response.choices and response.choices[0].message.content:
-        return _clean_response(response.choices[0].message.content)
-    return None
 
 
 # ============================================================
 # OPENROUTER — Supports Vision via compatible models
 # ============================================================
-def openrouter_generate_fix(code: str, error: str, api_key: str, screenshot_b64: str = None) -> Optional[str]:
+def openrouter_generate_fix(code: str, error: str, api_key: str, screenshot: bytes = None, dom_snapshot: str = "", edit_format: bool = False, excerpt: bool = False) -> Optional[str]:
     """Uses OpenRouter API. Can use vision models if screenshot provided."""
-    from openai import OpenAI
-
-    client = OpenAI(
-        base_url="https://openrouter.ai/api/v1",
-        api_key=api_key
-    )
+    client = get_client("openrouter", api_key)
 
     messages = [{"role": "system", "content": SYSTEM_PROMPT}]
 
-    if screenshot_b64:
+    image_url = _image_data_url(screenshot, "openrouter")
+    if image_url:
         # Use vision-capable model with image
         messages.append({
             "role": "user",
             "content": [
-                {"type": "text", "text": _build_user_prompt(code, error, True)},
-                {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{screenshot_b64}"}}
+                {"type": "text", "text": _build_user_prompt(code, error, True, dom_snapshot, edit_format, excerpt)},
+                {"type": "image_url", "image_url": {"url": image_url}}
             ]
         })
         model = "meta-llama/llama-4-scout:free"
     else:
-        messages.append({"role": "user", "content": _build_user_prompt(code, error, False)})
+        messages.append({"role": "user", "content": _build_user_prompt(code, error, False, dom_snapshot, edit_format, excerpt)})
         model = "meta-llama/llama-3.3-70b-instruct:free"
 
-    response = client.chat.completions.create(
+    return _chat_completion(
+        client, "openrouter", code,
         model=model,
         messages=messages,
         temperature=0.2,
         max_tokens=4096
     )
-    if response.choices and response.choices[0].message.content:
-        return _clean_response(response.choices[0].message.content)
-    return None
 
 
 # ============================================================
 # CLOUDFLARE Workers AI (Text only)
 # ============================================================
-def cloudflare_generate_fix(code: str, error: str, api_key: str, screenshot_b64: str = None) -> Optional[str]:
+def cloudflare_generate_fix(code: str, error: str, api_key: str, screenshot: bytes = None, dom_snapshot: str = "", edit_format: bool = False, excerpt: bool = False) -> Optional[str]:
     """
     Uses Cloudflare Workers AI REST API.
     api_key format: "ACCOUNT_ID:API_TOKEN"
     """
-    import requests
-
     parts = api_key.split(":", 1)
     if len(parts) != 2:
         log_warning("Cloudflare key must be 'ACCOUNT_ID:API_TOKEN' format.")
         return None
 
-    account_id, api_token = parts
+    account_id = parts[0]
 
     url = f"https://api.cloudflare.com/client/v4/accounts/{account_id}/ai/run/@cf/meta/llama-3.1-8b-instruct"
-    headers = {"Authorization": f"Bearer {api_token}"}
     payload = {
         "messages": [
             {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": _build_user_prompt(code, error, False)}
+            {"role": "user", "content": _build_user_prompt(code, error, False, dom_snapshot, edit_format, excerpt)}
         ],
         "max_tokens": 4096
     }
@@ -165,7 +221,8 @@ def cloudflare_generate_fix(code: str, error: str, api_key: str, screenshot_b64:
     # No timeout as per user request (or maybe keep safe default? User said "no timeout". default requests has none but better be safe against hangs? I'll use 60s just in case, or user said remove it. I'll stick to 60s for now to avoid freezing forever, or remove it entirely?)
     # User said "m nhi chata ki timeout ki vajha s project heal naa ho". I should remove timeout totally or be very large.
     # But last effective content had timeout=60 for Cloudflare. I'll keep it consistent with Step 809.
-    resp = requests.post(url, headers=headers, json=payload, timeout=60)
+    session = get_client("cloudflare", api_key)  # keep-alive, auth header preset
+    resp = session.post(url, json=payload, timeout=60)
     resp.raise_for_status()
 
     data = resp.json()
@@ -177,46 +234,41 @@ def cloudflare_generate_fix(code: str, error: str, api_key: str, screenshot_b64:
 # ============================================================
 # NVIDIA NIM — Heavy Artillery (Vision + Logic)
 # ============================================================
-def nvidia_generate_fix(code: str, error: str, api_key: str, screenshot_b64: str = None) -> Optional[str]:
+def nvidia_generate_fix(code: str, error: str, api_key: str, screenshot: bytes = None, dom_snapshot: str = "", edit_format: bool = False, excerpt: bool = False) -> Optional[str]:
     """
     Uses NVIDIA NIM (build.nvidia.com).
     Target: meta/llama-3.2-90b-vision-instruct (Unified Multimodal).
     """
-    from openai import OpenAI
-
-    client = OpenAI(
-        base_url="https://integrate.api.nvidia.com/v1",
-        api_key=api_key
-    )
+    client = get_client("nvidia", api_key)
 
     messages = [{"role": "system", "content": SYSTEM_PROMPT}]
     
     user_content = []
-    text_prompt = _build_user_prompt(code, error, bool(screenshot_b64))
+    image_url = _image_data_url(screenshot, "nvidia")
+    text_prompt = _build_user_prompt(code, error, bool(image_url), dom_snapshot, edit_format, excerpt)
     user_content.append({"type": "text", "text": text_prompt})
 
-    if screenshot_b64:
+    if image_url:
         user_content.append({
             "type": "image_url", 
-            "image_url": {"url": f"data:image/png;base64,{screenshot_b64}"}
+            "image_url": {"url": image_url}
         })
 
     messages.append({"role": "user", "content": user_content})
 
     try:
-        response = client.chat.completions.create(
+        return _chat_completion(
+            client, "nvidia", code,
             model="meta/llama-3.2-90b-vision-instruct",
             messages=messages,
             temperature=0.2,
-            max_tokens=4096,
-            stream=False
+            max_tokens=4096
         )
-        if response.choices and response.choices[0].message.content:
-            return _clean_response(response.choices[0].message.content)
+    except (StreamBudgetExceeded, StreamCancelled):
+        raise  # a failed (or cancelled) request for the key scheduler, not an empty answer
     except Exception as e:
         log_warning(f"NVIDIA API Error: {e}")
         return None
-    return None
 
 
 # ============================================================
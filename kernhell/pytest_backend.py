@@ -0,0 +1,261 @@
+"""
+Pytest Backend.
+Real pytest modules do nothing useful under `python file.py`. For those files
+the scanner runs pytest instead, short-circuiting on the first failing test
+(`-x`), and the heal loop then works on that one node:
+
+- retries re-run only the failing node, not the whole module
+- the LLM gets only the failing test function, the module-level fixtures it
+  uses and the module's imports; its answer is spliced back into the file
+
+Live failure screenshots still work: this module doubles as a pytest plugin
+(`-p kernhell.pytest_backend`) that installs the Playwright instrumentation.
+"""
+import ast
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+PYTEST_ENABLED = os.environ.get("KERNHELL_PYTEST", "1") != "0"
+CAPTURE_ENV = "KERNHELL_CAPTURE_DIR"
+# pytest exit code when the target collected no tests.
+NO_TESTS_COLLECTED = 5
+
+_FAILED_LINE = re.compile(r"^(?:FAILED|ERROR) (\S+::\S+)", re.MULTILINE)
+
+FunctionDef = Union[ast.FunctionDef, ast.AsyncFunctionDef]
+
+
+def is_pytest_module(file_path: str) -> bool:
+    """
+    True for files meant to be collected by pytest: they define test_* functions
+    or Test* classes, have no `if __name__ == "__main__":` entry point and never
+    call those tests at module level (script-style tests that run on import).
+    """
+    if not PYTEST_ENABLED:
+        return False
+    try:
+        tree = ast.parse(Path(file_path).read_text(encoding="utf-8"))
+    except (SyntaxError, UnicodeDecodeError, OSError):
+        return False
+
+    tests = set()
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name.startswith("test"):
+            tests.add(node.name)
+        elif isinstance(node, ast.ClassDef) and node.name.startswith("Test"):
+            tests.add(node.name)
+        elif isinstance(node, ast.If) and _is_main_guard(node.test):
+            return False
+    return bool(tests) and not (tests & _module_level_calls(tree))
+
+
+def _module_level_calls(tree: ast.Module) -> Set[str]:
+    """Names called by module-level code (function and class bodies excluded)."""
+    called = set()
+    pending = [n for n in tree.body if not isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda)):
+            continue
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+            called.add(node.func.id)
+        pending.extend(ast.iter_child_nodes(node))
+    return called
+
+
+def _is_main_guard(test: ast.expr) -> bool:
+    return (
+        isinstance(test, ast.Compare)
+        and isinstance(test.left, ast.Name) and test.left.id == "__name__"
+        and any(isinstance(c, ast.Constant) and c.value == "__main__" for c in test.comparators)
+    )
+
+
+def pytest_command(python: str, file_path: str, node_id: Optional[str] = None) -> List[str]:
+    """Runs one node (or the module, stopping at its first failure) with a parseable summary."""
+    target = f"{file_path}::{node_id}" if node_id else file_path
+    return [
+        python, "-m", "pytest", target,
+        "-x", "-q", "-rfE", "--tb=short", "--no-header",
+        "-p", "no:cacheprovider", "-p", "kernhell.pytest_backend",
+    ]
+
+
+def failing_node(output: str) -> Optional[str]:
+    """Node id (without the file part) of the first FAILED/ERROR line in pytest's summary."""
+    match = _FAILED_LINE.search(output or "")
+    if not match:
+        return None
+    node = match.group(1)
+    # The summary prints the path relative to the rootdir; keep only the test part.
+    _, _, rest = node.partition("::")
+    return rest or None
+
+
+def _base_parts(node_id: str) -> List[str]:
+    """'TestLogin::test_ok[chromium]' -> ['TestLogin', 'test_ok']"""
+    return [part.split("[", 1)[0] for part in node_id.split("::")]
+
+
+def _find_def(body: List[ast.stmt], parts: List[str]) -> Optional[ast.stmt]:
+    for node in body:
+        if getattr(node, "name", None) != parts[0]:
+            continue
+        if len(parts) == 1:
+            return node
+        if isinstance(node, ast.ClassDef):
+            return _find_def(node.body, parts[1:])
+    return None
+
+
+def _is_fixture(node: FunctionDef) -> bool:
+    for decorator in node.decorator_list:
+        target = decorator.func if isinstance(decorator, ast.Call) else decorator
+        if isinstance(target, ast.Attribute) and target.attr == "fixture":
+            return True
+        if isinstance(target, ast.Name) and target.id == "fixture":
+            return True
+    return False
+
+
+def _arg_names(node: FunctionDef) -> List[str]:
+    return [a.arg for a in node.args.posonlyargs + node.args.args + node.args.kwonlyargs]
+
+
+def _fixtures_used(tree: ast.Module, test: FunctionDef) -> List[FunctionDef]:
+    """Module-level fixtures the test requests, directly or through other fixtures."""
+    fixtures: Dict[str, FunctionDef] = {
+        n.name: n for n in tree.body
+        if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef)) and _is_fixture(n)
+    }
+    wanted: List[str] = []
+    seen: Set[str] = set()
+    queue = _arg_names(test)
+    while queue:
+        name = queue.pop(0)
+        if name in seen or name not in fixtures:
+            continue
+        seen.add(name)
+        wanted.append(name)
+        queue.extend(_arg_names(fixtures[name]))
+    return [fixtures[name] for name in sorted(wanted, key=lambda n: fixtures[n].lineno)]
+
+
+def _segment(lines: List[str], node: ast.stmt) -> str:
+    start = min([d.lineno for d in getattr(node, "decorator_list", [])] + [node.lineno])
+    return "".join(lines[start - 1:node.end_lineno])
+
+
+def extract_node_source(code: str, node_id: str) -> Optional[str]:
+    """
+    The slice of the module the LLM needs for one failing node: imports,
+    the fixtures it uses and the test itself (inside its class header, if any).
+    None if the node cannot be located, in which case the whole file is sent.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+    parts = _base_parts(node_id)
+    test = _find_def(tree.body, parts)
+    if not isinstance(test, (ast.FunctionDef, ast.AsyncFunctionDef)):
+        return None
+
+    lines = code.splitlines(keepends=True)
+    imports = "".join(_segment(lines, n) for n in tree.body if isinstance(n, (ast.Import, ast.ImportFrom)))
+    chunks = ([imports] if imports else []) + [_segment(lines, f) for f in _fixtures_used(tree, test)]
+
+    test_source = _segment(lines, test)
+    if len(parts) > 1:
+        # Wrap the (indented) method in bare class headers so the snippet still parses.
+        class_header = "".join(f"{'    ' * i}class {name}:\n" for i, name in enumerate(parts[:-1]))
+        test_source = class_header + test_source
+    chunks.append(test_source)
+    return "\n".join(chunk.rstrip("\n") + "\n" for chunk in chunks)
+
+
+def splice_node_source(code: str, fixed_snippet: str, node_id: str) -> Optional[str]:
+    """
+    Writes the LLM's version of the test and fixtures back into the full module.
+    Functions are replaced by name (the test by its class path); imports the
+    snippet adds are inserted after the module's last import. None if the
+    snippet does not parse or does not contain the test, or if the spliced
+    module does not parse.
+    """
+    try:
+        tree = ast.parse(code)
+        fixed_tree = ast.parse(fixed_snippet)
+    except SyntaxError:
+        return None
+
+    parts = _base_parts(node_id)
+    old_test, new_test = _find_def(tree.body, parts), _find_def(fixed_tree.body, parts)
+    if old_test is None or new_test is None:
+        return None
+
+    lines = code.splitlines(keepends=True)
+    fixed_lines = fixed_snippet.splitlines(keepends=True)
+    replacements: List[Tuple[int, int, str]] = []
+
+    def _replace(old: ast.stmt, new: ast.stmt, indent: str):
+        start = min([d.lineno for d in getattr(old, "decorator_list", [])] + [old.lineno])
+        new_source = _segment(fixed_lines, new)
+        new_indent = new_source[:len(new_source) - len(new_source.lstrip())]
+        body = "".join(
+            indent + line[len(new_indent):] if line.startswith(new_indent) else line
+            for line in new_source.splitlines(keepends=True)
+        )
+        replacements.append((start, old.end_lineno, body if body.endswith("\n") else body + "\n"))
+
+    old_line = lines[old_test.lineno - 1]
+    _replace(old_test, new_test, old_line[:len(old_line) - len(old_line.lstrip())])
+
+    old_functions = {n.name: n for n in tree.body if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))}
+    for node in fixed_tree.body:
+        if node is new_test or not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        if node.name in old_functions and old_functions[node.name] is not old_test:
+            _replace(old_functions[node.name], node, "")
+
+    old_imports = {ast.dump(n) for n in tree.body if isinstance(n, (ast.Import, ast.ImportFrom))}
+    new_imports = [
+        _segment(fixed_lines, n) for n in fixed_tree.body
+        if isinstance(n, (ast.Import, ast.ImportFrom)) and ast.dump(n) not in old_imports
+    ]
+    if new_imports:
+        last_import = max((n.end_lineno for n in tree.body if isinstance(n, (ast.Import, ast.ImportFrom))), default=0)
+        replacements.append((last_import + 1, last_import, "".join(new_imports)))
+
+    # Apply bottom-up so earlier line numbers stay valid.
+    for start, end, text in sorted(replacements, key=lambda r: r[0], reverse=True):
+        lines[start - 1:end] = [text]
+    result = "".join(lines)
+    try:
+        ast.parse(result)
+    except SyntaxError:
+        return None
+    return result
+
+
+# --- pytest plugin (loaded in the test process via `-p kernhell.pytest_backend`) ---
+
+def pytest_configure(config):
+    capture_dir = os.environ.get(CAPTURE_ENV)
+    if capture_dir:
+        from kernhell.instrument import install
+        install(capture_dir)
+
+
+def pytest_exception_interact(node, call, report):
+    """Keeps the live capture of the action behind this failure (see instrument.finalize)."""
+    if os.environ.get(CAPTURE_ENV) and call.excinfo is not None:
+        from kernhell.instrument import finalize
+        finalize(call.excinfo.value)
+
+
+def pytest_unconfigure(config):
+    if os.environ.get(CAPTURE_ENV):
+        from kernhell.instrument import finalize
+        finalize(None)  # captures of failures the tests recovered from
@@ -0,0 +1,142 @@
+"""
+Adaptive Router Statistics.
+The router used to follow a fixed priority list. It now ranks providers by
+expected time to a *verified* fix, learned from live traffic:
+
+    expected_seconds = latency / (success_rate * verified_rate)
+
+- latency:       EWMA of request wall time (successful requests only)
+- success_rate:  EWMA of "request returned a usable fix" (errors, 429s, empty answers count as misses)
+- verified_rate: EWMA of "the fix made the test pass"
+
+The same numbers are kept per key (keys are stored as short hashes, never in
+clear text). Unseen providers start from priors that reproduce the old fixed
+order, and a small exploration rate keeps the estimates of losing providers
+fresh. Persisted to ~/.kernhell/router_stats.json.
+"""
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+APP_NAME = "kernhell"
+CONFIG_DIR = Path.home() / f".{APP_NAME}"
+STATS_FILE = CONFIG_DIR / "router_stats.json"
+
+EWMA_ALPHA = 0.2
+EXPLORATION_RATE = float(os.environ.get("KERNHELL_ROUTER_EXPLORE", "0.05"))
+# Priors (seconds) for providers without history; ordered like the old static router.
+PRIOR_LATENCY = {"groq": 3.0, "cloudflare": 5.0, "nvidia": 9.0, "google": 10.0, "openrouter": 14.0}
+DEFAULT_PRIOR_LATENCY = 15.0
+# Floor so one bad streak cannot push a provider's expected time to infinity.
+MIN_RATE = 0.05
+
+
+def key_id(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+
+
+def _new_entry(latency: float) -> Dict:
+    return {"latency": latency, "success": 1.0, "verified": 1.0, "calls": 0, "verifications": 0, "updated": 0.0}
+
+
+def _ewma(old: float, sample: float) -> float:
+    return (1 - EWMA_ALPHA) * old + EWMA_ALPHA * sample
+
+
+def expected_seconds(entry: Dict) -> float:
+    return entry["latency"] / (max(MIN_RATE, entry["success"]) * max(MIN_RATE, entry["verified"]))
+
+
+class RouterStats:
+    def __init__(self, exploration_rate: float = EXPLORATION_RATE):
+        self.exploration_rate = exploration_rate
+        self._lock = threading.Lock()
+        self._data: Optional[Dict] = None
+
+    def _load(self) -> Dict:
+        if self._data is None:
+            try:
+                with open(STATS_FILE, "r") as f:
+                    self._data = json.load(f)
+            except (json.JSONDecodeError, FileNotFoundError):
+                self._data = {}
+            self._data.setdefault("providers", {})
+            self._data.setdefault("keys", {})
+        return self._data
+
+    def _save(self):
+        CONFIG_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_path = STATS_FILE.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self._data, f, indent=2)
+        os.replace(tmp_path, STATS_FILE)
+
+    def _entry(self, section: str, name: str, provider: str) -> Dict:
+        entries = self._load()[section]
+        if name not in entries:
+            entries[name] = _new_entry(PRIOR_LATENCY.get(provider, DEFAULT_PRIOR_LATENCY))
+            if section == "keys":
+                entries[name]["provider"] = provider
+        return entries[name]
+
+    # --- Recording ---
+
+    def record_call(self, provider: str, api_key: str, seconds: float, ok: bool):
+        """One provider request: its wall time and whether it produced a usable fix."""
+        with self._lock:
+            for entry in (self._entry("providers", provider, provider), self._entry("keys", key_id(api_key), provider)):
+                entry["success"] = _ewma(entry["success"], 1.0 if ok else 0.0)
+                if ok:
+                    entry["latency"] = _ewma(entry["latency"], seconds)
+                entry["calls"] += 1
+                entry["updated"] = time.time()
+            self._save()
+
+    def record_verification(self, provider: str, passed: bool, api_key_id: Optional[str] = None):
+        """Whether a fix from `provider` (and the key with hash `api_key_id`, if known) made the test pass."""
+        with self._lock:
+            entries = [self._entry("providers", provider, provider)]
+            if api_key_id:
+                entries.append(self._entry("keys", api_key_id, provider))
+            for entry in entries:
+                entry["verified"] = _ewma(entry["verified"], 1.0 if passed else 0.0)
+                entry["verifications"] += 1
+                entry["updated"] = time.time()
+            self._save()
+
+    # --- Ranking ---
+
+    def rank(self, providers: List[str], explore: bool = True) -> List[str]:
+        """Providers sorted by expected time to a verified fix, best first."""
+        with self._lock:
+            scores = {p: expected_seconds(self._entry("providers", p, p)) for p in providers}
+        ranked = sorted(providers, key=lambda p: scores[p])
+        if explore and len(ranked) > 1 and random.random() < self.exploration_rate:
+            # Occasionally promote a runner-up so its estimate does not go stale.
+            ranked.insert(0, ranked.pop(random.randrange(1, len(ranked))))
+        return ranked
+
+    def rank_keys(self, provider: str, keys: List[str]) -> List[str]:
+        """
+        Keys by expected time to a verified fix (their own latency, success and
+        verified rates), best first. Unseen keys count as average. Stable for ties.
+        """
+        with self._lock:
+            known = self._load()["keys"]
+            scores = {k: expected_seconds(known[key_id(k)]) for k in keys if key_id(k) in known}
+        default = sum(scores.values()) / len(scores) if scores else 0.0
+        return sorted(keys, key=lambda k: scores.get(k, default))
+
+    def snapshot(self) -> Dict:
+        """Copy of all stats (for `kernhell doctor`)."""
+        with self._lock:
+            return json.loads(json.dumps(self._load()))
+
+
+# Global Instance
+router_stats = RouterStats()
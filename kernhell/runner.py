@@ -0,0 +1,217 @@
+"""
+Warm Test Runner (client side).
+Talks to kernhell.forkserver: one warm interpreter with Playwright pre-imported
+forks a clean child per run, instead of paying interpreter startup plus the
+Playwright import on every attempt. Returns the same (passed, stdout, stderr)
+contract as a plain `python <file>` subprocess.
+
+Falls back (returns None) when fork is unavailable, the server dies, or
+isolation is requested via KERNHELL_RUNNER=subprocess or a
+`# kernhell: isolate` marker in the test file.
+"""
+import atexit
+import itertools
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from kernhell.failfast import FailureWatch
+from kernhell.utils import log_info
+
+ISOLATE_MARKER = "# kernhell: isolate"
+
+
+def warm_mode_enabled() -> bool:
+    return hasattr(os, "fork") and os.environ.get("KERNHELL_RUNNER", "warm").lower() != "subprocess"
+
+
+def needs_isolation(file_path: str) -> bool:
+    """Tests can opt out of the shared warm interpreter with a marker comment."""
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            return ISOLATE_MARKER in f.read()
+    except OSError:
+        return True
+
+
+def kernhell_env() -> Dict[str, str]:
+    """Environment for helper interpreters: kernhell importable even from a source checkout."""
+    env = dict(os.environ)
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [package_root, env.get("PYTHONPATH")]))
+    return env
+
+
+class WarmRunner:
+    def __init__(self):
+        self._proc: Optional[subprocess.Popen] = None
+        self._write_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, list] = {}  # id -> [Event, result]
+        self._ready = threading.Event()
+        self.broken = False
+
+    def start(self) -> bool:
+        """Starts (or restarts) the forkserver. False if warm mode is unavailable."""
+        with self._start_lock:
+            if self._proc and self._proc.poll() is None:
+                return True
+            if self.broken:
+                return False
+            env = kernhell_env()
+            try:
+                self._ready.clear()
+                self._proc = subprocess.Popen(
+                    [sys.executable, "-m", "kernhell.forkserver"],
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL,
+                    env=env,
+                )
+            except OSError:
+                self.broken = True
+                return False
+            threading.Thread(target=self._read_loop, args=(self._proc,), daemon=True).start()
+            if not self._ready.wait(timeout=30):
+                self.broken = True
+                self._proc.kill()
+                return False
+            return True
+
+    def _read_loop(self, proc: subprocess.Popen):
+        for raw in proc.stdout:
+            try:
+                message = json.loads(raw)
+            except ValueError:
+                continue
+            if message.get("ready"):
+                self._ready.set()
+                continue
+            waiter = self._pending.get(message.get("id"))
+            if waiter:
+                waiter[1] = message
+                waiter[0].set()
+        # Server exited: wake everyone so they can fall back.
+        for waiter in list(self._pending.values()):
+            waiter[0].set()
+
+    def _send(self, message: dict):
+        with self._write_lock:
+            self._proc.stdin.write((json.dumps(message) + "\n").encode("utf-8"))
+            self._proc.stdin.flush()
+
+    def run(self, file_path: str, timeout: int, capture_dir: Optional[str] = None) -> Optional[Tuple[bool, str, str]]:
+        """
+        Runs one test in a forked child. None means 'use the subprocess path'.
+        With capture_dir, the child is instrumented for live failure screenshots.
+        """
+        if not self.start():
+            return None
+
+        run_id = next(self._ids)
+        workdir = tempfile.mkdtemp(prefix="kernhell-run-")
+        stdout_path = os.path.join(workdir, "stdout")
+        stderr_path = os.path.join(workdir, "stderr")
+        waiter = [threading.Event(), None]
+        self._pending[run_id] = waiter
+        try:
+            self._send({
+                "op": "run", "id": run_id, "path": file_path, "cwd": os.getcwd(),
+                "stdout": stdout_path, "stderr": stderr_path, "timeout": timeout,
+                "capture_dir": capture_dir,
+            })
+            # Follow the child's output while it runs, so a test that has
+            # already printed its fatal traceback is stopped right away.
+            watch = FailureWatch()
+            # stderr first: stdout written in the same poll window must still
+            # count as "the test carried on" and disarm the watch.
+            tails = [(_FileTail(stderr_path), "stderr"), (_FileTail(stdout_path), "stdout")]
+            deadline = time.monotonic() + timeout + 10
+            stopped_early = False
+            while not waiter[0].wait(timeout=0.1):
+                for tail, stream in tails:
+                    for line in tail.read_lines():
+                        watch.feed(line, stream)
+                if not stopped_early and watch.should_kill():
+                    stopped_early = True
+                    self._send({"op": "kill", "id": run_id})
+                if time.monotonic() > deadline:
+                    self._send({"op": "kill", "id": run_id})
+                    waiter[0].wait(timeout=5)
+                    break
+
+            result = waiter[1]
+            if result is None:
+                # Server crashed mid-run; caller falls back to a plain subprocess.
+                return None
+
+            stdout = _read_text(stdout_path)
+            stderr = _read_text(stderr_path)
+            if result.get("timed_out"):
+                return False, stdout, "TimeoutError: Test took too long to execute."
+            if stopped_early:
+                log_info(f"Stopped test early after fatal error: {watch.signature}")
+                return False, stdout, stderr
+            return result["returncode"] == 0, stdout, stderr
+        except (OSError, ValueError):
+            return None
+        finally:
+            self._pending.pop(run_id, None)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def shutdown(self):
+        if self._proc and self._proc.poll() is None:
+            try:
+                self._proc.stdin.close()
+                self._proc.wait(timeout=5)
+            except Exception:
+                self._proc.kill()
+
+
+class _FileTail:
+    """Incremental line reader for a file another process is still writing."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._offset = 0
+        self._partial = b""
+
+    def read_lines(self) -> List[str]:
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(self._offset)
+                chunk = f.read()
+        except FileNotFoundError:
+            return []
+        self._offset += len(chunk)
+        data = self._partial + chunk
+        *lines, self._partial = data.split(b"\n")
+        return [line.decode("utf-8", errors="replace") for line in lines]
+
+
+def _read_text(path: str) -> str:
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            return f.read()
+    except FileNotFoundError:
+        return ""
+
+
+_runner: Optional[WarmRunner] = None
+_runner_lock = threading.Lock()
+
+
+def get_runner() -> WarmRunner:
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = WarmRunner()
+            atexit.register(_runner.shutdown)
+        return _runner
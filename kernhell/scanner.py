@@ -4,23 +4,98 @@ Runs tests, captures stderr, and takes failure screenshots using Playwright.
 """
 import subprocess
 import os
-import base64
+import sys
+import hashlib
+import json
+import shutil
+import signal
 import tempfile
+import threading
+import time
 from pathlib import Path
 from typing import Tuple, Optional
 from kernhell.utils import log_info, log_error, log_warning
 
 # Directory to store failure screenshots
 SCREENSHOT_DIR = Path.home() / ".kernhell" / "screenshots"
+# Live captures written by the instrumented test process (see instrument.py)
+LIVE_CAPTURE_DIR = SCREENSHOT_DIR / "live"
+LIVE_CAPTURE_ENABLED = os.environ.get("KERNHELL_LIVE_CAPTURE", "1") != "0"
+
+# Adaptive timeouts: p95 of recent passing runs x safety factor, clamped.
+DEFAULT_TIMEOUT = int(os.environ.get("KERNHELL_TEST_TIMEOUT", "60"))
+TIMEOUT_FLOOR = int(os.environ.get("KERNHELL_TIMEOUT_FLOOR", "10"))
+TIMEOUT_CEILING = int(os.environ.get("KERNHELL_TIMEOUT_CEILING", "300"))
+TIMEOUT_FACTOR = 3.0
+TIMEOUT_MIN_SAMPLES = 3
 
 
 def _ensure_screenshot_dir():
     SCREENSHOT_DIR.mkdir(parents=True, exist_ok=True)
 
 
-def run_test(file_path: str, timeout: int = 60) -> Tuple[bool, str, str]:
+def _live_capture_dir(file_path: str) -> Path:
+    """Per-file capture dir (hashed full path, so same-named files never collide)."""
+    digest = hashlib.sha1(str(Path(file_path).resolve()).encode()).hexdigest()[:16]
+    return LIVE_CAPTURE_DIR / digest
+
+
+def _reset_live_capture(file_path: str) -> Optional[str]:
+    if not LIVE_CAPTURE_ENABLED:
+        return None
+    capture_dir = _live_capture_dir(file_path)
+    shutil.rmtree(capture_dir, ignore_errors=True)
+    capture_dir.mkdir(parents=True, exist_ok=True)
+    return str(capture_dir)
+
+
+def get_live_capture(file_path: str) -> Tuple[Optional[bytes], Optional[str], str]:
+    """
+    Screenshot, URL and DOM snapshot grabbed by the test itself at the moment it failed.
+    Returns (png_bytes, url, dom), or (None, None, "") if the last run produced no capture.
+    """
+    capture_dir = _live_capture_dir(file_path)
+    try:
+        with open(capture_dir / "live.png", "rb") as f:
+            png = f.read()
+    except OSError:
+        return None, None, ""
+    url = None
+    try:
+        with open(capture_dir / "live.json", "r") as f:
+            url = json.load(f).get("url")
+    except (OSError, ValueError):
+        pass
+    try:
+        with open(capture_dir / "dom.txt", "r", encoding="utf-8") as f:
+            dom = f.read()
+    except OSError:
+        dom = ""
+    return png, url, dom
+
+
+def timeout_for(target: str) -> int:
+    """
+    Per-file (or per pytest node) timeout learned from the durations of its
+    recent passing runs. `target` is a resolved path, optionally `path::node`.
+    Targets with fewer than TIMEOUT_MIN_SAMPLES passing runs get DEFAULT_TIMEOUT.
+    """
+    from kernhell.database import db
+
+    samples = sorted(db.get_durations(target))
+    if len(samples) < TIMEOUT_MIN_SAMPLES:
+        return DEFAULT_TIMEOUT
+    p95 = samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))]
+    return int(max(TIMEOUT_FLOOR, min(TIMEOUT_CEILING, p95 * TIMEOUT_FACTOR)))
+
+
+def run_test(file_path: str, timeout: int = None, node_id: str = None) -> Tuple[bool, str, str]:
     """
     Runs the given Python test script and captures output.
+    Uses the warm forkserver runner when possible, else a fresh interpreter.
+    Pytest modules run under pytest instead, either one node (`node_id`) or the
+    whole module up to its first failure (see pytest_backend.py).
+    Without an explicit timeout, the file's adaptive timeout is used (see timeout_for).
     Returns: (passed: bool, stdout: str, stderr: str)
     """
     file_path = str(Path(file_path).resolve())
@@ -28,37 +103,169 @@ def run_test(file_path: str, timeout: int = 60) -> Tuple[bool, str, str]:
     if not os.path.exists(file_path):
         return False, "", "File not found."
 
-    log_info(f"Running test: {file_path}")
+    from kernhell.pytest_backend import is_pytest_module
+    use_pytest = is_pytest_module(file_path)
+    target = f"{file_path}::{node_id}" if (use_pytest and node_id) else file_path
+
+    if timeout is None:
+        timeout = timeout_for(target)
+    log_info(f"Running test: {target} (timeout {timeout}s)")
+    started = time.monotonic()
+    if use_pytest:
+        passed, stdout, stderr = _execute_pytest(file_path, node_id, timeout)
+    else:
+        passed, stdout, stderr = _execute(file_path, timeout)
+    if passed:
+        from kernhell.database import db
+        db.record_duration(target, time.monotonic() - started)
+    return passed, stdout, stderr
+
+
+def _execute_pytest(file_path: str, node_id: Optional[str], timeout: int) -> Tuple[bool, str, str]:
+    """
+    Pytest reports failures on stdout, so the whole report is returned as the error log.
+    A target that collects no tests counts as passing.
+    """
+    from kernhell.pytest_backend import pytest_command, CAPTURE_ENV, NO_TESTS_COLLECTED
 
+    capture_dir = _reset_live_capture(file_path)
+    env = {CAPTURE_ENV: capture_dir} if capture_dir else {}
     try:
-        result = subprocess.run(
-            ["python", file_path],
-            capture_output=True,
-            text=True,
-            timeout=timeout
+        passed, stdout, stderr, returncode = _run_streaming(
+            pytest_command(sys.executable, file_path, node_id), timeout,
+            extra_env=env, cwd=os.path.dirname(file_path), with_returncode=True,
         )
+    except Exception as e:
+        log_error(f"Failed to run pytest: {e}")
+        return False, "", str(e)
+    if returncode == NO_TESTS_COLLECTED:
+        log_warning("pytest collected no tests.")
+        return True, stdout, stderr
+    return passed, stdout, stderr if passed else (stdout + stderr)
 
-        passed = (result.returncode == 0)
-        return passed, result.stdout, result.stderr
 
-    except subprocess.TimeoutExpired:
-        log_error(f"Test timed out after {timeout} seconds.")
-        return False, "", "TimeoutError: Test took too long to execute."
+def _execute(file_path: str, timeout: int) -> Tuple[bool, str, str]:
+    capture_dir = _reset_live_capture(file_path)
+
+    from kernhell.runner import warm_mode_enabled, needs_isolation, get_runner
+    if warm_mode_enabled() and not needs_isolation(file_path):
+        result = get_runner().run(file_path, timeout, capture_dir=capture_dir)
+        if result is not None:
+            if result[2].startswith("TimeoutError: Test took too long"):
+                log_error(f"Test timed out after {timeout} seconds.")
+            return result
+        log_warning("Warm runner unavailable. Falling back to subprocess mode.")
+
+    try:
+        # sys.executable: run tests in the active venv, not whatever `python` is on PATH.
+        cmd = [sys.executable, file_path]
+        if capture_dir:
+            cmd = [sys.executable, "-m", "kernhell.instrument", capture_dir, file_path]
+        return _run_streaming(cmd, timeout)
     except Exception as e:
         log_error(f"Failed to run test: {e}")
         return False, "", str(e)
 
 
-def capture_failure_screenshot(file_path: str, error_url: str = None) -> Optional[str]:
+def _run_streaming(cmd: list, timeout: int, extra_env: dict = None, cwd: str = None, with_returncode: bool = False):
     """
-    Captures a screenshot of the page state at failure time.
-    Uses Playwright to navigate to the URL from the test and screenshot.
-    Returns: base64-encoded PNG string, or None on failure.
+    Runs cmd with stdout/stderr streamed line by line through a FailureWatch
+    (see failfast.py). A test that printed a terminal failure and does not exit
+    within the grace period is killed, together with the browser it launched.
+    Returns (passed, stdout, stderr), plus the return code if with_returncode.
+    """
+    from kernhell.failfast import FailureWatch
+    from kernhell.runner import kernhell_env
+
+    env = kernhell_env()
+    env["PYTHONUNBUFFERED"] = "1"
+    env.update(extra_env or {})
+    proc = subprocess.Popen(
+        cmd,
+        cwd=cwd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        errors="replace",
+        env=env,
+        start_new_session=(os.name == "posix"),
+    )
+    watch = FailureWatch()
+    watch_lock = threading.Lock()
+    output = {"stdout": [], "stderr": []}
+
+    def _pump(stream, name):
+        for line in stream:
+            output[name].append(line)
+            with watch_lock:
+                watch.feed(line, name)
+        stream.close()
+
+    pumps = [
+        threading.Thread(target=_pump, args=(proc.stdout, "stdout"), daemon=True),
+        threading.Thread(target=_pump, args=(proc.stderr, "stderr"), daemon=True),
+    ]
+    for t in pumps:
+        t.start()
+
+    deadline = time.monotonic() + timeout
+    timed_out = stopped_early = False
+    while True:
+        try:
+            proc.wait(timeout=0.1)
+            break
+        except subprocess.TimeoutExpired:
+            pass
+        with watch_lock:
+            stopped_early = watch.should_kill()
+        timed_out = time.monotonic() > deadline
+        if stopped_early or timed_out:
+            _kill_process_tree(proc)
+            break
+
+    for t in pumps:
+        t.join(timeout=5)
+    stdout, stderr = "".join(output["stdout"]), "".join(output["stderr"])
+    if timed_out:
+        log_error(f"Test timed out after {timeout} seconds.")
+        result = (False, stdout, "TimeoutError: Test took too long to execute.")
+    elif stopped_early:
+        log_info(f"Stopped test early after fatal error: {watch.signature}")
+        result = (False, stdout, stderr)
+    else:
+        result = (proc.returncode == 0, stdout, stderr)
+    return result + (proc.returncode,) if with_returncode else result
+
+
+def _kill_process_tree(proc: subprocess.Popen):
+    try:
+        if os.name == "posix":
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+    except (ProcessLookupError, PermissionError):
+        proc.kill()
+    proc.wait()
+
+
+def capture_failure_context(file_path: str, error_url: str = None) -> Tuple[Optional[bytes], str]:
+    """
+    Captures the page state at failure time: a screenshot plus a compact DOM snapshot.
+    Prefers the live capture taken by the test itself when it failed; otherwise
+    navigates to the URL from the test in a pooled browser (see browser.py).
+    Returns: (raw PNG bytes or None, DOM snapshot text or "").
     """
     _ensure_screenshot_dir()
 
+    live_png, live_url, live_dom = get_live_capture(file_path)
+    if live_png:
+        log_info(f"Using live failure screenshot{f' ({live_url})' if live_url else ''}.")
+        return live_png, live_dom
+
     try:
-        from playwright.sync_api import sync_playwright
+        from kernhell.browser import get_pool, settle
+        from kernhell.dom_snapshot import snapshot_page
+        from kernhell.screenshot_cache import screenshot_cache
 
         # Try to extract URL from the test file
         target_url = error_url
@@ -67,28 +274,33 @@ def capture_failure_screenshot(file_path: str, error_url: str = None) -> Optiona
 
         if not target_url:
             log_warning("Could not extract URL from test file for screenshot.")
-            return None
+            return None, ""
 
-        screenshot_path = SCREENSHOT_DIR / f"fail_{Path(file_path).stem}.png"
+        with screenshot_cache.single_flight(target_url):
+            cached = screenshot_cache.get(target_url, file_path)
+            if cached:
+                log_info(f"Screenshot cache hit: {target_url}")
+                return cached
 
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            page = browser.new_page()
-            page.goto(target_url, wait_until="domcontentloaded", timeout=15000)
-            page.wait_for_timeout(2000)  # Let page settle
-            page.screenshot(path=str(screenshot_path), full_page=True)
-            browser.close()
+            def _capture(page):
+                page.goto(target_url, wait_until="domcontentloaded", timeout=15000)
+                settle(page)  # Network idle (capped) instead of a fixed sleep
+                return page.screenshot(full_page=True), snapshot_page(page)
 
-        # Read and encode
-        with open(screenshot_path, "rb") as f:
-            img_data = base64.b64encode(f.read()).decode("utf-8")
+            img_data, dom = get_pool().run_in_page(_capture)
+            screenshot_cache.put(target_url, img_data, file_path, dom=dom)
 
-        log_info(f"Screenshot captured: {screenshot_path.name}")
-        return img_data
+        log_info(f"Screenshot captured: {target_url}")
+        return img_data, dom
 
     except Exception as e:
         log_warning(f"Screenshot capture failed: {e}")
-        return None
+        return None, ""
+
+
+def capture_failure_screenshot(file_path: str, error_url: str = None) -> Optional[bytes]:
+    """Screenshot only (raw PNG bytes, encoded later at the provider edge), or None."""
+    return capture_failure_context(file_path, error_url)[0]
 
 
 def _extract_url_from_file(file_path: str) -> Optional[str]:
@@ -107,10 +319,6 @@ def _extract_url_from_file(file_path: str) -> Optional[str]:
     return None
 
 
-def get_screenshot_as_base64(file_path: str) -> Optional[str]:
-    """Returns cached screenshot if available, else captures new one."""
-    screenshot_path = SCREENSHOT_DIR / f"fail_{Path(file_path).stem}.png"
-    if screenshot_path.exists():
-        with open(screenshot_path, "rb") as f:
-            return base64.b64encode(f.read()).decode("utf-8")
+def get_screenshot(file_path: str) -> Optional[bytes]:
+    """Returns a cached screenshot for the file's URL if fresh, else captures a new one."""
     return capture_failure_screenshot(file_path)
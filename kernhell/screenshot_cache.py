@@ -0,0 +1,150 @@
+"""
+Screenshot Cache.
+Re-navigation screenshots depend on the target URL, not on the test file, so
+dozens of tests that start at the same login page can share one capture.
+
+- Blobs are content-addressed PNGs under ~/.kernhell/screenshots/cache,
+  stored with the DOM snapshot taken alongside them
+- Index maps a URL -> blob (shared) and (file, URL) -> blob (per file)
+- Entries expire after a TTL; total size is capped with LRU eviction
+- Concurrent misses on the same URL wait for one capture (single flight)
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import urldefrag
+
+CACHE_DIR = Path.home() / ".kernhell" / "screenshots" / "cache"
+INDEX_FILE = CACHE_DIR / "index.json"
+
+DEFAULT_TTL = int(os.environ.get("KERNHELL_SCREENSHOT_TTL", "900"))
+DEFAULT_MAX_BYTES = int(float(os.environ.get("KERNHELL_SCREENSHOT_CACHE_MB", "100")) * 1024 * 1024)
+
+
+def _normalize_url(url: str) -> str:
+    return urldefrag(url.strip())[0]
+
+
+def _file_identity(file_path: str) -> str:
+    return hashlib.sha1(str(Path(file_path).resolve()).encode()).hexdigest()[:16]
+
+
+class ScreenshotCache:
+    def __init__(self, ttl: int = DEFAULT_TTL, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._url_locks: Dict[str, threading.Lock] = {}
+        self._index: Optional[Dict] = None
+
+    # --- Index persistence ---
+
+    def _load(self) -> Dict:
+        if self._index is None:
+            try:
+                with open(INDEX_FILE, "r") as f:
+                    self._index = json.load(f)
+            except (json.JSONDecodeError, FileNotFoundError):
+                self._index = {}
+            for section in ("blobs", "urls", "files"):
+                self._index.setdefault(section, {})
+        return self._index
+
+    def _save(self):
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_path = INDEX_FILE.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, INDEX_FILE)
+
+    def _blob_path(self, blob: str) -> Path:
+        return CACHE_DIR / f"{blob}.png"
+
+    # --- Public API ---
+
+    def get(self, url: str, file_path: str = None) -> Optional[Tuple[bytes, str]]:
+        """Fresh (png, dom_snapshot) for (file, URL), else for the URL alone, else None."""
+        url = _normalize_url(url)
+        with self._lock:
+            index = self._load()
+            candidates = []
+            if file_path:
+                entry = index["files"].get(_file_identity(file_path))
+                if entry and entry.get("url") == url:
+                    candidates.append(entry["blob"])
+            if url in index["urls"]:
+                candidates.append(index["urls"][url])
+
+            now = time.time()
+            for blob in candidates:
+                meta = index["blobs"].get(blob)
+                if not meta or now - meta["created"] > self.ttl:
+                    continue
+                try:
+                    with open(self._blob_path(blob), "rb") as f:
+                        data = f.read()
+                except OSError:
+                    continue
+                meta["accessed"] = now
+                self._save()
+                return data, meta.get("dom", "")
+        return None
+
+    def put(self, url: str, png: bytes, file_path: str = None, dom: str = ""):
+        url = _normalize_url(url)
+        blob = hashlib.sha256(png).hexdigest()[:32]
+        with self._lock:
+            index = self._load()
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            blob_path = self._blob_path(blob)
+            if not blob_path.exists():
+                with open(blob_path, "wb") as f:
+                    f.write(png)
+            now = time.time()
+            index["blobs"][blob] = {"size": len(png) + len(dom), "created": now, "accessed": now, "dom": dom}
+            index["urls"][url] = blob
+            if file_path:
+                index["files"][_file_identity(file_path)] = {"url": url, "blob": blob}
+            self._evict(index)
+            self._save()
+
+    @contextmanager
+    def single_flight(self, url: str):
+        """Serializes captures of the same URL so concurrent misses capture it once."""
+        url = _normalize_url(url)
+        with self._lock:
+            url_lock = self._url_locks.setdefault(url, threading.Lock())
+        with url_lock:
+            yield
+
+    def _evict(self, index: Dict):
+        """Drops expired blobs, then least-recently-used ones until under the size cap."""
+        now = time.time()
+        blobs = index["blobs"]
+        doomed = {b for b, meta in blobs.items() if now - meta["created"] > self.ttl}
+
+        total = sum(meta["size"] for b, meta in blobs.items() if b not in doomed)
+        for b, meta in sorted(blobs.items(), key=lambda item: item[1]["accessed"]):
+            if total <= self.max_bytes:
+                break
+            if b not in doomed:
+                doomed.add(b)
+                total -= meta["size"]
+
+        for b in doomed:
+            blobs.pop(b, None)
+            try:
+                self._blob_path(b).unlink()
+            except OSError:
+                pass
+        index["urls"] = {u: b for u, b in index["urls"].items() if b in blobs}
+        index["files"] = {f: e for f, e in index["files"].items() if e["blob"] in blobs}
+
+
+# Global Instance
+screenshot_cache = ScreenshotCache()
@@ -0,0 +1,244 @@
+"""
+Streaming Responses.
+Providers used to wait for the whole completion before extracting the code
+fence. Streamed answers are read through a CodeStream instead, which tracks
+the code block as it arrives and stops the request as soon as:
+
+- the closing fence of the code block is seen (anything after it is chatter
+  that _clean_response would drop anyway)
+- the answer outgrows its size budget (KERNHELL_STREAM_MAX_CHARS; by default
+  twice the code sent plus 4000 characters)
+- it runs past KERNHELL_STREAM_MAX_SECONDS (default 120), whether or not
+  chunks are still arriving: the SDK iterator is read on its own thread, so a
+  stalled stream is closed at the deadline too
+
+Answers cut by a budget raise StreamBudgetExceeded, so the key scheduler and
+router count them as failed requests. A stream read inside cancel_scope(event)
+is closed as soon as the event is set (a hedged request another provider
+already won) and raises StreamCancelled. Edit-block answers (see
+patcher.apply_edits) may span several fences, so they are only cut by the
+budgets. Live progress is available from active_streams(); totals per provider
+from stream_stats (printed after a multi-file heal). KERNHELL_STREAM=0 disables streaming.
+"""
+import os
+import queue
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional
+from kernhell.utils import log_info
+
+STREAMING = os.environ.get("KERNHELL_STREAM", "1") != "0"
+MAX_CHARS = int(os.environ.get("KERNHELL_STREAM_MAX_CHARS", "0"))
+MAX_SECONDS = float(os.environ.get("KERNHELL_STREAM_MAX_SECONDS", "120"))
+
+EDIT_MARKER = "<<<<<<< SEARCH"
+# How often a stream inside a cancel_scope checks its event (seconds).
+CANCEL_POLL = 0.1
+
+_active = set()
+_active_lock = threading.Lock()
+
+
+class StreamBudgetExceeded(RuntimeError):
+    """A streamed answer outgrew its size or time budget and was aborted."""
+
+
+class StreamCancelled(Exception):
+    """The caller no longer wants the answer (see cancel_scope); the stream was closed."""
+
+
+_scope = threading.local()
+
+
+@contextmanager
+def cancel_scope(event: threading.Event):
+    """Streams consumed on this thread inside the block stop once `event` is set."""
+    previous = getattr(_scope, "event", None)
+    _scope.event = event
+    try:
+        yield
+    finally:
+        _scope.event = previous
+
+
+class CodeStream:
+    def __init__(self, provider: str, code_size: int, max_chars: int = MAX_CHARS, max_seconds: float = 0):
+        self.provider = provider
+        self.max_chars = max_chars or 2 * code_size + 4000
+        self.max_seconds = max_seconds or MAX_SECONDS
+        self.started = time.monotonic()
+        self.first_token: Optional[float] = None
+        self.text = ""
+        self.chunks = 0
+        self.fences = 0       # fence lines seen so far
+        self.code_lines = 0   # lines inside the first code block
+        self.stop_reason: Optional[str] = None  # "fence" | "size" | "time" | "cancelled" | "end"
+        self._scanned = 0     # offset of the first line not yet scanned
+
+    def feed(self, piece: str) -> bool:
+        """Adds a chunk of the answer; True once the request should stop."""
+        if piece:
+            if self.first_token is None:
+                self.first_token = time.monotonic() - self.started
+            self.text += piece
+            self.chunks += 1
+            self._scan_lines()
+        if self.stop_reason is None:
+            if len(self.text) > self.max_chars:
+                self.stop_reason = "size"
+            elif time.monotonic() - self.started > self.max_seconds:
+                self.stop_reason = "time"
+        return self.stop_reason is not None
+
+    def _scan_lines(self):
+        while self.stop_reason is None:
+            end = self.text.find("\n", self._scanned)
+            if end < 0:
+                return
+            line = self.text[self._scanned:end].strip()
+            self._scanned = end + 1
+            if line.startswith("```"):
+                self.fences += 1
+                if self.fences == 2 and EDIT_MARKER not in self.text:
+                    self.stop_reason = "fence"
+            elif self.fences == 1:
+                self.code_lines += 1
+
+    def finish(self) -> Optional[str]:
+        """The answer text, or None if a budget or a cancel cut it off."""
+        if self.stop_reason is None:
+            self.stop_reason = "end"
+        stream_stats.record(self)
+        return None if self.stop_reason in ("size", "time", "cancelled") else self.text
+
+    def progress(self) -> Dict:
+        return {
+            "provider": self.provider,
+            "elapsed": round(time.monotonic() - self.started, 2),
+            "first_token": None if self.first_token is None else round(self.first_token, 2),
+            "chars": len(self.text),
+            "chunks": self.chunks,
+            "code_lines": self.code_lines,
+            "in_code": self.fences == 1,
+            "stop_reason": self.stop_reason,
+        }
+
+
+_END = object()
+
+
+def _pump(pieces: Iterable[Optional[str]], out: "queue.Queue", stop: threading.Event):
+    """Reads the SDK iterator on its own thread, so a stalled stream cannot block consume()."""
+    try:
+        for piece in pieces:
+            if stop.is_set():
+                break
+            out.put((piece, None))
+    except BaseException as e:
+        out.put((None, e))
+    finally:
+        if stop.is_set() and hasattr(pieces, "close"):
+            try:
+                pieces.close()  # drops the underlying response (e.g. Gemini's gRPC stream)
+            except Exception:
+                pass
+    out.put((_END, None))
+
+
+def consume(provider: str, code_size: int, pieces: Iterable[Optional[str]],
+            close: Callable[[], None] = None) -> Optional[str]:
+    """
+    Reads streamed text pieces through a CodeStream, closing the underlying
+    response on early stop. The time budget is a real deadline: a stream that
+    stalls without sending anything is cut too. Returns the answer text (None
+    if empty); raises StreamBudgetExceeded if a budget cut it off, and
+    StreamCancelled once the thread's cancel_scope event is set.
+    """
+    stream = CodeStream(provider, code_size)
+    cancel = getattr(_scope, "event", None)
+    pieces_in: "queue.Queue" = queue.Queue()
+    stop = threading.Event()
+    threading.Thread(target=_pump, args=(pieces, pieces_in, stop), daemon=True,
+                     name=f"kernhell-stream-{provider}").start()
+    with _active_lock:
+        _active.add(stream)
+    try:
+        while True:
+            if cancel is not None and cancel.is_set():
+                stream.stop_reason = "cancelled"
+                break
+            remaining = stream.started + stream.max_seconds - time.monotonic()
+            if cancel is not None:
+                remaining = min(remaining, CANCEL_POLL)
+            try:
+                piece, error = pieces_in.get(timeout=max(0.0, remaining))
+            except queue.Empty:
+                if time.monotonic() - stream.started >= stream.max_seconds:
+                    stream.stop_reason = "time"  # stalled: no chunk before the deadline
+                    break
+                continue
+            if error is not None:
+                raise error
+            if piece is _END:
+                break
+            if stream.feed(piece or ""):
+                break
+    finally:
+        stop.set()
+        with _active_lock:
+            _active.discard(stream)
+        if close is not None and stream.stop_reason is not None:
+            try:
+                close()
+            except Exception:
+                pass
+    text = stream.finish()
+    stats = stream.progress()
+    if stream.stop_reason == "fence":
+        log_info(f"[{provider}] code block complete after {stats['elapsed']:.1f}s "
+                 f"({stats['code_lines']} lines); closed the stream early.")
+    elif stream.stop_reason == "cancelled":
+        raise StreamCancelled(f"[{provider}] stream cancelled after {stats['chars']} chars")
+    elif text is None:
+        limit = f"{stream.max_chars} chars" if stream.stop_reason == "size" else f"{stream.max_seconds:g}s"
+        raise StreamBudgetExceeded(f"answer exceeded its {limit} budget; aborted after {stats['chars']} chars")
+    return text if text and text.strip() else None
+
+
+def active_streams() -> List[Dict]:
+    """Progress of the responses currently streaming in."""
+    with _active_lock:
+        return [s.progress() for s in _active]
+
+
+class StreamStats:
+    def __init__(self, history: int = 200):
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=history)
+
+    def record(self, stream: CodeStream):
+        with self._lock:
+            self._recent.append(stream.progress())
+
+    def summary(self) -> Dict[str, Dict]:
+        """Per provider: streamed calls, mean time to first token / to stop, early stops by reason."""
+        with self._lock:
+            recent = list(self._recent)
+        result: Dict[str, Dict] = {}
+        for entry in recent:
+            row = result.setdefault(entry["provider"], {"calls": 0, "first_token": [], "elapsed": [], "stops": {}})
+            row["calls"] += 1
+            if entry["first_token"] is not None:
+                row["first_token"].append(entry["first_token"])
+            row["elapsed"].append(entry["elapsed"])
+            row["stops"][entry["stop_reason"]] = row["stops"].get(entry["stop_reason"], 0) + 1
+        for row in result.values():
+            row["first_token"] = sum(row["first_token"]) / len(row["first_token"]) if row["first_token"] else None
+            row["elapsed"] = sum(row["elapsed"]) / len(row["elapsed"])
+        return result
+
+
+# Global Instance
+stream_stats = StreamStats()
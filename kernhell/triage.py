@@ -0,0 +1,120 @@
+"""
+Two-Phase Triage.
+Phase 1 sweeps the whole directory through `scanner.run_test` in parallel and
+classifies every failure. Phase 2 heals only the failures, cheapest and most
+common failure classes first, so an early report is available before any
+LLM budget is spent. Classes are ranked by cost per failure (see schedule_failures).
+"""
+import re
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TimeElapsedColumn
+from rich.table import Table
+
+from kernhell.scanner import run_test
+from kernhell.utils import console
+
+# Failure classes in order of expected heal cost (cheapest first).
+FAILURE_CLASSES = [
+    "syntax_error",
+    "selector_not_found",
+    "strict_mode",
+    "timeout",
+    "navigation_error",
+    "other",
+]
+
+# Relative heal cost per class (roughly: attempts and context each class tends to need).
+CLASS_COST = {
+    "syntax_error": 1.0,
+    "selector_not_found": 2.0,
+    "strict_mode": 2.0,
+    "timeout": 3.0,
+    "navigation_error": 4.0,
+    "other": 5.0,
+}
+
+_CLASS_PATTERNS = [
+    ("syntax_error", re.compile(r"\b(SyntaxError|IndentationError|TabError)\b")),
+    ("strict_mode", re.compile(r"strict mode violation", re.IGNORECASE)),
+    ("navigation_error", re.compile(r"net::ERR_|NS_ERROR_|Page\.goto:|navigating to|ERR_NAME_NOT_RESOLVED", re.IGNORECASE)),
+    ("selector_not_found", re.compile(r"waiting for (locator|selector)|No node found|Element is not|element not found|Unable to locate", re.IGNORECASE)),
+    ("timeout", re.compile(r"Timeout|timed out", re.IGNORECASE)),
+]
+
+# (file, passed, stdout, stderr, failure_class)
+TriageResult = Tuple[Path, bool, str, str, str]
+
+
+def classify_failure(stderr: str) -> str:
+    """Maps a test's stderr to one of FAILURE_CLASSES."""
+    for name, pattern in _CLASS_PATTERNS:
+        if pattern.search(stderr or ""):
+            return name
+    return "other"
+
+
+def run_triage(files: List[Path], jobs: int) -> List[TriageResult]:
+    """Runs every file once in parallel and classifies the failures."""
+    results: Dict[Path, TriageResult] = {}
+    jobs = max(1, min(jobs, len(files)))
+
+    def _check(file_path: Path) -> TriageResult:
+        passed, stdout, stderr = run_test(str(file_path))
+        return file_path, passed, stdout, stderr, ("" if passed else classify_failure(stderr))
+
+    progress = Progress(SpinnerColumn(), TextColumn("{task.description}"), BarColumn(), TimeElapsedColumn(), console=console, transient=True)
+    with progress:
+        task = progress.add_task("[bold yellow]Triage sweep[/bold yellow]", total=len(files))
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(_check, f) for f in files]
+            for future in as_completed(futures):
+                result = future.result()
+                results[result[0]] = result
+                progress.advance(task)
+
+    return [results[f] for f in files]
+
+
+def schedule_failures(results: List[TriageResult]) -> List[TriageResult]:
+    """
+    Orders failures for healing by class score = cost / count, lowest first:
+    a cheap class goes early, and so does a costlier class that accounts for
+    many failures (e.g. 6 timeouts score 0.5, ahead of 1 syntax error at 1.0).
+    Ties fall back to class cost order, then path.
+    """
+    failures = [r for r in results if not r[1]]
+    counts = Counter(r[4] for r in failures)
+    return sorted(failures, key=lambda r: (
+        CLASS_COST[r[4]] / counts[r[4]], FAILURE_CLASSES.index(r[4]), str(r[0])))
+
+
+def print_triage_report(results: List[TriageResult], seconds: float):
+    """Prints the failure picture of the sweep, grouped by class."""
+    failures = [r for r in results if not r[1]]
+    counts = Counter(r[4] for r in failures)
+
+    table = Table(title="Triage Report", show_header=True, header_style="bold cyan")
+    table.add_column("Failure Class", style="bold")
+    table.add_column("Files", justify="right")
+    table.add_column("Examples", style="dim")
+
+    for name in FAILURE_CLASSES:
+        if counts[name]:
+            examples = [r[0].name for r in failures if r[4] == name][:3]
+            table.add_row(name, str(counts[name]), ", ".join(examples))
+
+    console.print(table)
+    console.print(f"[dim]{len(results) - len(failures)}/{len(results)} passing | {len(failures)} to heal | sweep {seconds:.1f}s[/dim]")
+
+
+def triage(files: List[Path], jobs: int) -> Tuple[List[TriageResult], List[TriageResult]]:
+    """Runs the sweep, prints the report, returns (all results, scheduled failures)."""
+    started = time.perf_counter()
+    results = run_triage(files, jobs)
+    print_triage_report(results, time.perf_counter() - started)
+    return results, schedule_failures(results)
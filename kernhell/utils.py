@@ -1,3 +1,4 @@
+import threading
 from rich.console import Console
 from rich.panel import Panel
 from rich.text import Text
@@ -24,17 +25,32 @@ def print_banner():
     """
     console.print(Panel(Text(banner_text, style="bold green"), title="[bold white]KernHell v0.1 - Zero-Cost Self-Healing Agent[/bold white]", border_style="green"))
 
+# Per-thread label so parallel workers' log lines stay attributable.
+_log_context = threading.local()
+
+def set_log_prefix(prefix: str = ""):
+    """Tags every log line from the current thread (used by parallel workers)."""
+    _log_context.raw_prefix = prefix
+    _log_context.prefix = f"[dim]{prefix}[/dim] " if prefix else ""
+
+def get_log_prefix() -> str:
+    """The current thread's prefix, for helper threads that log on its behalf."""
+    return getattr(_log_context, "raw_prefix", "")
+
+def _prefix() -> str:
+    return getattr(_log_context, "prefix", "")
+
 def log_info(msg: str):
-    console.print(f"[bold blue]INFO:[/bold blue] {msg}")
+    console.print(f"{_prefix()}[bold blue]INFO:[/bold blue] {msg}")
 
 def log_success(msg: str):
-    console.print(f"[bold green]SUCCESS:[/bold green] {msg}")
+    console.print(f"{_prefix()}[bold green]SUCCESS:[/bold green] {msg}")
 
 def log_warning(msg: str):
-    console.print(f"[bold yellow]WARNING:[/bold yellow] {msg}")
+    console.print(f"{_prefix()}[bold yellow]WARNING:[/bold yellow] {msg}")
 
 def log_error(msg: str):
-    console.print(f"[bold red]ERROR:[/bold red] {msg}")
+    console.print(f"{_prefix()}[bold red]ERROR:[/bold red] {msg}")
 
 def log_step(step: str):
     console.print(f"\n[bold magenta]>> {step}[/bold magenta]")
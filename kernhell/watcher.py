@@ -0,0 +1,113 @@
+"""
+Watch Mode.
+Polls a directory tree for saved .py files, debounces bursts of saves, and
+reports which test files need a re-run: the tests that changed plus every
+test whose local imports (see manifest.local_imports) changed.
+Polling keeps this dependency-free and works the same on every OS.
+"""
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Set
+
+from kernhell.manifest import local_imports
+
+_IGNORED_DIRS = {"__pycache__", ".git", ".venv", "venv", "node_modules", ".pytest_cache"}
+
+
+def _is_test_file(path: Path) -> bool:
+    return path.name.startswith("test_") or path.name.endswith("_test.py")
+
+
+class TreeWatcher:
+    """
+    Tracks mtimes of every .py file under `root` and a reverse dependency map
+    (helper module -> tests importing it) that is refreshed only for tests that change.
+    """
+    def __init__(self, root: Path, debounce: float = 0.75, interval: float = 0.5):
+        self.root = Path(root).resolve()
+        self.debounce = debounce
+        self.interval = interval
+        self._mtimes: Dict[Path, float] = {}
+        self._deps: Dict[Path, List[Path]] = {}
+
+    def _snapshot(self) -> Dict[Path, float]:
+        mtimes = {}
+        for path in self.root.rglob("*.py"):
+            if _IGNORED_DIRS.intersection(path.relative_to(self.root).parts):
+                continue
+            try:
+                mtimes[path.resolve()] = path.stat().st_mtime_ns
+            except OSError:
+                continue
+        return mtimes
+
+    def _refresh_deps(self, tests):
+        for test in tests:
+            if test.exists():
+                self._deps[test] = local_imports(test, self.root)
+            else:
+                self._deps.pop(test, None)
+
+    def prime(self):
+        """Takes the baseline snapshot and builds the full dependency map."""
+        self._mtimes = self._snapshot()
+        self._refresh_deps([p for p in self._mtimes if _is_test_file(p)])
+
+    def _changed_files(self) -> Set[Path]:
+        current = self._snapshot()
+        changed = {p for p, m in current.items() if self._mtimes.get(p) != m}
+        changed |= set(self._mtimes) - set(current)
+        self._mtimes = current
+        return changed
+
+    def affected_tests(self, changed: Set[Path]) -> List[Path]:
+        """Changed tests plus tests depending on any changed helper."""
+        changed_tests = {p for p in changed if _is_test_file(p)}
+        self._refresh_deps(changed_tests)
+        affected = {p for p in changed_tests if p.exists()}
+        for test, deps in self._deps.items():
+            if changed.intersection(deps):
+                affected.add(test)
+        return sorted(affected)
+
+    def wait_for_changes(self) -> Set[Path]:
+        """Blocks until a burst of saves has settled for `debounce` seconds."""
+        changed: Set[Path] = set()
+        while not changed:
+            time.sleep(self.interval)
+            changed = self._changed_files()
+
+        settle_deadline = time.monotonic() + self.debounce
+        while time.monotonic() < settle_deadline:
+            time.sleep(min(self.interval, self.debounce))
+            more = self._changed_files()
+            if more:
+                changed |= more
+                settle_deadline = time.monotonic() + self.debounce
+        return changed
+
+    def watch(self, on_change: Callable[[List[Path]], None]):
+        """Runs forever; calls on_change(tests) after each settled burst."""
+        self.prime()
+        while True:
+            tests = self.affected_tests(self.wait_for_changes())
+            if not tests:
+                continue
+            before = self._mtimes
+            on_change(tests)
+            self._accept_own_writes(before)
+
+    def _accept_own_writes(self, before: Dict[Path, float]):
+        """
+        After a heal: take in the new mtimes of files the heal itself wrote (our
+        patches and .bak files must not re-trigger a heal), but keep the pre-heal
+        mtimes of everything else, so saves made during the heal are picked up
+        by the next poll.
+        """
+        from kernhell.patcher import own_write_mtime
+
+        mtimes = dict(before)
+        for path, mtime in self._snapshot().items():
+            if own_write_mtime(path) == mtime:
+                mtimes[path] = mtime
+        self._mtimes = mtimes
@@ -0,0 +1,122 @@
+"""
+Parallel Healing Pool.
+Runs the per-file heal loop on a bounded thread pool.
+- One live progress line per worker (replaces per-file spinners)
+- Aggregated summary table once every file is done
+Healing is subprocess + network bound, so threads are enough to saturate cores.
+"""
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+from rich.progress import Progress, SpinnerColumn, TextColumn, TimeElapsedColumn
+from rich.table import Table
+
+from kernhell.utils import console, set_log_prefix
+
+_worker_context = threading.local()
+
+
+class WorkerReporter:
+    """Owns a single progress line; stages of the heal loop update its text."""
+
+    def __init__(self, progress: Progress, task_id, label: str):
+        self.progress = progress
+        self.task_id = task_id
+        self.label = label
+        self.target = ""
+
+    def start_file(self, file_path: Path):
+        self.target = file_path.name
+        self._show("starting...")
+
+    def _show(self, message: str):
+        self.progress.update(self.task_id, description=f"[bold cyan]{self.label}[/bold cyan] {self.target} [dim]{message}[/dim]")
+
+    @contextmanager
+    def status(self, message: str):
+        self._show(message)
+        yield
+
+    def idle(self):
+        self.target = ""
+        self._show("idle")
+
+
+def current_reporter() -> Optional[WorkerReporter]:
+    """Returns the reporter of the calling worker thread, or None in serial mode."""
+    return getattr(_worker_context, "reporter", None)
+
+
+def run_parallel(files: List[Path], jobs: int, heal_fn: Callable[[Path], bool]) -> List[Tuple[Path, bool, float]]:
+    """
+    Heals files on `jobs` worker threads.
+    Returns [(file, passed, seconds)] in the original file order.
+    """
+    jobs = max(1, min(jobs, len(files)))
+    results = {}
+    slot_counter = itertools.count(1)
+
+    progress = Progress(
+        SpinnerColumn(),
+        TextColumn("{task.description}"),
+        TimeElapsedColumn(),
+        console=console,
+        transient=True,
+    )
+    overall = progress.add_task(f"[bold green]Healing[/bold green] 0/{len(files)}", total=len(files))
+    slots = [progress.add_task("", total=None) for _ in range(jobs)]
+
+    def _init_worker():
+        index = next(slot_counter)
+        reporter = WorkerReporter(progress, slots[index - 1], f"W{index}")
+        reporter.idle()
+        _worker_context.reporter = reporter
+
+    def _work(file_path: Path) -> Tuple[bool, float]:
+        reporter = current_reporter()
+        reporter.start_file(file_path)
+        set_log_prefix(f"{reporter.label} {file_path.name}")
+        started = time.perf_counter()
+        try:
+            passed = heal_fn(file_path)
+        except Exception as e:
+            console.print(f"[bold red]ERROR:[/bold red] Worker crashed on {file_path}: {e}")
+            passed = False
+        finally:
+            set_log_prefix("")
+            reporter.idle()
+        return passed, time.perf_counter() - started
+
+    with progress:
+        with ThreadPoolExecutor(max_workers=jobs, initializer=_init_worker) as pool:
+            futures = {pool.submit(_work, f): f for f in files}
+            for done, future in enumerate(as_completed(futures), start=1):
+                results[futures[future]] = future.result()
+                progress.update(overall, completed=done, description=f"[bold green]Healing[/bold green] {done}/{len(files)}")
+
+    return [(f, *results[f]) for f in files]
+
+
+def print_summary(results: List[Tuple[Path, bool, float]], wall_seconds: float):
+    """Prints the aggregated per-file outcome table for a heal run."""
+    table = Table(title="Heal Summary", show_header=True, header_style="bold cyan")
+    table.add_column("File", style="bold")
+    table.add_column("Status", justify="center")
+    table.add_column("Time", justify="right")
+
+    for file_path, passed, seconds in results:
+        status = "[bold green]Healthy[/bold green]" if passed else "[bold red]Failed[/bold red]"
+        table.add_row(str(file_path), status, f"{seconds:.1f}s")
+
+    passed_count = sum(1 for _, passed, _ in results if passed)
+    busy_seconds = sum(seconds for _, _, seconds in results)
+    console.print(table)
+    console.print(
+        f"[dim]{passed_count}/{len(results)} healthy | wall {wall_seconds:.1f}s | "
+        f"work {busy_seconds:.1f}s | speedup x{busy_seconds / max(wall_seconds, 0.001):.1f}[/dim]"
+    )
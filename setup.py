@@ -12,9 +12,12 @@ setup(
         "groq",
         "pytest"
     ],
+    extras_require={
+        "images": ["Pillow"],
+    },
     entry_points={
         "console_scripts": [
-            "kernhell=kernhell.main:app",
+            "kernhell=kernhell.client:main",
         ],
     },
 )
\ No newline at end of file
@@ -0,0 +1,54 @@
+"""Regression tests for kernhell.context_window splicing."""
+import ast
+
+from kernhell.context_window import extract_context, splice_context
+
+
+def _module(functions: int = 40) -> str:
+    parts = []
+    for i in range(functions):
+        parts.append(f"def f{i}():\n    value = {i}\n    return value\n")
+    return "\n".join(parts)
+
+
+def _traceback(path: str, line: int) -> str:
+    return f'Traceback (most recent call last):\n  File "{path}", line {line}, in f1\nValueError: boom\n'
+
+
+def test_excerpt_is_the_failing_function_without_notes():
+    code = _module()
+    window = extract_context(code, _traceback("/x/t.py", 6), "/x/t.py")
+    assert (window.start, window.end) == (5, 7)
+    assert window.snippet.strip() == "def f1():\n    value = 1\n    return value"
+
+
+def test_fixed_excerpt_is_spliced_in_place():
+    code = _module()
+    window = extract_context(code, _traceback("/x/t.py", 6), "/x/t.py")
+    fixed = window.snippet.replace("value = 1", "value = 100")
+    result = splice_context(code, fixed, window)
+    assert result == code.replace("value = 1\n", "value = 100\n", 1)
+    assert "NOTE" not in result
+
+
+def test_whole_file_answer_is_rejected():
+    code = _module()
+    window = extract_context(code, _traceback("/x/t.py", 6), "/x/t.py")
+    whole_file = code.replace("value = 1\n", "value = 100\n", 1)
+    assert splice_context(code, whole_file, window) is None
+
+
+def test_answer_redefining_other_functions_is_rejected():
+    code = _module()
+    window = extract_context(code, _traceback("/x/t.py", 6), "/x/t.py")
+    fixed = window.snippet.replace("value = 1", "value = 100") + "\n\ndef f2():\n    return 2\n"
+    assert splice_context(code, fixed, window) is None
+
+
+def test_new_imports_are_hoisted():
+    code = "import os\n\n" + _module()
+    window = extract_context(code, _traceback("/x/t.py", 8), "/x/t.py")
+    fixed = "import re\n" + window.snippet.replace("value = 1", "value = len(re.findall('a', 'aa'))")
+    result = splice_context(code, fixed, window)
+    ast.parse(result)
+    assert result.startswith("import os\nimport re\n")
@@ -0,0 +1,65 @@
+"""Regression tests for kernhell.failfast early-kill detection."""
+import time
+
+from kernhell.failfast import FailureWatch
+
+TRACEBACK = [
+    "Traceback (most recent call last):",
+    '  File "t.py", line 3, in <module>',
+    "    page.click('#go')",
+]
+
+
+def _watch(lines, grace=0.05):
+    watch = FailureWatch(grace=grace, enabled=True)
+    for line in lines:
+        watch.feed(line, "stderr")
+    return watch
+
+
+def test_uncaught_traceback_is_killed_after_grace():
+    watch = _watch(TRACEBACK + ["playwright._impl._errors.TimeoutError: Timeout 30000ms exceeded."])
+    assert watch.tripped
+    time.sleep(0.06)
+    assert watch.should_kill()
+
+
+def test_logged_traceback_does_not_trip():
+    watch = _watch(["ERROR:root:click failed, retrying"] + TRACEBACK + ["TimeoutError: boom"])
+    assert not watch.tripped
+
+
+def test_logged_chained_traceback_does_not_trip():
+    chained = TRACEBACK + ["ValueError: a", "", "During handling of the above exception, another exception occurred:", ""]
+    watch = _watch(["ERROR:root:step failed"] + chained + TRACEBACK + ["TimeoutError: b"])
+    assert not watch.tripped
+
+
+def test_later_stderr_output_restarts_grace():
+    watch = _watch(TRACEBACK + ["TimeoutError: boom"])
+    time.sleep(0.04)
+    watch.feed("INFO:root:still working", "stderr")
+    time.sleep(0.03)
+    assert not watch.should_kill()
+
+
+def test_stdout_disarms():
+    watch = _watch(TRACEBACK + ["TimeoutError: boom"])
+    watch.feed("next step", "stdout")
+    assert not watch.tripped
+
+
+def test_warning_before_uncaught_traceback_still_trips():
+    watch = FailureWatch(grace=0.05, enabled=True)
+    watch.feed("/x/t.py:3: DeprecationWarning: foo", "stderr")
+    watch.feed("  warnings.warn(", "stderr")
+    watch.feed("opened page", "stdout")
+    watch.feed("clicked login", "stdout")
+    for line in TRACEBACK + ["playwright._impl._errors.TimeoutError: Timeout 30000ms exceeded."]:
+        watch.feed(line, "stderr")
+    assert watch.tripped
+
+
+def test_uncaught_traceback_after_plain_stderr_line_trips():
+    watch = _watch(["some library chatter", ""] + TRACEBACK + ["TimeoutError: boom"])
+    assert watch.tripped
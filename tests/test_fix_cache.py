@@ -0,0 +1,53 @@
+"""Tests for kernhell.fix_cache error signatures and verification tracking."""
+import pytest
+
+import kernhell.fix_cache as fix_cache_module
+from kernhell.fix_cache import FixCache, cache_key, error_signature
+from kernhell.router_stats import key_id
+
+
+def _error(path: str, line: int, address: str, seconds: str) -> str:
+    return (
+        "Traceback (most recent call last):\n"
+        f'  File "{path}", line {line}, in test_login\n'
+        "    page.click('#submit')\n"
+        f"playwright._impl._errors.TimeoutError: Locator.click: Timeout 30000ms exceeded in {seconds}s\n"
+        f"<Page object at {address}>\n"
+    )
+
+
+def test_signature_strips_paths_line_numbers_and_addresses():
+    first = _error("/home/ci/run-1/tests/test_login.py", 12, "0x7f3a2c1d9e80", "30.1")
+    second = _error("/home/dev/project/tests/test_login.py", 48, "0x10b2f4c70", "29.8")
+    assert error_signature(first) == error_signature(second)
+    signature = error_signature(first)
+    assert "/home" not in signature and "0x" not in signature
+    assert 'File "test_login.py", line <n>' in signature
+
+
+def test_signature_strips_temp_dirs_and_timestamps():
+    first = "2024-05-01T10:00:00Z /tmp/kernhell-run-ab12/shot.png: Element not found"
+    second = "2025-01-09 23:59:59.123 /tmp/kernhell-run-cd34/shot.png: Element not found"
+    assert error_signature(first) == error_signature(second)
+
+
+def test_different_errors_keep_different_signatures():
+    assert error_signature("TimeoutError: #submit") != error_signature("TimeoutError: #login")
+
+
+def test_cache_key_ignores_trailing_whitespace_and_blank_lines():
+    assert cache_key("x = 1  \n\n\ny = 2\n", "E") == cache_key("x = 1\ny = 2", "E")
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(fix_cache_module, "CONFIG_DIR", tmp_path)
+    monkeypatch.setattr(fix_cache_module, "CACHE_FILE", tmp_path / "fix_cache.json")
+    return FixCache(enabled=True)
+
+
+def test_failed_fix_is_never_reused(cache):
+    cache.put("code", "err", "fixed", provider="groq", key="secret-key")
+    assert cache.get("code", "err") == "fixed"
+    assert cache.mark("code", "err", False) == ("groq", key_id("secret-key"))
+    assert cache.get("code", "err") is None
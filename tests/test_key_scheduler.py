@@ -0,0 +1,79 @@
+"""Tests for kernhell.key_scheduler error classification, backoff and the circuit breaker."""
+import time
+
+import pytest
+
+import kernhell.key_scheduler as scheduler_module
+from kernhell.key_scheduler import KeyScheduler, classify_error
+from kernhell.key_store import KeyStore
+
+
+class _Response:
+    def __init__(self, status_code=None, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class _ApiError(Exception):
+    def __init__(self, message, status_code=None, headers=None):
+        super().__init__(message)
+        self.response = _Response(status_code, headers)
+
+
+@pytest.fixture
+def scheduler(tmp_path, monkeypatch):
+    monkeypatch.setattr(scheduler_module, "key_store", KeyStore(tmp_path / "keystate.db"))
+    return KeyScheduler(max_wait=0)
+
+
+def test_retry_after_header_in_seconds():
+    assert classify_error(_ApiError("slow down", 429, {"retry-after": "7"})) == ("rate_limit", 7.0)
+
+
+def test_retry_after_in_message_milliseconds_and_seconds():
+    assert classify_error(_ApiError("Rate limit reached. Please try again: retry after 250ms")) == ("rate_limit", 0.25)
+    assert classify_error(_ApiError("quota exceeded, retry in 12s")) == ("rate_limit", 12.0)
+
+
+def test_auth_and_transient_errors():
+    assert classify_error(_ApiError("Invalid API key provided", 401)) == ("auth", None)
+    assert classify_error(ConnectionError("connection reset")) == ("transient", None)
+
+
+def test_rate_limit_backoff_grows_exponentially(scheduler):
+    waits = []
+    state = scheduler._state("groq", "k1")
+    for _ in range(3):
+        state.cooldown_until = 0.0  # as if the previous cooldown had run out
+        scheduler.report_error("groq", "k1", _ApiError("too many requests", 429))
+        waits.append(state.cooldown_until - time.monotonic())
+    assert scheduler.acquire("groq", ["k1"], 100) is None  # cooling down
+    assert waits[0] == pytest.approx(5, abs=0.5)
+    assert waits[1] == pytest.approx(10, abs=0.5)
+    assert waits[2] == pytest.approx(20, abs=0.5)
+
+
+def test_breaker_lets_one_probe_through(scheduler, monkeypatch):
+    monkeypatch.setattr(scheduler_module, "BREAKER_OPEN_SECONDS", 0.05)
+    for _ in range(2):
+        assert scheduler.acquire("groq", ["k1"], 100) == "k1"
+        scheduler.report_error("groq", "k1", _ApiError("unauthorized", 401))
+    assert scheduler.acquire("groq", ["k1"], 100) is None  # open
+
+    time.sleep(0.1)
+    assert scheduler.acquire("groq", ["k1"], 100) == "k1"  # half-open probe
+    assert scheduler.acquire("groq", ["k1"], 100) is None  # others wait for the probe
+    scheduler.report_success("groq", "k1")
+    assert scheduler._state("groq", "k1").breaker_until == 0.0
+
+
+def test_transient_probe_failure_reopens_probing(scheduler, monkeypatch):
+    monkeypatch.setattr(scheduler_module, "BREAKER_OPEN_SECONDS", 0.05)
+    for _ in range(2):
+        scheduler.acquire("groq", ["k1"], 100)
+        scheduler.report_error("groq", "k1", _ApiError("unauthorized", 401))
+    time.sleep(0.1)
+    assert scheduler.acquire("groq", ["k1"], 100) == "k1"
+    scheduler.report_error("groq", "k1", ConnectionError("connection reset"))
+    # Only the short transient cooldown remains, not another full breaker period.
+    assert scheduler._state("groq", "k1").breaker_until <= time.monotonic()
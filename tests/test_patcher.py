@@ -0,0 +1,93 @@
+"""Tests for kernhell.patcher edit blocks, unified diffs and surgical merging."""
+import pytest
+
+pytest.importorskip("rich")  # kernhell.utils logs through rich
+
+from kernhell.patcher import apply_edits, apply_fix, is_edit_response
+
+CODE = (
+    "def login(page):\n"
+    "    page.goto('/login')\n"
+    "    page.click('#submit')\n"
+    "    return page\n"
+)
+
+
+def _block(search: str, replace: str) -> str:
+    return f"<<<<<<< SEARCH\n{search}=======\n{replace}>>>>>>> REPLACE\n"
+
+
+def test_edit_block_exact_match():
+    answer = _block("    page.click('#submit')\n", "    page.click('#login-button')\n")
+    assert is_edit_response(answer)
+    assert "page.click('#login-button')" in apply_edits(CODE, answer)
+
+
+def test_edit_block_ignores_trailing_whitespace():
+    answer = _block("    page.click('#submit')   \n", "    page.click('#go')\n")
+    assert "page.click('#go')" in apply_edits(CODE, answer)
+
+
+def test_edit_block_with_dropped_indentation_is_shifted():
+    answer = _block("page.click('#submit')\nreturn page\n", "page.click('#go')\nreturn page\n")
+    fixed = apply_edits(CODE, answer)
+    assert "    page.click('#go')\n    return page\n" in fixed
+
+
+def test_edit_block_mismatch_returns_none():
+    assert apply_edits(CODE, _block("    page.click('#missing')\n", "    pass\n")) is None
+
+
+def test_ambiguous_edit_block_returns_none():
+    code = "x = 1\ny = 2\nx = 1\n"
+    assert apply_edits(code, _block("x = 1\n", "x = 3\n")) is None
+
+
+def test_one_mismatching_block_rejects_the_whole_answer():
+    answer = _block("    page.click('#submit')\n", "    page.click('#go')\n") + _block("nope\n", "yes\n")
+    assert apply_edits(CODE, answer) is None
+
+
+def test_unified_diff_uses_the_hunk_line_as_hint():
+    code = "x = 1\ny = 2\nx = 1\n"
+    diff = "--- a/t.py\n+++ b/t.py\n@@ -3,1 +3,1 @@\n-x = 1\n+x = 3\n"
+    assert apply_edits(code, diff) == "x = 1\ny = 2\nx = 3\n"
+
+
+def test_unified_diff_pure_insertion_is_rejected():
+    diff = "@@ -2,0 +2,1 @@\n+z = 0\n"
+    assert apply_edits("x = 1\ny = 2\n", diff) is None
+
+
+def test_apply_fix_comments_out_replaced_lines(tmp_path):
+    path = tmp_path / "t.py"
+    path.write_text(CODE)
+    fixed = CODE.replace("#submit", "#go")
+    assert apply_fix(str(path), fixed)
+    patched = path.read_text()
+    assert "    # page.click('#submit')\n    page.click('#go')\n" in patched
+    assert (tmp_path / "t.py.bak").read_text() == CODE
+
+
+def test_apply_edit_blocks_patches_the_file_surgically(tmp_path):
+    from kernhell.patcher import apply_edit_blocks, own_write_mtime
+
+    path = tmp_path / "t.py"
+    path.write_text(CODE)
+    answer = _block("    page.click('#submit')\n", "    page.click('#go')\n")
+    assert apply_edit_blocks(str(path), answer)
+    assert path.read_text() == CODE.replace(
+        "    page.click('#submit')\n", "    # page.click('#submit')\n    page.click('#go')\n")
+    assert own_write_mtime(path) == path.stat().st_mtime_ns
+
+
+def test_apply_edit_blocks_leaves_a_changed_file_alone(tmp_path):
+    from kernhell.patcher import apply_edit_blocks
+
+    path = tmp_path / "t.py"
+    edited = CODE.replace("#submit", "#send")  # the developer changed the line meanwhile
+    path.write_text(edited)
+    answer = _block("    page.click('#submit')\n", "    page.click('#go')\n")
+    assert not apply_edit_blocks(str(path), answer)
+    assert path.read_text() == edited
+    assert not (tmp_path / "t.py.bak").exists()
@@ -0,0 +1,50 @@
+"""Tests for kernhell.pytest_backend module detection and node splicing."""
+import ast
+
+from kernhell.pytest_backend import is_pytest_module, splice_node_source
+
+MODULE = (
+    "import pytest\n"
+    "\n"
+    "def test_login():\n"
+    "    assert 1 == 2\n"
+    "\n"
+    "def test_other():\n"
+    "    assert True\n"
+)
+
+
+def test_pytest_module_is_detected(tmp_path):
+    path = tmp_path / "test_a.py"
+    path.write_text(MODULE)
+    assert is_pytest_module(str(path))
+
+
+def test_script_calling_its_tests_is_not_a_pytest_module(tmp_path):
+    path = tmp_path / "test_b.py"
+    path.write_text(MODULE + "\ntest_login()\n")
+    assert not is_pytest_module(str(path))
+
+
+def test_script_running_tests_in_a_loop_is_not_a_pytest_module(tmp_path):
+    path = tmp_path / "test_c.py"
+    path.write_text(MODULE + "\nfor check in (test_login, test_other):\n    check()\n\nasyncio_run = print\nasyncio_run(test_other())\n")
+    assert not is_pytest_module(str(path))
+
+
+def test_main_guard_is_not_a_pytest_module(tmp_path):
+    path = tmp_path / "test_d.py"
+    path.write_text(MODULE + "\nif __name__ == \"__main__\":\n    test_login()\n")
+    assert not is_pytest_module(str(path))
+
+
+def test_splice_replaces_only_the_failing_test():
+    fixed = "import pytest\n\ndef test_login():\n    assert 2 == 2\n"
+    result = splice_node_source(MODULE, fixed, "test_login")
+    assert "assert 2 == 2" in result
+    assert "def test_other" in result
+    ast.parse(result)
+
+
+def test_splice_without_the_test_is_rejected():
+    assert splice_node_source(MODULE, "x = 1\n", "test_login") is None
@@ -0,0 +1,53 @@
+"""Regression tests for kernhell.streaming budgets."""
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("rich")  # kernhell.utils logs through rich
+
+from kernhell.streaming import StreamBudgetExceeded, StreamCancelled, cancel_scope, consume
+
+
+def test_stalled_stream_is_cut_at_the_deadline(monkeypatch):
+    monkeypatch.setattr("kernhell.streaming.MAX_SECONDS", 0.2)
+    release = threading.Event()
+    closed = []
+
+    def pieces():
+        yield "```python\n"
+        release.wait(10)  # the provider stops sending anything
+        yield "print('late')\n```\n"
+
+    def close():
+        closed.append(True)
+        release.set()
+
+    started = time.monotonic()
+    with pytest.raises(StreamBudgetExceeded):
+        consume("groq", 100, pieces(), close=close)
+    assert time.monotonic() - started < 2
+    assert closed
+
+
+def test_closing_fence_stops_early():
+    text = consume("groq", 100, iter(["```python\n", "x = 1\n", "```\n", "chatter"]))
+    assert "x = 1" in text
+    assert "chatter" not in text
+
+
+def test_cancel_scope_closes_a_running_stream():
+    cancelled = threading.Event()
+    closed = []
+
+    def pieces():
+        yield "```python\n"
+        cancelled.set()  # another hedged provider won meanwhile
+        threading.Event().wait(10)  # the losing provider keeps streaming slowly
+        yield "x = 1\n"
+
+    started = time.monotonic()
+    with cancel_scope(cancelled), pytest.raises(StreamCancelled):
+        consume("groq", 100, pieces(), close=lambda: closed.append(True))
+    assert time.monotonic() - started < 2
+    assert closed